@@ -5,7 +5,15 @@ from py21.hand import *
 from py21.player import *
 from py21.cli import cli_main
 import py21.strategies
-import py21.utils
+
+
+def __getattr__(name):
+    # the analytics and plotting helpers need pandas and altair, so they're
+    # only imported when they're first used
+    if name == "utils":
+        import importlib
+        return importlib.import_module("py21.utils")
+    raise AttributeError(f"module 'py21' has no attribute '{name}'")
 
 
 __version__ = "1.6.0"
@@ -0,0 +1,22 @@
+"""
+Bit flags for each of the actions that can be taken with a hand. The valid
+actions for a hand are stored as a bitmask of these flags.
+"""
+
+HIT = 1
+STAND = 2
+SURRENDER = 4
+DOUBLE = 8
+SPLIT = 16
+ACTION_FLAGS = {
+    "HIT": HIT,
+    "STAND": STAND,
+    "SURRENDER": SURRENDER,
+    "DOUBLE": DOUBLE,
+    "SPLIT": SPLIT
+}
+# list of valid actions for every possible bitmask
+ACTION_LISTS = [
+    [action for action, flag in ACTION_FLAGS.items() if mask & flag]
+    for mask in range(32)
+]
@@ -1,5 +1,18 @@
 # Card class used when creating the deck
 
+# fixed rank and suit orderings used to give every card an integer code.
+# A card's code is 13 * (suit index) + (rank index)
+RANK_ORDER = (2, 3, 4, 5, 6, 7, 8, 9, 10, 11, 12, 13, 14)
+SUIT_ORDER = ("C", "D", "H", "S")
+SUIT_SYMBOLS = {
+    "C": "\u2663",
+    "D": "\u2666",
+    "H": "\u2665",
+    "S": "\u2660"
+}
+# print J, Q, K, and A instead of 11, 12, 13, 14
+RANK_NAMES = {11: "J", 12: "Q", 13: "K", 14: "A"}
+
 
 class Card:
     RANKS = {2, 3, 4, 5, 6, 7, 8, 9, 10, 11, 12, 13, 14}
@@ -8,45 +21,50 @@ class Card:
     VALUES = {2: 2, 3: 3, 4: 4, 5: 5, 6: 6, 7: 7, 8: 8, 9: 9, 10: 10,
               11: 10, 12: 10, 13: 10, 14: 11}
 
-    def __init__(self, rank, suit):
+    # there is only ever one Card object for each rank and suit. They're all
+    # created when this module is imported and can't be modified
+    __slots__ = ("rank", "suit", "value", "code", "_str", "_hash")
+    _interned = {}
+
+    def __new__(cls, rank, suit):
         """
         Parameters
         ----------
         rank: rank of card
         suit: suit of card
         """
-        if rank in Card.RANKS:
-            self.rank = rank
-            self.value = Card.VALUES[rank]
-        else:
+        try:
+            return cls._interned[(rank, suit)]
+        except KeyError:
+            pass
+        if rank not in Card.RANKS:
             raise ValueError(f"'rank' must be in {Card.RANKS}")
-        if suit in Card.SUITS:
-            self.suit = suit
-        else:
+        if suit not in Card.SUITS:
             raise ValueError(f"'suit' must be in {Card.SUITS}")
+        card = object.__new__(cls)
+        value = Card.VALUES[rank]
+        code = 13 * SUIT_ORDER.index(suit) + RANK_ORDER.index(rank)
+        for name, attr in [
+            ("rank", rank), ("suit", suit), ("value", value), ("code", code),
+            ("_str", str(RANK_NAMES.get(rank, rank)) + SUIT_SYMBOLS[suit]),
+            ("_hash", hash(value))
+        ]:
+            object.__setattr__(card, name, attr)
+        cls._interned[(rank, suit)] = card
+        return card
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Card objects can't be modified")
+
+    def __reduce__(self):
+        # unpickling returns the existing card instead of a copy
+        return (Card, (self.rank, self.suit))
 
     def __str__(self):
-        """
-        Print J, Q, K, and A instead of 11, 12, 13, 14
-        And print the card symbols instead of letters
-        """
-        suit_symobols = {
-            "C": "\u2663",
-            "D": "\u2666",
-            "H": "\u2665",
-            "S": "\u2660"
-        }
-        if self.rank == 14:
-            rank = 'A'
-        elif self.rank == 13:
-            rank = 'K'
-        elif self.rank == 12:
-            rank = 'Q'
-        elif self.rank == 11:
-            rank = 'J'
-        else:
-            rank = self.rank
-        return str(rank) + suit_symobols[self.suit]
+        return self._str
+
+    def __hash__(self):
+        return self._hash
 
     def __eq__(self, other):
         return self.value == other.value
@@ -73,3 +91,7 @@ class Card:
             return other + self.value
         else:
             raise TypeError("Other must be of type 'Card' or 'int'")
+
+
+# one Card object for each code
+CARDS = tuple(Card(rank, suit) for suit in SUIT_ORDER for rank in RANK_ORDER)
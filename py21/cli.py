@@ -53,10 +53,12 @@ def cli_main(testing=False):
         total_hands += 1
     # summarize the results
     print(f"\nTotal hands played: {total_hands}")
-    correct_pct = (correct / total_moves) * 100
-    print(
-        f"According to basic strategy, you made the right move {correct_pct:.2f}% of the time"
-    )
+    # no moves are made if every hand was a blackjack
+    if total_moves:
+        correct_pct = (correct / total_moves) * 100
+        print(
+            f"According to basic strategy, you made the right move {correct_pct:.2f}% of the time"
+        )
     print(f"You started with ${player.start_bankroll}...")
     print(f"and finished with ${player.bankroll}")
 
@@ -1,20 +1,131 @@
 # Class for creating the deck
 
-import random
-from py21.card import Card
+import copy
+import numpy as np
+from py21.card import Card, CARDS
 
 
-class Deck:
+class ShoeStream:
 
-    def __new__(cls, *args, **kwargs):
+    def __init__(self, seed=None):
+        """
+        A counter based stream of random numbers used to shuffle shoes. The
+        draws for every shoe start at a fixed position in the stream, so any
+        shoe can be regenerated without generating the shoes before it.
+        Parameters
+        ----------
+        seed: integer seed or numpy SeedSequence for the stream. A random
+            seed is used if None
         """
-        Allow a random seed to be set
+        if isinstance(seed, np.random.SeedSequence):
+            self.seed_seq = seed
+        else:
+            self.seed_seq = np.random.SeedSequence(seed)
+        self.key = self.seed_seq.generate_state(2, np.uint64)
+
+    def stream(self, index):
         """
-        cls._seed = kwargs.get("seed", None)
-        cls.random = random.Random(cls._seed)
-        return object.__new__(cls)
+        Return independent child stream number `index`. Child streams are
+        the same as those created by SeedSequence.spawn, but can be created
+        in any order.
+        """
+        child = np.random.SeedSequence(
+            self.seed_seq.entropy,
+            spawn_key=self.seed_seq.spawn_key + (index,),
+            pool_size=self.seed_seq.pool_size,
+        )
+        return ShoeStream(child)
+
+    def spawn(self, n):
+        """
+        Return a list of the first n independent child streams
+        """
+        return [self.stream(i) for i in range(n)]
+
+    def uniforms(self, shoe, n, size):
+        """
+        Return the uniform draws used to shuffle n shoes of `size` cards,
+        starting with shoe number `shoe`.
+        """
+        # Philox produces four draws each time its counter increases and
+        # shoes always have a multiple of four cards, so shoe k always starts
+        # at counter k * size / 4
+        bit_gen = np.random.Philox(key=self.key, counter=shoe * size // 4)
+        return np.random.Generator(bit_gen).random((n, size))
+
+    def generator(self):
+        """
+        Return a numpy Generator for any other randomness a deck needs. Its
+        draws never overlap with those used for shuffling shoes.
+        """
+        bit_gen = np.random.Philox(key=self.key, counter=[0, 0, 0, 1])
+        return np.random.Generator(bit_gen)
+
+
+class ShoeGenerator:
+
+    def __init__(self, decks, stream, batch_size=128):
+        """
+        Builds shuffled shoes in batches so the cost of shuffling is spread
+        over many shoes.
+        Parameters
+        ----------
+        decks: number of decks in each shoe
+        stream: ShoeStream used to shuffle the shoes
+        batch_size: number of shoes to shuffle at once
+        """
+        self.decks = decks
+        self.stream = stream
+        self.batch_size = batch_size
+        self.base = np.tile(np.arange(52, dtype=np.uint8), decks)
+        self._batch = np.zeros((0, len(self.base)), dtype=np.uint8)
+        self._batch_start = 0
+        # number of the next shoe to be returned by next_shoe
+        self.shoe_index = 0
+
+    def generate(self, start, n):
+        """
+        Shuffle n shoes at once, starting with shoe number `start`
+        Returns
+        -------
+        An n by (52 * decks) array where each row is a shuffled shoe
+        """
+        # sorting a matrix of uniform draws gives an independent random
+        # permutation for every row
+        keys = self.stream.uniforms(start, n, len(self.base))
+        order = np.argsort(keys, axis=1, kind="stable")
+        return self.base[order]
+
+    def shoe(self, k):
+        """
+        Return shoe number k without generating any of the shoes before it
+        """
+        return self.generate(k, 1)[0]
+
+    def seek(self, k):
+        """
+        Make shoe number k the next shoe returned by next_shoe
+        """
+        self.shoe_index = k
+
+    def next_shoe(self):
+        """
+        Return the next pre-built shoe, building a new batch if they've all
+        been used
+        """
+        offset = self.shoe_index - self._batch_start
+        if not 0 <= offset < len(self._batch):
+            self._batch = self.generate(self.shoe_index, self.batch_size)
+            self._batch_start = self.shoe_index
+            offset = 0
+        self.shoe_index += 1
+        return self._batch[offset]
+
+
+class Deck:
 
-    def __init__(self, decks, test=False, burn=True, **kwargs):
+    def __init__(self, decks, test=False, burn=True, batch_size=128,
+                 seed=None, stream=None, **kwargs):
         """
         Initialize Deck class and create the first deck
         Parameters
@@ -24,11 +135,27 @@ class Deck:
               testing
         burn: boolean indicator for whether we burn the first card of a new
               deck
+        batch_size: number of shoes shuffled at once
+        seed: integer seed, numpy SeedSequence, or ShoeStream used to shuffle
+            the deck. Each deck has its own random state
+        stream: if specified, the deck uses this child stream of `seed`.
+            Decks with different streams are independent of each other
         """
-        self.deck = []
+        # the shoe is stored as an array of card codes. self._pos points to
+        # the next card to be delt so dealing never has to move the array
+        self.shoe = np.zeros(0, dtype=np.uint8)
+        self._pos = 0
         self.decks = decks
         self.burn = burn
         self.num_creates = 0
+        if isinstance(seed, ShoeStream):
+            self.stream = seed
+        else:
+            self.stream = ShoeStream(seed)
+        if stream is not None:
+            self.stream = self.stream.stream(stream)
+        self.random = self.stream.generator()
+        self.generator = ShoeGenerator(decks, self.stream, batch_size)
         if test:
             self._create_test_deck()
         else:
@@ -38,49 +165,133 @@ class Deck:
 
     def create_deck(self):
         """
-        Empties the deck then create the deck of cards by looping through all
-        the suits and ranks
-        Returns
-        -------
-
+        Replace the deck with the next shuffled shoe from the generator
         """
-        del self.deck[:]
-        assert len(self.deck) == 0
         self.num_pop = 0
         self.num_creates += 1
-        for decks in range(self.decks):
-            for suit in Card.SUITS:
-                for rank in Card.RANKS:
-                    card = Card(rank, suit)
-                    self.deck.append(card)
-        if len(self.deck) != 52 * self.decks:
+        self.shoe = self.generator.next_shoe()
+        self._pos = 0
+        if len(self.shoe) != 52 * self.decks:
             msg = 'Full deck not created'
             raise ValueError(msg)
-        self.shuffle()
-        assert len(self.deck) == 52 * self.decks
         # reset count variables
         setattr(self, "hands_played", 0)
         if self.burn:
             self.deal()
 
+    def seek(self, shoe):
+        """
+        Jump straight to shoe number `shoe` of the deck's stream. Shoes after
+        it are delt in order when the deck is shuffled
+        """
+        self.generator.seek(shoe)
+        self.create_deck()
+
+    def reset(self, test=False):
+        """
+        Go back to the first shoe of the deck's stream, as if the deck had
+        just been created
+        """
+        self.random = self.stream.generator()
+        self.generator.seek(0)
+        self.num_creates = 0
+        if test:
+            self._create_test_deck()
+        else:
+            self.create_deck()
+        self.num_pop = 0
+        self.hands_played = 0
+
+    def copy(self):
+        """
+        Return a copy of the deck that can be delt from independently. Shoes
+        that have already been shuffled are shared with the copy
+        """
+        deck = copy.copy(self)
+        deck.generator = copy.copy(self.generator)
+        deck.random = copy.deepcopy(self.random)
+        return deck
+
+    def state(self):
+        """
+        Return everything needed to put a deck back where it is now with
+        set_state. The shoes still to come are regenerated from the stream,
+        so only the current shoe is kept
+        """
+        return {
+            "stream": self.stream,
+            "shoe": self.shoe.copy(),
+            "pos": self._pos,
+            "shoe_index": self.generator.shoe_index,
+            "random": self.random.bit_generator.state,
+            "num_creates": self.num_creates,
+            "num_pop": self.num_pop,
+            "hands_played": self.hands_played,
+        }
+
+    def set_state(self, state):
+        """
+        Put the deck back to a state returned by state
+        """
+        self.stream = state["stream"]
+        self.random = self.stream.generator()
+        self.random.bit_generator.state = state["random"]
+        self.generator = ShoeGenerator(
+            self.decks, self.stream, self.generator.batch_size
+        )
+        self.generator.seek(state["shoe_index"])
+        self.shoe = state["shoe"].copy()
+        self._pos = state["pos"]
+        self.num_creates = state["num_creates"]
+        self.num_pop = state["num_pop"]
+        self.hands_played = state["hands_played"]
+
+    @property
+    def shoe_id(self):
+        """
+        Number of the current shoe in the deck's stream
+        """
+        return self.generator.shoe_index - 1
+
     def shuffle(self):
         """
-        Shuffle the deck
+        Shuffle the cards remaining in the deck
         """
-        self.random.shuffle(self.deck)
+        # copy first so we never shuffle a shoe that's still in a batch
+        self.shoe = self.shoe.copy()
+        self.random.shuffle(self.shoe[self._pos:])
 
     def deal(self):
         """
         Return:
          If the deck is empty, raise error. Otherwise return card of the top
         """
-        if len(self.deck) == 0:
+        if self._pos >= len(self.shoe):
             msg = 'Deck is empty'
             raise IndexError(msg)
-        else:
-            self.num_pop += 1
-            card = self.deck.pop(0)
-            return card
+        card = CARDS[self.shoe[self._pos]]
+        self._pos += 1
+        self.num_pop += 1
+        return card
+
+    def deal_many(self, k):
+        """
+        Deal k cards from the top of the deck at once
+        Parameters
+        ----------
+        k: number of cards to deal
+        Returns
+        -------
+        List of the cards in the order they were delt
+        """
+        end = self._pos + k
+        if end > len(self.shoe):
+            msg = 'Not enough cards left in the deck'
+            raise IndexError(msg)
+        cards = [CARDS[code] for code in self.shoe[self._pos:end].tolist()]
+        self._pos = end
+        self.num_pop += k
+        return cards
 
     def check_status(self, shuffle_freq):
         """
@@ -98,6 +309,13 @@ class Deck:
             self.create_deck()
         return _shuffle
 
+    @property
+    def deck(self):
+        """
+        List of the cards left in the deck, starting with the top card
+        """
+        return [CARDS[code] for code in self.shoe[self._pos:].tolist()]
+
     def _create_test_deck(self):
         """
         Create a deck used for testing
@@ -105,8 +323,10 @@ class Deck:
         # this deck is created to ensure that the player will need to split
         # their hand
         test_ranks = [6, 4, 6, 9, 8, 2, 12, 3, 13, 5, 4, 10, 11]
-        for rank in test_ranks:
-            self.deck.append(Card(rank, "C"))
+        self.shoe = np.array(
+            [Card(rank, "C").code for rank in test_ranks], dtype=np.uint8
+        )
+        self._pos = 0
 
     def __len__(self):
-        return len(self.deck)
+        return len(self.shoe) - self._pos
@@ -0,0 +1,711 @@
+"""
+Exact expected values and house edges.
+
+Shoes are described by their composition: a tuple with the number of cards
+of each value left in the shoe, in the same order as CARD_VALUES, so the last
+entry is the number of aces. Every probability is found by recursing over
+the cards that can be delt, removing each one from the composition, and the
+results are memoized by composition and hand state so each distinct
+situation is only worked out once.
+
+The dealer checks for blackjack before anyone plays, as in Game, so the
+expected values of the player's actions are for shoes where the dealer's hole
+card doesn't give them blackjack. The hole card is still treated as an unknown
+card that's been removed from the shoe.
+
+Splits are the one approximation. Every hand after a split is played from the
+same composition, ignoring the cards delt to the other hands, the number of
+splits is counted along each hand's own path, and the dealer is assumed to
+finish their hand when a split hand has two card 21. Everything else matches
+the rules Game plays by, including a player blackjack pushing against a
+dealer's blackjack and insurance paying back the full wager.
+
+perfect_play and perfect_insurance are strategy and insurance functions that
+make every decision perfectly for the composition of the shoe in a Game.
+
+    calc = Calculator({"num_decks": 6})
+    calc.dealer_probabilities(10)
+    calc.action_evs([10, 6], 10)
+    result = house_edge({"num_decks": 6}, basic_strategy)
+"""
+import hashlib
+import json
+import os
+from collections import OrderedDict
+from pathlib import Path
+import numpy as np
+from py21.actions import ACTION_FLAGS
+from py21.game import load_rules, full_shoe
+from py21.handstate import (
+    TRANSITIONS, EMPTY_HAND, STATE_TOTAL, CARD_VALUES, dealer_stands
+)
+from py21.player import Player
+from py21.rules import Rules
+from py21.strategies import basic_strategy, CACHE_DIR
+from py21.vector import compile_strategy, ACTION_CODES
+
+
+# bump when a change to the calculations makes saved results out of date
+CACHE_VERSION = 1
+# value of the card that gives the dealer blackjack for each up card
+BLACKJACK_CARD = {10: 11, 11: 10}
+# index of each value in a composition
+VALUE_INDEX = {value: i for i, value in enumerate(CARD_VALUES)}
+# most results a Calculator following a shoe with set_shoe keeps before
+# dropping the ones it can't use again
+MAX_SAVED = 500000
+# number of sets of rules perfect_play keeps a Calculator for. The least
+# recently used one is dropped when another set of rules is played
+MAX_CALCULATORS = 4
+
+
+def remove(composition, *values):
+    """
+    Return the composition left after the given card values are delt
+    """
+    counts = list(composition)
+    for value in values:
+        i = VALUE_INDEX[value]
+        if not counts[i]:
+            raise ValueError(f"No cards with a value of {value} are left")
+        counts[i] -= 1
+    return tuple(counts)
+
+
+def prob_no_blackjack(composition, up):
+    """
+    Return the probability the dealer's hole card doesn't give them blackjack
+    Parameters
+    ----------
+    composition: number of cards of each value left, in the same order as
+        CARD_VALUES. Includes the hole card
+    up: value of the dealer's up card
+    """
+    bj_card = BLACKJACK_CARD.get(up)
+    if bj_card is None:
+        return 1.0
+    return 1 - composition[VALUE_INDEX[bj_card]] / sum(composition)
+
+
+def _draws(composition):
+    """
+    Return the value, probability, and resulting composition for every card
+    that can be delt next. The dealer's hole card is one of the cards in the
+    composition, so the last card is never delt to the player
+    """
+    size = sum(composition)
+    draws = []
+    if size < 2:
+        return draws
+    for i, count in enumerate(composition):
+        if count:
+            draws.append((
+                CARD_VALUES[i], count / size,
+                composition[:i] + (count - 1,) + composition[i + 1:]
+            ))
+    return draws
+
+
+class Calculator:
+
+    def __init__(self, rules=None):
+        """
+        Parameters
+        ----------
+        rules: dictionary containing any rule updates or a Rules snapshot
+        """
+        if not isinstance(rules, Rules):
+            rules = load_rules(rules)
+        self.rules = rules
+        self.shoe = full_shoe(rules.num_decks)
+        self._stands = dealer_stands(rules.stand_total, rules.soft_stand)
+        # the dealer's final total is stored as an index into a tuple of
+        # probabilities. Totals from stand_total to 21 come first, then bust
+        self._num_outcomes = 23 - rules.stand_total
+        self._sequences = {}
+        # compiled strategies and their expected values
+        self._plays = {}
+        # number of cards in the shoe passed to set_shoe
+        self._shoe_size = None
+        self.clear()
+
+    def clear(self):
+        """
+        Drop every saved result
+        """
+        self._draw_cache = {}
+        self._hole_cache = {}
+        self._stand_cache = {}
+        self._best_cache = {}
+        for play in self._plays.values():
+            play.cache = {}
+
+    def set_shoe(self, composition, max_saved=MAX_SAVED):
+        """
+        Follow a shoe as it's delt. Results are saved by composition, so
+        every decision reuses the results for the smaller shoes worked out
+        for the decisions before it. Everything is dropped when the shoe is
+        shuffled, and the results for shoes that can't be reached from
+        `composition` are dropped when more than max_saved are saved
+        Parameters
+        ----------
+        composition: composition of the shoe at the next decision
+        max_saved: most results to keep
+        """
+        composition = tuple(composition)
+        size = sum(composition)
+        if self._shoe_size is not None and size > self._shoe_size:
+            self.clear()
+        elif self._num_saved() > max_saved:
+            self._prune(composition)
+            # everything left can still be reached, so start over instead of
+            # pruning again at every decision
+            if self._num_saved() > max_saved // 2:
+                self.clear()
+        self._shoe_size = size
+
+    def dealer_probabilities(self, up, composition=None):
+        """
+        Return the probability of each of the dealer's final results
+        Parameters
+        ----------
+        up: value of the dealer's up card, with aces counted as 11
+        composition: composition of the shoe after the up card and any other
+            known cards are delt. Defaults to a full shoe less the up card
+        Returns
+        -------
+        A dictionary mapping each final total, "bust", and "blackjack" to its
+        probability
+        """
+        if composition is None:
+            composition = remove(self.shoe, up)
+        composition = tuple(composition)
+        dist, no_blackjack = self._hole(composition, up)
+        results = {
+            total: dist[total - self.rules.stand_total]
+            for total in range(self.rules.stand_total, 22)
+        }
+        results["bust"] = dist[-1]
+        results["blackjack"] = 1 - no_blackjack
+        return results
+
+    def action_evs(self, cards, up, composition=None, from_split=False,
+                   nsplits=0):
+        """
+        Return the expected value of each action that can be taken with a
+        hand, per unit wagered, when every decision after it is made
+        perfectly for the composition of the shoe
+        Parameters
+        ----------
+        cards: values of the cards in the hand, with aces counted as 11
+        up: value of the dealer's up card
+        composition: composition of the shoe after the hand, the up card,
+            and any other known cards are delt. Defaults to a full shoe less
+            the hand and the up card
+        from_split: whether or not the hand was delt after a split
+        nsplits: number of times the hand has been split
+        Returns
+        -------
+        A dictionary mapping each allowed action to its expected value, given
+        that the dealer doesn't have blackjack
+        """
+        if composition is None:
+            composition = remove(self.shoe, up, *cards)
+        composition = tuple(composition)
+        state = EMPTY_HAND
+        for value in cards:
+            state = TRANSITIONS[state][value][0]
+        pair = cards[0] if len(cards) == 2 and cards[0] == cards[1] else 0
+        no_blackjack = prob_no_blackjack(composition, up)
+        evs = self._action_evs(
+            composition, up, state, pair, from_split, nsplits, len(cards),
+            self._best
+        )
+        return {
+            action: ev / no_blackjack for action, (ev, _) in evs.items()
+        }
+
+    def best_action(self, cards, up, composition=None, from_split=False,
+                    nsplits=0):
+        """
+        Return the action with the highest expected value for a hand. Takes
+        the same arguments as action_evs
+        """
+        evs = self.action_evs(cards, up, composition, from_split, nsplits)
+        return max(evs, key=evs.get)
+
+    def evaluate(self, strategy=None, insurance=False, composition=None):
+        """
+        Find the expected result of a round played with a strategy
+        Parameters
+        ----------
+        strategy: strategy function that only depends on the hand, the
+            dealer's up card, and the rules, like basic_strategy. Defaults to
+            playing every hand perfectly for the composition of the shoe
+        insurance: whether or not the player always takes insurance
+        composition: composition of the shoe at the start of the round.
+            Defaults to a full shoe
+        Returns
+        -------
+        A dictionary with the expected net result per round ("ev"), the
+        expected amount wagered per round ("wagered"), and the house edge,
+        the amount lost per unit wagered, as Summary.house_edge reports it
+        """
+        rules = self.rules
+        if strategy is None:
+            play = self._best
+        else:
+            play = self._strategy_play(strategy).play
+        composition = self.shoe if composition is None else tuple(composition)
+        ev = 0.0
+        wagered = 0.0
+        # the cards are delt to the player, the dealer, then the player
+        for first, p_first, after_first in self._cached_draws(composition):
+            for up, p_up, after_up in self._cached_draws(after_first):
+                bj_card = BLACKJACK_CARD.get(up)
+                for second, p_second, root in self._cached_draws(after_up):
+                    prob = p_first * p_up * p_second
+                    no_blackjack = prob_no_blackjack(root, up)
+                    p_blackjack = 1 - no_blackjack if bj_card else 0
+                    if insurance and up == 11 and rules.insurance_allowed:
+                        ev += prob * (p_blackjack - rules.insurance_pct)
+                    if first + second == 21:
+                        # blackjack pushes against a dealer blackjack
+                        ev += prob * no_blackjack * rules.blackjack_payout
+                        wagered += prob
+                        continue
+                    state = TRANSITIONS[TRANSITIONS[EMPTY_HAND][first][0]]
+                    state = state[second][0]
+                    pair = first if first == second else 0
+                    hand_ev, hand_wagered = play(
+                        root, up, state, pair, False, 0, 2
+                    )
+                    ev += prob * (hand_ev - p_blackjack)
+                    wagered += prob * (hand_wagered + p_blackjack)
+        return {"ev": ev, "wagered": wagered, "house_edge": -ev / wagered}
+
+    # Start private methods
+
+    def _caches(self):
+        """
+        Every dictionary of results keyed by composition. The composition is
+        the first part of each key
+        """
+        return [self._hole_cache, self._stand_cache, self._best_cache] + [
+            play.cache for play in self._plays.values()
+        ]
+
+    def _num_saved(self):
+        return len(self._draw_cache) + sum(
+            len(cache) for cache in self._caches()
+        )
+
+    def _prune(self, composition):
+        """
+        Drop the results for shoes that can't be delt from `composition`
+        """
+        def reachable(other):
+            return all(a <= b for a, b in zip(other, composition))
+
+        self._draw_cache = {
+            key: value for key, value in self._draw_cache.items()
+            if reachable(key)
+        }
+        for cache in self._caches():
+            for key in [key for key in cache if not reachable(key[0])]:
+                del cache[key]
+
+    def _strategy_play(self, strategy):
+        play = self._plays.get(strategy)
+        if play is None:
+            play = self._plays[strategy] = _StrategyPlay(self, strategy)
+        return play
+
+    def _cached_draws(self, composition):
+        draws = self._draw_cache.get(composition)
+        if draws is None:
+            draws = self._draw_cache[composition] = _draws(composition)
+        return draws
+
+    def _hole(self, composition, up):
+        """
+        Probability of each of the dealer's final results, counting only the
+        hole cards that don't give the dealer blackjack, and the probability
+        the dealer doesn't have blackjack
+        """
+        key = (composition, up)
+        result = self._hole_cache.get(key)
+        if result is not None:
+            return result
+        sequences = self._sequences.get(up)
+        if sequences is None:
+            sequences = self._sequences[up] = self._dealer_sequences(up)
+        index, steps, lengths, orderings, outcomes = sequences
+        shoe = np.array(composition, dtype=float)
+        size = shoe.sum()
+        # chance of drawing k cards of each value, and of drawing any k cards,
+        # in a particular order. Both are divided by size ** k so they never
+        # overflow
+        values = np.ones((len(shoe), steps))
+        values[:, 1:] = np.cumprod(
+            np.maximum(shoe[:, None] - np.arange(steps - 1), 0) / size,
+            axis=1
+        )
+        cards = np.ones(lengths.max(initial=0) + 1)
+        # groups that need more cards than are left have a chance of 0 from
+        # `values`, so their divisor only needs to be positive
+        cards[1:] = np.cumprod(
+            np.maximum(size - np.arange(len(cards) - 1), 1) / size
+        )
+        probs = (
+            orderings * values.ravel()[index].prod(axis=1) / cards[lengths]
+        )
+        dist = np.bincount(outcomes, weights=probs,
+                           minlength=self._num_outcomes)
+        result = self._hole_cache[key] = (
+            tuple(dist.tolist()), prob_no_blackjack(composition, up)
+        )
+        return result
+
+    def _dealer_sequences(self, up):
+        """
+        Group every way the dealer can play out a hand by the cards they draw
+        and their final result. Every order of the same cards is equally
+        likely, so each group only needs the number of orders it has
+        Returns
+        -------
+        The cards drawn by each group as indices into a flattened table with
+        `steps` columns, `steps`, and arrays with the number of cards drawn,
+        the number of orders, and the final result of each group
+        """
+        bj_card = BLACKJACK_CARD.get(up)
+        stand_total = self.rules.stand_total
+        groups = {}
+        counts = [0] * len(CARD_VALUES)
+
+        def walk(state, first):
+            if self._stands[state]:
+                outcome = min(STATE_TOTAL[state], 22) - stand_total
+                key = (tuple(counts), outcome)
+                groups[key] = groups.get(key, 0) + 1
+                return
+            row = TRANSITIONS[state]
+            for i, value in enumerate(CARD_VALUES):
+                if first and value == bj_card:
+                    continue
+                counts[i] += 1
+                walk(row[value][0], False)
+                counts[i] -= 1
+
+        walk(TRANSITIONS[EMPTY_HAND][up][0], True)
+        keys = list(groups)
+        drawn = np.array([key[0] for key in keys], dtype=np.int64)
+        # the table has a row for each value and a column for each number of
+        # cards of that value. A group only draws a few different values, so
+        # the rest of its indices point to column 0, which is always 1
+        steps = int(drawn.max(initial=0)) + 1
+        index = np.zeros(
+            (len(keys), int((drawn > 0).sum(axis=1).max(initial=0))),
+            dtype=np.int64
+        )
+        for row, group in enumerate(drawn.tolist()):
+            flat = [i * steps + k for i, k in enumerate(group) if k]
+            index[row, :len(flat)] = flat
+        return (
+            index, steps, drawn.sum(axis=1),
+            np.array([groups[key] for key in keys], dtype=float),
+            np.array([key[1] for key in keys], dtype=np.int64),
+        )
+
+    def _stand(self, composition, up, total, win_payout):
+        """
+        Expected value and amount wagered for standing on a total
+        """
+        key = (composition, up, total, win_payout)
+        result = self._stand_cache.get(key)
+        if result is not None:
+            return result
+        dist, no_blackjack = self._hole(composition, up)
+        stand_total = self.rules.stand_total
+        # the dealer busts or ends below the player's total
+        win = dist[-1] + sum(dist[:max(total - stand_total, 0)])
+        push = dist[total - stand_total] if total >= stand_total else 0.0
+        loss = no_blackjack - win - push
+        result = (win * win_payout - loss, no_blackjack)
+        self._stand_cache[key] = result
+        return result
+
+    def _finish(self, composition, up, state, split_blackjack):
+        """
+        Expected value and amount wagered for a hand that takes no more cards
+        """
+        total = STATE_TOTAL[state]
+        if total > 21:
+            no_blackjack = prob_no_blackjack(composition, up)
+            return -no_blackjack, no_blackjack
+        if split_blackjack:
+            payout = self.rules.split_blackjack_payout
+        else:
+            payout = self.rules.payout
+        return self._stand(composition, up, total, payout)
+
+    def _valid(self, from_split, nsplits, pair, num_cards):
+        """
+        Actions that can be taken with a hand, as in Hand.valid_actions
+        """
+        rules = self.rules
+        actions = ["STAND", "HIT"]
+        if num_cards != 2:
+            return actions
+        if not from_split or rules.double_after_split:
+            actions.append("DOUBLE")
+        if rules.surrender_allowed and (
+                not from_split or rules.surrender_after_split):
+            actions.append("SURRENDER")
+        if pair and nsplits < rules.max_split_hands:
+            actions.append("SPLIT")
+        return actions
+
+    def _action_evs(self, composition, up, state, pair, from_split, nsplits,
+                    num_cards, play):
+        """
+        Expected value and amount wagered for each action that can be taken
+        with a hand. `play` is used for the decisions after the action
+        """
+        results = {}
+        for action in self._valid(from_split, nsplits, pair, num_cards):
+            results[action] = self._take(
+                action, composition, up, state, pair, from_split, nsplits,
+                play
+            )
+        return results
+
+    def _take(self, action, composition, up, state, pair, from_split,
+              nsplits, play):
+        """
+        Expected value and amount wagered for taking an action
+        """
+        if action == "STAND":
+            return self._finish(composition, up, state, False)
+        if action == "SURRENDER":
+            no_blackjack = prob_no_blackjack(composition, up)
+            return (
+                (self.rules.surrender_pct - 1) * no_blackjack, no_blackjack
+            )
+        if action == "SPLIT":
+            ev, wagered = self._split(composition, up, pair, nsplits + 1, play)
+            return 2 * ev, 2 * wagered
+        ev = 0.0
+        wagered = 0.0
+        row = TRANSITIONS[state]
+        for value, prob, rest in self._cached_draws(composition):
+            new_state = row[value][0]
+            if action == "DOUBLE":
+                hand_ev, hand_wagered = self._finish(
+                    rest, up, new_state, False
+                )
+                hand_ev *= 2
+                hand_wagered *= 2
+            elif STATE_TOTAL[new_state] > 21:
+                hand_ev, hand_wagered = self._finish(
+                    rest, up, new_state, False
+                )
+            else:
+                hand_ev, hand_wagered = play(
+                    rest, up, new_state, 0, from_split, nsplits, 3
+                )
+            ev += prob * hand_ev
+            wagered += prob * hand_wagered
+        return ev, wagered
+
+    def _split(self, composition, up, card, nsplits, play):
+        """
+        Expected value and amount wagered for one of the hands from a split
+        """
+        rules = self.rules
+        ev = 0.0
+        wagered = 0.0
+        first_state = TRANSITIONS[EMPTY_HAND][card][0]
+        for value, prob, rest in self._cached_draws(composition):
+            state = TRANSITIONS[first_state][value][0]
+            if STATE_TOTAL[state] == 21 or (
+                    card == 11 and not rules.hit_split_aces):
+                # split aces and split hands with 21 stand
+                hand_ev, hand_wagered = self._finish(
+                    rest, up, state, STATE_TOTAL[state] == 21
+                )
+            else:
+                hand_ev, hand_wagered = play(
+                    rest, up, state, card if value == card else 0, True,
+                    nsplits, 2
+                )
+            ev += prob * hand_ev
+            wagered += prob * hand_wagered
+        return ev, wagered
+
+    def _best(self, composition, up, state, pair, from_split, nsplits,
+              num_cards):
+        """
+        Expected value and amount wagered when every decision is made
+        perfectly
+        """
+        if num_cards != 2:
+            # every hand with three or more cards is the same
+            pair = nsplits = 0
+        key = (composition, up, state, pair, from_split, nsplits)
+        result = self._best_cache.get(key)
+        if result is not None:
+            return result
+        evs = self._action_evs(
+            composition, up, state, pair, from_split, nsplits, num_cards,
+            self._best
+        )
+        result = max(evs.values(), key=lambda ev: ev[0])
+        self._best_cache[key] = result
+        return result
+
+
+class _StrategyPlay:
+    """
+    Plays hands for Calculator.evaluate by looking up each decision in a
+    compiled strategy table
+    """
+
+    def __init__(self, calc, strategy):
+        self.calc = calc
+        player = Player(calc.rules.max_bet, strategy_func=strategy)
+        self.table, self.errors = compile_strategy(player, calc.rules)
+        self.actions = {code: action for action, code in ACTION_CODES.items()}
+        self.cache = {}
+
+    def play(self, composition, up, state, pair, from_split, nsplits,
+             num_cards):
+        if num_cards != 2:
+            pair = nsplits = 0
+        key = (composition, up, state, pair, from_split, nsplits)
+        result = self.cache.get(key)
+        if result is not None:
+            return result
+        calc = self.calc
+        mask = 0
+        for action in calc._valid(from_split, nsplits, pair, num_cards):
+            mask |= ACTION_FLAGS[action]
+        index = (up, state, pair, int(from_split), mask)
+        code = int(self.table[index])
+        if code < 0:
+            raise self.errors[index]
+        result = calc._take(
+            self.actions[code], composition, up, state, pair, from_split,
+            nsplits, self.play
+        )
+        self.cache[key] = result
+        return result
+
+
+def _cache_key(rules, table, insurance):
+    digest = hashlib.sha256()
+    digest.update(json.dumps(
+        {"rules": rules.to_dict(), "insurance": insurance,
+         "version": CACHE_VERSION},
+        sort_keys=True
+    ).encode())
+    if table is not None:
+        digest.update(table.tobytes())
+    return digest.hexdigest()
+
+
+def house_edge(rules=None, strategy=basic_strategy, insurance=False,
+               cache_dir=CACHE_DIR):
+    """
+    Return the exact house edge for playing a strategy under a set of rules.
+    Results are saved in cache_dir, keyed by the rules and the decisions the
+    strategy makes, so each combination is only worked out once
+    Parameters
+    ----------
+    rules: dictionary containing any rule updates
+    strategy: strategy function that only depends on the hand, the dealer's
+        up card, and the rules. If None, every hand is played perfectly for
+        the composition of the shoe
+    insurance: whether or not the player always takes insurance
+    cache_dir: directory results are saved in. If None, nothing is saved
+    Returns
+    -------
+    A dictionary with the expected net result per round ("ev"), the expected
+    amount wagered per round ("wagered"), and the house edge
+    """
+    calc = Calculator(rules)
+    table = None
+    if strategy is not None:
+        table = calc._strategy_play(strategy).table
+    path = None
+    if cache_dir is not None:
+        key = _cache_key(calc.rules, table, insurance)
+        path = Path(cache_dir, f"house_edge_{key}.json")
+        if path.exists():
+            with path.open() as f:
+                return json.load(f)
+    result = calc.evaluate(strategy, insurance)
+    if path is not None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = Path(str(path) + ".tmp")
+        with tmp.open("w") as f:
+            json.dump(result, f)
+        os.replace(tmp, path)
+    return result
+
+
+# calculators used by perfect_play for each set of rules, from least to most
+# recently used
+_calculators = OrderedDict()
+
+
+def perfect_play(player, hand, dealer_up, game_params, composition,
+                 **kwargs):
+    """
+    Strategy function that takes the action with the highest expected value
+    for the exact composition of the shoe, including surrender. Each set of
+    rules has one Calculator that follows the shoe, so the results worked out
+    for one decision are reused by the decisions after it until the shoe is
+    shuffled.
+
+    This function can be used at the strategy_func argument in an instance of
+    of the Player class.
+    Parameters
+    ----------
+    player: instance of the Player class
+    hand: instance of the Hand class
+    dealer_up: dealer's up card
+    game_params: rules of the specific game
+    composition: number of cards of each value that haven't been seen
+    **kwargs: misc. arguements that get passed into the function
+    """
+    calc = _calculators.get(game_params)
+    if calc is None:
+        calc = _calculators[game_params] = Calculator(game_params)
+        if len(_calculators) > MAX_CALCULATORS:
+            _calculators.popitem(last=False)
+    else:
+        _calculators.move_to_end(game_params)
+    calc.set_shoe(composition)
+    evs = calc.action_evs(
+        [card.value for card in hand.cards], dealer_up, composition,
+        hand.from_split, hand.nsplits
+    )
+    mask = hand.valid_mask
+    return max(
+        (action for action in evs if ACTION_FLAGS[action] & mask),
+        key=evs.get
+    )
+
+
+def perfect_insurance(game_params, composition, **kwargs):
+    """
+    Insurance function that takes insurance whenever the chance that the
+    dealer's hole card is worth ten is high enough for it to have a positive
+    expected value.
+
+    This can be used as the insurance_func argument in an insuance of the
+    Player class.
+    """
+    tens = composition[VALUE_INDEX[10]]
+    return tens / sum(composition) > game_params.insurance_pct
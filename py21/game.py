@@ -8,24 +8,170 @@ dealing the cards, playing the players hands, and playing the dealer
 # pylint: disable=no-member
 import copy
 import difflib
+import inspect
+import json
+import math
+import os
+import pickle
+import time
+from collections import namedtuple, deque
+from concurrent.futures import ProcessPoolExecutor
+from py21.actions import ACTION_FLAGS
 from py21.deck import Deck
 from py21.hand import Hand
+from py21.handstate import dealer_stands, CARD_VALUES
+from py21.rules import Rules, DEFAULT_RULES
+from py21.recorder import Recorder, RESULT_CODES, HIT_ACTION_CODES
+from py21.strategies import minimum_bet, decline_insurance
+from py21.summary import Precision, PlayerStats
 from paramtools.parameters import Parameters
-from tqdm import tqdm
-from pathlib import Path
 
 
-CUR_PATH = Path(__file__).resolve().parent
+__all__ = [
+    "Game", "GameParams", "RoundRecord", "HandOutcome", "load_rules",
+    "load_params", "full_shoe", "RECORD_LEVELS",
+]
+
+# levels of data that can be recorded. Each level includes everything recorded
+# by the levels before it
+RECORD_LEVELS = ("none", "hands", "hits", "cards")
+# simulations run with workers are split into blocks of rounds. Blocks have at
+# least MIN_BLOCK_ROUNDS rounds and there are at most MAX_BLOCKS of them
+MIN_BLOCK_ROUNDS = 5000
+MAX_BLOCKS = 4096
+# number of blocks queued for each worker at a time
+BLOCK_QUEUE = 2
+# simulations stopped by until_stderr or time_budget check whether to stop
+# every STOP_CHECK_ROUNDS rounds, and never stop on the standard error before
+# MIN_STOP_ROUNDS rounds have been played
+STOP_CHECK_ROUNDS = 100
+MIN_STOP_ROUNDS = 1000
+# player attributes saved by Game.checkpoint
+PLAYER_STATE = (
+    "bankroll", "start_bankroll", "total_wagered", "history", "stats"
+)
+# version of the files written by Game.checkpoint
+CHECKPOINT_VERSION = 1
+# keyword arguments that were added after player functions were first
+# documented. They're only passed to functions that accept them, so functions
+# written without **kwargs keep working
+OPTIONAL_KWARGS = ("composition", "true_count")
+# records yielded by Game.iter_rounds
+RoundRecord = namedtuple(
+    "RoundRecord",
+    [
+        "round_id", "count", "ten_count", "other_count", "true_count",
+        "dealer_up", "dealer_total", "dealer_blackjack", "dealer_bust",
+        "hands", "bankroll_changes",
+    ],
+)
+HandOutcome = namedtuple(
+    "HandOutcome",
+    ["player_id", "hand_id", "total", "wager", "blackjack", "result"],
+)
+# change in the count, ten count, and other count for each card value
+COUNT_CHANGES = {
+    value: (
+        1 if 2 <= value <= 6 else -1 if value == 10 else 0,
+        -1 if value == 10 else 0,
+        0 if value == 10 else -1,
+    )
+    for value in range(2, 12)
+}
+
+
+def full_shoe(num_decks):
+    """
+    Return the composition of a full shoe: a tuple with the number of cards
+    of each value, in the same order as CARD_VALUES
+    Parameters
+    ----------
+    num_decks: number of decks in the shoe
+    """
+    return tuple(
+        16 * num_decks if value == 10 else 4 * num_decks
+        for value in CARD_VALUES
+    )
+
+
+# most snapshots of validated rules kept in the cache
+RULES_CACHE_SIZE = 256
 
 
 class GameParams(Parameters):
-    defaults = Path(CUR_PATH, "rules.json").open("r").read()
+    defaults = DEFAULT_RULES
     array_first = True
 
 
+# snapshots of validated rules keyed by the canonical form of the rules
+_rules_cache = {}
+
+
+def _rules_key(rules):
+    """
+    Return a canonical string for a dictionary of rules. Rules that only
+    differ in key order or in int vs numpy int values get the same key
+    """
+    def default(value):
+        if hasattr(value, "tolist"):
+            return value.tolist()
+        return repr(value)
+    return json.dumps(rules, sort_keys=True, default=default)
+
+
+def load_rules(rules=None):
+    """
+    Return a read only snapshot of the validated rules. Each set of rules is
+    only validated once. Later calls with the same rules return the cached
+    snapshot, so its GameParams object must not be adjusted
+    Parameters
+    ----------
+    rules: dictionary containing any rule updates. A Rules snapshot is
+        returned as is
+    """
+    if isinstance(rules, Rules):
+        return rules
+    if rules and not isinstance(rules, dict):
+        raise TypeError("'rules' must be a dictionary.")
+    key = _rules_key(rules or {})
+    snapshot = _rules_cache.get(key)
+    if snapshot is not None:
+        return snapshot
+    params = GameParams(array_first=True)
+    if rules:
+        allowed_params = params.specification().keys()
+        for param in rules.keys():
+            # ensure parameter is allowed
+            if param not in allowed_params:
+                similar = difflib.get_close_matches(param, allowed_params)
+                msg = (
+                    f"Unexpected parameter name {param}. Similar "
+                    f"parameter(s) are: {similar}"
+                )
+                raise ValueError(msg)
+        params.adjust(rules)
+    snapshot = Rules(params)
+    if len(_rules_cache) >= RULES_CACHE_SIZE:
+        # drop the oldest entry
+        del _rules_cache[next(iter(_rules_cache))]
+    _rules_cache[key] = snapshot
+    return snapshot
+
+
+def load_params(rules=None):
+    """
+    Return the validated GameParams object for a set of rules. See load_rules
+    Parameters
+    ----------
+    rules: dictionary containing any rule updates
+    """
+    return load_rules(rules).params
+
+
 class Game:
 
-    def __init__(self, players, rules=None, verbose=False, test=False, seed=None):
+    def __init__(self, players, rules=None, verbose=False, test=False, seed=None,
+                 record="cards", storage="lists"):
         """
         Parameters
         ----------
@@ -36,39 +182,91 @@ class Game:
             as the game progresses
         test: boolean value for whether or not this is a test run. This should
             only be used during unit tests
+        seed: seed for the deck's random number generator. Can be an integer,
+            a numpy SeedSequence, or a ShoeStream
+        record: how much data to record as the game is played. "none" records
+            nothing, "hands" records each player's hand history, "hits" also
+            records the results of every hit, and "cards" also records the
+            count data for every card delt
+        storage: where recorded data is kept. "lists" appends dictionaries to
+            each player's history and the game's hit_results and count_data
+            lists. "columns" stores it in typed arrays in game.recorder
         """
-        # game parameters
-        # make a copy of rules to avoid modifying the original dictionary
-        self.rules = copy.deepcopy(rules)
-        self.game_params = GameParams(array_first=True)
-        # update rules for the game
-        if self.rules:
-            if not isinstance(self.rules, dict):
-                raise TypeError("'rules' must be a dictionary.")
-            self._update_params(self.rules)
-        self.num_decks = self.game_params.num_decks
+        if record not in RECORD_LEVELS:
+            raise ValueError(f"'record' must be one of {RECORD_LEVELS}")
+        self.record = record
+        self._record_level = RECORD_LEVELS.index(record)
+        if storage not in ("lists", "columns"):
+            raise ValueError("'storage' must be 'lists' or 'columns'")
+        self.storage = storage
+        self.recorder = Recorder() if storage == "columns" else None
+        # game parameters. These are shared with every other game using the
+        # same rules, so they must not be adjusted
+        self._set_params(rules)
+        self._test = test
         self.deck = Deck(
-            self.num_decks, test=test, burn=self.game_params.burn, seed=seed
+            self.num_decks, test=test, burn=self.table_rules.burn, seed=seed
         )
-        self.count = 0
-        self.ten_count = 16 * self.num_decks  # count of tens seen
-        self.other_count = 36 * self.num_decks  # count of non-tens seens
-        self.true_count = 0
         self.player_list = players
+        # index of each player in player_list. Used when recording data
+        self._player_ids = {id(player): i for i, player in enumerate(players)}
+        # which of OPTIONAL_KWARGS each player function accepts
+        self._accepted_kwargs = {
+            func: _accepted_kwargs(func)
+            for player in players
+            for func in (player.strategy_func, player.wager_func,
+                         player.insurance_func)
+        }
         self.num_players = len(players)
-        assert 1 <= self.num_players <= self.game_params.max_players
+        assert 1 <= self.num_players <= self.table_rules.max_players
         self.verbose = verbose
+        self._reset_state()
 
-        # variables for data collection
-        self.hit_results = []
-        self.count_data = []
-        self.round_id = 1
+    def reset(self, seed=None):
+        """
+        Start the game over with the same rules, players, and deck. The
+        players get their starting bankrolls back, all recorded data is
+        cleared, and the deck goes back to the first shoe of its stream
+        Parameters
+        ----------
+        seed: if specified, the deck is reseeded with this seed instead of
+            replaying its stream
+        """
+        if seed is not None:
+            self.deck = Deck(
+                self.num_decks, test=self._test, burn=self.table_rules.burn,
+                seed=seed
+            )
+        else:
+            self.deck.reset(test=self._test)
+        for player in self.player_list:
+            player.reset()
+        self._reset_state()
 
-        # list to hold completed hands. Will be cleared after each round
-        self._completed_hands = []
-        # counter for the number of times a hand is split. Used to enforce max
-        # number of times a hand can be split
-        self._num_splits = 0
+    def with_rules(self, rules):
+        """
+        Return a new game with the same players and deck stream as this one,
+        but with updated rules. The new game starts from the beginning and the
+        players get their starting bankrolls back
+        Parameters
+        ----------
+        rules: dictionary of rule updates applied on top of this game's rules
+        """
+        if not isinstance(rules, dict):
+            raise TypeError("'rules' must be a dictionary.")
+        game = copy.copy(self)
+        game._set_params({**(self.rules or {}), **rules})
+        assert game.num_players <= game.table_rules.max_players
+        if (game.num_decks == self.num_decks
+                and game.table_rules.burn == self.table_rules.burn):
+            game.deck = self.deck.copy()
+        else:
+            game.deck = Deck(
+                game.num_decks, test=self._test, burn=game.table_rules.burn,
+                seed=self.deck.stream
+            )
+        game.reset()
+        return game
 
     def play_round(self):
         """
@@ -81,19 +279,32 @@ class Game:
         start_count = self.count
         start_ten_count = self.ten_count
         start_other_count = self.other_count
+        start_composition = self.composition
         self.deck.hands_played += 1
         hands = []  # holds all of the hands the players will play
-        min_bet = self.game_params.min_bet
-        max_bet = self.game_params.max_bet
+        min_bet = self.table_rules.min_bet
+        max_bet = self.table_rules.max_bet
+        # skip any players without a high enough bankroll
+        players = [
+            player for player in self.player_list
+            if player.bankroll >= self.table_rules.min_bet
+        ]
+        # break out of function if there are no more players with money
+        if players == []:
+            return "break"
+        # deal the first two cards to every player and the dealer at once.
+        # cards are counted in the order they would have been delt so we
+        # track how many cards would have been left in the deck
+        num_players = len(players)
+        num_cards = 2 * num_players + 2
+        cards = self.deck.deal_many(num_cards)
+        remaining = len(self.deck) + num_cards
         # deal first card to all players
-        for player in self.player_list:
-            # skip any players without a high enough bankroll
-            if player.bankroll < self.game_params.min_bet:
-                continue
-            card_one = self.deck.deal()
-            self._count(card_one)
+        for player, card_one in zip(players, cards):
+            remaining -= 1
+            self._count(card_one, remaining)
             hands.append(
-                Hand(
+                self._new_hand(
                     card_one,
                     player=player,
                     min_bet=min_bet,
@@ -101,43 +312,48 @@ class Game:
                     count=start_count,
                     ten_count=start_ten_count,
                     other_count=start_other_count,
-                    true_count=self.true_count,
-                    game_params=self.game_params,
+                    game_params=self.table_rules,
                     nsplits=self._num_splits,
+                    **self._optional_kwargs(
+                        player.wager_func, start_composition, self.true_count
+                    ),
                 )
             )
-        # break out of function if there are no more players with money
-        if hands == []:
-            return "break"
         # deal to dealer
-        card = self.deck.deal()
-        self._count(card)
-        dealer = Hand(card, dealer=True)
+        card = cards[num_players]
+        remaining -= 1
+        self._count(card, remaining)
+        dealer = self._new_hand(card, dealer=True)
         dealer_up = dealer.card_one
         # deal second card to all players
-        for hand in hands:
-            card_two = self.deck.deal()
-            self._count(card_two)
+        for hand, card_two in zip(hands, cards[num_players + 1:-1]):
+            remaining -= 1
+            self._count(card_two, remaining)
             hand.add_card_two(card_two)
             if hand.blackjack:
                 if self.verbose:
                     print("Blackjack!")
         # deal second card to dealer, but don't count until later
-        dealer.add_card_two(self.deck.deal())
+        dealer.add_card_two(cards[-1])
         if dealer.card_one.rank == 14:
-            if self.game_params.insurance_allowed:
+            if self.table_rules.insurance_allowed:
                 for hand in hands:
                     insurance = hand.player.insurance(
                         start_count=start_count,
                         count=self.count,
                         ten_count=self.ten_count,
                         other_count=self.other_count,
-                        game_params=self.game_params,
+                        game_params=self.table_rules,
+                        **self._optional_kwargs(
+                            hand.player.insurance_func, self.composition,
+                            self.true_count
+                        ),
                     )
                     setattr(hand, "insurance", insurance)
                     if insurance:
-                        payment = self.game_params.insurance_pct * hand.wager
-                        hand.player.bankroll -= payment
+                        hand.player._pay_insurance(
+                            self.table_rules.insurance_pct * hand.wager
+                        )
         if self.verbose:
             print(f"Dealer Up Card: {dealer.card_one}")
             print(f"Player Hands:")
@@ -189,57 +405,367 @@ class Game:
                     dealer_play = True
                     break
             if dealer_play:
-                stand_total = self.game_params.stand_total
-                soft_stand = self.game_params.soft_stand
-                if dealer.total >= stand_total:
-                    # logic for determining if a dealer plays soft hands
-                    if (dealer.total == stand_total) and dealer.soft:
-                        dealer_stand = soft_stand
-                    else:
-                        dealer_stand = True
-                else:
-                    dealer_stand = False
-                while not dealer_stand and not dealer.bust:
+                stands = self._dealer_stands
+                while not stands[dealer.state]:
                     card = self.deck.deal()
                     self._count(card)
                     dealer.add_card(card)
                     if self.verbose:
                         print(f"Dealer Draws: {card}")
                         print(f"New Dealer Total: {dealer.total}")
-                    if dealer.total >= stand_total:
-                        if (dealer.total == stand_total) and dealer.soft:
-                            dealer_stand = soft_stand
-                        else:
-                            dealer_stand = True
 
+        self._last_dealer = dealer
         self._compare(
             dealer,
-            self.game_params.payout,
-            self.game_params.blackjack_payout,
-            self.game_params.split_blackjack_payout,
+            self.table_rules.payout,
+            self.table_rules.blackjack_payout,
+            self.table_rules.split_blackjack_payout,
         )
-        # clear completed hands list
+        # clear completed hands list and keep this round's hands for reuse
         del self._completed_hands[:]
+        self._hand_pool.extend(self._round_hands)
+        del self._round_hands[:]
+        if self.recorder is not None:
+            self.recorder.end_round()
         # check if the deck should be shuffled
-        new_deck = self.deck.check_status(self.game_params.shuffle_freq)
+        new_deck = self.deck.check_status(self.table_rules.shuffle_freq)
         if new_deck:
             setattr(self, "count", 0)
             setattr(self, "ten_count", 16 * self.num_decks)
             setattr(self, "other_count", 36 * self.num_decks)
+            self._composition = list(full_shoe(self.num_decks))
 
             if self.verbose:
                 print("Shuffling deck")
         self.round_id += 1
 
-    def simulate(self, rounds):
+    def simulate(self, rounds=None, mode="reference", sink=None, workers=None,
+                 block_size=None, checkpoint=None, checkpoint_every=None,
+                 until_stderr=None, time_budget=None):
         """
         Simulate a given number of hands of blackjack. This method calls the
         play_round method for the number of rounds specified.
 
         Parameters
         ----------
-        rounds: number of rounds to be played
+        rounds: number of rounds to be played. Only required when neither
+            until_stderr nor time_budget is given, otherwise it's the most
+            rounds that will be played
+        mode: "reference" to play each round with play_round and show a
+            progress bar, or "fast" to play them with a streamlined version of
+            play_round that never prints anything. Both modes give the same
+            results for a given seed.
+        sink: optional py21.sink.Sink. If one is given, the recorded data is
+            written to it in chunks instead of being kept in memory. The
+            sink isn't closed so it can be used for more than one call.
+        workers: number of processes to play the rounds in. If specified,
+            the rounds are split into blocks that are played independently,
+            each with its own shoe stream and copies of the players starting
+            from their current bankrolls. The blocks are merged back in order,
+            so the results for a given seed are the same for any number of
+            workers. If a player's bankroll gets low enough to change what
+            they do in a block, for example because they run out of money,
+            the block is played again from the bankrolls they really have
+            before it's merged. If None, the rounds are played in this process
+            one after another.
+            The i-th block played with workers uses child stream i of the
+            game's seed rather than the stream the game plays on without
+            workers, so a given seed gives different results with workers
+            than with workers=None. Each block gives the same results as a
+            game without workers seeded with its stream.
+        block_size: number of rounds in each block when using workers. By
+            default it's picked from the number of rounds
+        checkpoint: path of a checkpoint file. The game is saved to it with
+            Game.checkpoint every checkpoint_every rounds and once the rounds
+            are done. If the file already exists, the game is resumed from it
+            first and only the rounds that are left are played, so running
+            the same simulation again after it's interrupted picks up where
+            it left off and gives the same results.
+        checkpoint_every: number of rounds between checkpoints. If None, the
+            game is only saved at the end
+        until_stderr: stop once the standard error of every player's house
+            edge is at most this. The house edge is estimated from the net
+            result and amount wagered in each round, so hands that are
+            correlated because they were split or played in the same round
+            are handled correctly. Shoes are assumed to be independent
+        time_budget: stop after playing for this many seconds
+        Returns
+        -------
+        A py21.summary.Precision with the estimates, the reason the
+        simulation stopped, and the confidence intervals reached if
+        until_stderr or time_budget is given, otherwise None
+        """
+        if mode not in ("reference", "fast"):
+            raise ValueError("'mode' must be 'reference' or 'fast'")
+        until = until_stderr is not None or time_budget is not None
+        if rounds is None and not until:
+            raise ValueError(
+                "'rounds' is required without 'until_stderr' or 'time_budget'"
+            )
+        if until and (workers is not None or checkpoint is not None):
+            raise ValueError(
+                "'until_stderr' and 'time_budget' can't be used with "
+                "'workers' or 'checkpoint'"
+            )
+        if until_stderr is not None and until_stderr <= 0:
+            raise ValueError("'until_stderr' must be positive")
+        if checkpoint_every is not None:
+            if checkpoint is None:
+                raise ValueError("'checkpoint_every' requires 'checkpoint'")
+            if checkpoint_every < 1:
+                raise ValueError("'checkpoint_every' must be at least 1")
+        if workers is not None:
+            if sink is not None:
+                raise ValueError("'sink' can't be used with 'workers'")
+            if checkpoint is not None:
+                raise ValueError("'checkpoint' can't be used with 'workers'")
+            self._simulate_blocks(rounds, mode, workers, block_size)
+            return
+
+        def play():
+            if until:
+                return self._simulate_until(rounds, mode, until_stderr,
+                                            time_budget)
+            self._simulate_from(rounds, mode, checkpoint, checkpoint_every,
+                                sink)
+
+        if sink is None:
+            return play()
+        recorder = self.recorder
+        self.recorder = Recorder(sink.chunk_size, sink=sink)
+        try:
+            precision = play()
+            self.recorder.finish()
+        finally:
+            self.recorder = recorder
+        sink.flush()
+        return precision
+
+    def checkpoint(self, path):
+        """
+        Save the state of the game to a file so it can be picked up later
+        with resume: the deck's shoe, position, and random state, the counts,
+        the round number, each player's bankroll and history, and the
+        recorded data. If the game is writing to a sink, the sink's files
+        are flushed and their sizes are saved instead of the data
+        Parameters
+        ----------
+        path: file to save the game to. It's replaced if it exists
+        """
+        self._save(path, None, 0)
+
+    def resume(self, path, sink=None):
+        """
+        Put the game back to the state saved in a checkpoint file. The game
+        must have the same rules, players, and record settings as the one
+        that was saved. The players' functions aren't saved, so they come
+        from this game's players
+        Parameters
+        ----------
+        path: file written by checkpoint
+        sink: the py21.sink.Sink the game was writing to when it was saved.
+            Its files are cut back to their sizes at the time
+        Returns
+        -------
+        The number of rounds the simulate call that saved the checkpoint had
+        played, or 0 if it was saved with checkpoint
+        """
+        with open(path, "rb") as f:
+            state = pickle.load(f)
+        return self._restore(state, path, sink)
+
+    def iter_rounds(self, rounds=None, mode="reference"):
+        """
+        Play rounds one at a time, yielding a RoundRecord after each one.
+        Rounds are played exactly as they are in simulate, so the results for
+        a given seed are the same. The generator stops early if every player
+        runs out of money.
+
+        Parameters
+        ----------
+        rounds: number of rounds to play. If None, rounds are played until
+            the generator is closed or the players run out of money
+        mode: "reference" or "fast". See simulate
+        """
+        if mode == "reference":
+            play_round = self.play_round
+        elif mode == "fast":
+            play_round = self._play_round_fast
+        else:
+            raise ValueError("'mode' must be 'reference' or 'fast'")
+        players = self.player_list
+        played = 0
+        while rounds is None or played < rounds:
+            round_id = self.round_id
+            count = self.count
+            ten_count = self.ten_count
+            other_count = self.other_count
+            true_count = self.true_count
+            start_bankrolls = [player.bankroll for player in players]
+            self._outcomes = outcomes = []
+            try:
+                if play_round():
+                    return
+            finally:
+                self._outcomes = None
+            dealer = self._last_dealer
+            yield RoundRecord(
+                round_id, count, ten_count, other_count, true_count,
+                dealer.card_one.value, dealer.total, dealer.blackjack,
+                dealer.bust, tuple(outcomes),
+                tuple(
+                    player.bankroll - start
+                    for player, start in zip(players, start_bankrolls)
+                ),
+            )
+            played += 1
+
+    # Start private methods
+
+    def _simulate_blocks(self, rounds, mode, workers, block_size):
+        """
+        Play the rounds in independent blocks spread across `workers`
+        processes and merge the results
+        """
+        if workers < 1:
+            raise ValueError("'workers' must be at least 1")
+        if block_size is None:
+            block_size = max(MIN_BLOCK_ROUNDS, -(-rounds // MAX_BLOCKS))
+        start_bankrolls = [player.bankroll for player in self.player_list]
+        blocks = [
+            self._block(
+                self.deck.stream.stream(self._num_blocks + i),
+                self.round_id + start, min(block_size, rounds - start),
+            )
+            for i, start in enumerate(range(0, rounds, block_size))
+        ]
+        self._num_blocks += len(blocks)
+        executor = None
+        if workers > 1:
+            executor = ProcessPoolExecutor(workers)
+            # only a few blocks are queued for each worker at a time, so a
+            # block that has to be played again doesn't wait behind all of
+            # the others
+            futures = deque(
+                executor.submit(_play_block, block)
+                for block in blocks[:BLOCK_QUEUE * workers]
+            )
+            queued = len(futures)
+        from tqdm import tqdm
+
+        try:
+            with tqdm(total=rounds, disable=mode == "fast") as progress:
+                for block in blocks:
+                    if executor is None:
+                        result = _play_block(block)
+                    else:
+                        result = futures.popleft().result()
+                        if queued < len(blocks):
+                            futures.append(
+                                executor.submit(_play_block, blocks[queued])
+                            )
+                            queued += 1
+                    block_starts = start_bankrolls
+                    if self._bankroll_binds(result[4], start_bankrolls):
+                        # a player could have run out of money or been held
+                        # back by their bankroll, so the block is played again
+                        # from the bankrolls the players really have now
+                        block_starts = [
+                            player.bankroll for player in self.player_list
+                        ]
+                        replay = self._block(*block[2:5])
+                        if executor is None:
+                            result = _play_block(replay)
+                        else:
+                            result = executor.submit(
+                                _play_block, replay
+                            ).result()
+                    self._merge_block(result, block_starts)
+                    progress.update(block[4])
+        finally:
+            if executor is not None:
+                executor.shutdown(cancel_futures=True)
+        self.round_id += rounds
+
+    def _block(self, stream, round_id, rounds):
+        """
+        Return the arguments _play_block needs to play `rounds` rounds with
+        shoes from `stream`, starting with round number `round_id`. The
+        players are copies that start with the bankrolls the players have
+        now and no history
+        """
+        players = []
+        for player in self.player_list:
+            block_player = copy.copy(player)
+            block_player.history = []
+            block_player.total_wagered = 0
+            if player.stats is not None:
+                block_player.stats = PlayerStats()
+            players.append(block_player)
+        return (players, self.rules, stream, round_id, rounds, self.record,
+                self.storage)
+
+    def _bankroll_binds(self, lows, start_bankrolls):
+        """
+        Whether a block that started with `start_bankrolls` and got as low
+        as `lows` could have been played differently from the bankrolls the
+        players have now
+        """
+        for player, low, block_start in zip(
+            self.player_list, lows, start_bankrolls
+        ):
+            limit = _safe_bankroll(player, self.table_rules)
+            if min(player.bankroll, block_start) + low - block_start < limit:
+                return True
+        return False
+
+    def _merge_block(self, result, start_bankrolls):
         """
+        Add the results of a block played by _play_block to the game. Each
+        block starts with the bankrolls in `start_bankrolls`, so the recorded
+        bankrolls and ROI are shifted to follow on from the blocks before it.
+        """
+        players, hit_results, count_data, recorder, _ = result
+        offsets = []
+        for player, block_player, block_start in zip(
+            self.player_list, players, start_bankrolls
+        ):
+            bankroll_offset = player.bankroll - block_start
+            offsets.append((bankroll_offset, player.total_wagered))
+            _shift_history(
+                block_player.history, bankroll_offset, player.total_wagered,
+                player.start_bankroll,
+            )
+            player.history.extend(block_player.history)
+            player.bankroll += block_player.bankroll - block_start
+            player.total_wagered += block_player.total_wagered
+            if player.stats is not None:
+                player.stats = player.stats.merge(block_player.stats)
+        self.hit_results.extend(hit_results)
+        self.count_data.extend(count_data)
+        if recorder is not None:
+            hands = recorder.hands.columns()
+            for player_id, player in enumerate(self.player_list):
+                bankroll_offset, wagered_offset = offsets[player_id]
+                rows = hands["player_id"] == player_id
+                hands["start_bankroll"][rows] += bankroll_offset
+                hands["end_bankroll"][rows] += bankroll_offset
+                hands["total_wagered"][rows] += wagered_offset
+                hands["roi"][rows] = (
+                    (hands["end_bankroll"][rows] - player.start_bankroll) /
+                    hands["total_wagered"][rows]
+                )
+            self.recorder.extend(recorder)
+
+    def _simulate(self, rounds, mode):
+        if mode == "fast":
+            play_round = self._play_round_fast
+            for i in range(rounds):
+                if play_round():
+                    break
+            return
+        from tqdm import tqdm
+
         for i in tqdm(range(rounds)):
             # break out of loop if all players run out of money
             holder = self.play_round()
@@ -247,23 +773,258 @@ class Game:
                 print(f"All player's out of money. {i} hands played.")
                 break
 
-    # Start private methods
+    def _simulate_from(self, rounds, mode, checkpoint, checkpoint_every, sink):
+        """
+        Play the rounds for simulate, saving checkpoints along the way and
+        resuming from an existing one
+        """
+        if checkpoint is None:
+            self._simulate(rounds, mode)
+            return
+        if sink is not None:
+            # fail before playing anything if the sink can't be resumed
+            sink._check_resumable()
+        played = 0
+        if os.path.exists(checkpoint):
+            with open(checkpoint, "rb") as f:
+                state = pickle.load(f)
+            if state["rounds"] not in (None, rounds):
+                raise ValueError(
+                    f"{checkpoint} was saved while simulating "
+                    f"{state['rounds']} rounds"
+                )
+            played = self._restore(state, checkpoint, sink)
+        if mode == "fast":
+            play_round = self._play_round_fast
+            remaining = range(played, rounds)
+        else:
+            from tqdm import tqdm
+
+            play_round = self.play_round
+            remaining = tqdm(range(played, rounds), initial=played,
+                             total=rounds)
+        for i in remaining:
+            if play_round():
+                if mode == "reference":
+                    print(f"All player's out of money. {i} hands played.")
+                break
+            if checkpoint_every is not None and (i + 1) % checkpoint_every == 0:
+                self._save(checkpoint, rounds, i + 1)
+        self._save(checkpoint, rounds, rounds)
 
-    def _update_params(self, rules):
+    def _simulate_until(self, rounds, mode, until_stderr, time_budget):
         """
-        Update the game parameters based on user input.
+        Play rounds for simulate until the house edge estimates are precise
+        enough, the time budget runs out, or `rounds` have been played
         """
-        allowed_params = self.game_params.specification().keys()
-        for param in rules.keys():
-            # ensure parameter is allowed
-            if param not in allowed_params:
-                similar = difflib.get_close_matches(param, allowed_params)
-                msg = (
-                    f"Unexpected parameter name {param}. Similar parameter(s) "
-                    f"are: {similar}"
+        players = self.player_list
+        precision = Precision(len(players))
+        estimates = precision.players
+        bankrolls = [player.bankroll for player in players]
+        wagered = [player.total_wagered for player in players]
+        if mode == "fast":
+            play_round = self._play_round_fast
+            progress = None
+        else:
+            from tqdm import tqdm
+
+            play_round = self.play_round
+            progress = tqdm(total=rounds)
+        start = time.perf_counter()
+        deadline = math.inf if time_budget is None else start + time_budget
+        played = 0
+        precision.reason = "rounds"
+        while rounds is None or played < rounds:
+            if play_round():
+                precision.reason = "bankroll"
+                if mode == "reference":
+                    print(f"All player's out of money. {played} hands played.")
+                break
+            played += 1
+            if progress is not None:
+                progress.update()
+            # net result and amount wagered by each player and the table
+            table_net = table_wagered = 0
+            for i, player in enumerate(players):
+                wager = player.total_wagered - wagered[i]
+                if wager:
+                    net = player.bankroll - bankrolls[i]
+                    estimates[i].add(net, wager)
+                    table_net += net
+                    table_wagered += wager
+                    bankrolls[i] = player.bankroll
+                    wagered[i] = player.total_wagered
+            precision.table.add(table_net, table_wagered)
+            if played % STOP_CHECK_ROUNDS:
+                continue
+            if time.perf_counter() >= deadline:
+                precision.reason = "time"
+                break
+            if (until_stderr is not None and played >= MIN_STOP_ROUNDS
+                    and precision.stderr <= until_stderr):
+                precision.reason = "stderr"
+                break
+        if progress is not None:
+            progress.close()
+        precision.seconds = time.perf_counter() - start
+        return precision
+
+    def _restore(self, state, path, sink):
+        """
+        Put the game back to a state loaded from a checkpoint file by resume
+        """
+        if state["version"] != CHECKPOINT_VERSION:
+            raise ValueError(f"{path} was saved by another version of py21")
+        if _rules_key(state["rules"] or {}) != _rules_key(self.rules or {}):
+            raise ValueError(f"{path} was saved by a game with other rules")
+        if len(state["players"]) != self.num_players:
+            raise ValueError(
+                f"{path} was saved by a game with {len(state['players'])} "
+                "players"
+            )
+        if (state["record"], state["storage"]) != (self.record, self.storage):
+            raise ValueError(
+                f"{path} was saved by a game with record={state['record']!r} "
+                f"and storage={state['storage']!r}"
+            )
+        if state["sink"] is not None:
+            if sink is None:
+                raise ValueError(
+                    f"{path} was saved while writing to a sink, so the sink "
+                    "must be given"
                 )
-                raise ValueError(msg)
-        self.game_params.adjust(rules)
+            sink.truncate(state["sink"])
+        elif state["recorder"] is not None:
+            self.recorder = state["recorder"]
+        self.deck.set_state(state["deck"])
+        for player, saved in zip(self.player_list, state["players"]):
+            for name, value in saved.items():
+                setattr(player, name, value)
+        for name, value in state["game"].items():
+            setattr(self, name, value)
+        return state["played"]
+
+    def _save(self, path, rounds, played):
+        """
+        Write a checkpoint. `rounds` and `played` are the number of rounds
+        the simulate call saving it is playing and has played
+        """
+        recorder = self.recorder
+        sink = None
+        if recorder is not None and recorder.sink is not None:
+            recorder.finish()
+            sink = recorder.sink.position()
+            recorder = None
+        state = {
+            "version": CHECKPOINT_VERSION,
+            "rules": self.rules,
+            "record": self.record,
+            "storage": self.storage,
+            "rounds": rounds,
+            "played": played,
+            "deck": self.deck.state(),
+            "players": [
+                {name: getattr(player, name) for name in PLAYER_STATE}
+                for player in self.player_list
+            ],
+            "game": {
+                "count": self.count,
+                "ten_count": self.ten_count,
+                "other_count": self.other_count,
+                "true_count": self.true_count,
+                "_composition": self._composition,
+                "round_id": self.round_id,
+                "_num_blocks": self._num_blocks,
+                "hit_results": self.hit_results,
+                "count_data": self.count_data,
+            },
+            "recorder": recorder,
+            "sink": sink,
+        }
+        # write to a temporary file first so an interruption never leaves a
+        # partly written checkpoint
+        tmp = f"{path}.tmp"
+        with open(tmp, "wb") as f:
+            pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, path)
+
+    @property
+    def composition(self):
+        """
+        Tuple with the number of cards of each value that haven't been seen
+        in the current shoe, in the same order as CARD_VALUES. Like the
+        counts, this includes the dealer's hole card until it's turned over
+        """
+        return tuple(self._composition)
+
+    # Start private methods
+
+    def _set_params(self, rules):
+        """
+        Look up the game parameters for a set of rules and the values derived
+        from them
+        """
+        # the rules are read from the snapshot while playing. The full
+        # GameParams object is still available in game_params
+        self.table_rules = load_rules(rules)
+        self.game_params = self.table_rules.params
+        # make a copy of rules to avoid modifying the original dictionary
+        self.rules = dict(rules) if rules else rules
+        self.num_decks = self.table_rules.num_decks
+        # whether or not the dealer stands in each hand state
+        self._dealer_stands = dealer_stands(
+            self.table_rules.stand_total, self.table_rules.soft_stand
+        )
+        # lookup tables for strategies used in fast mode. See _strategy_table
+        self._strategy_tables = {}
+
+    def _reset_state(self):
+        """
+        Set the counts and recorded data back to the start of a game
+        """
+        self.count = 0
+        self.ten_count = 16 * self.num_decks  # count of tens seen
+        self.other_count = 36 * self.num_decks  # count of non-tens seens
+        self.true_count = 0
+        # number of cards of each value that haven't been seen
+        self._composition = list(full_shoe(self.num_decks))
+
+        # variables for data collection
+        self.hit_results = []
+        self.count_data = []
+        self.round_id = 1
+        if self.recorder is not None:
+            self.recorder = Recorder()
+
+        # list to hold completed hands. Will be cleared after each round
+        self._completed_hands = []
+        # counter for the number of times a hand is split. Used to enforce max
+        # number of times a hand can be split
+        self._num_splits = 0
+        # hands used in the current round and hands from previous rounds that
+        # can be reused
+        self._round_hands = []
+        self._hand_pool = []
+        # outcome of each hand in the current round. Only collected while
+        # iter_rounds is running
+        self._outcomes = None
+        # the dealer's hand from the most recent round
+        self._last_dealer = None
+        # number of blocks played by simulate with workers. Each block uses
+        # its own child stream of the deck's stream
+        self._num_blocks = 0
+
+    def _new_hand(self, card_one, **kwargs):
+        """
+        Return a hand for the current round. Hands from previous rounds are
+        reused when possible. Takes the same arguments as the Hand class
+        """
+        if self._hand_pool:
+            hand = self._hand_pool.pop().reset(card_one, **kwargs)
+        else:
+            hand = Hand(card_one, **kwargs)
+        self._round_hands.append(hand)
+        return hand
 
     def _play_hand(
         self,
@@ -287,8 +1048,11 @@ class Game:
                 count=self.count,
                 ten_count=self.ten_count,
                 other_count=self.other_count,
-                true_count=self.true_count,
-                game_params=self.game_params,
+                game_params=self.table_rules,
+                **self._optional_kwargs(
+                    hand.player.strategy_func, self.composition,
+                    self.true_count
+                ),
             )
             if self.verbose:
                 print(f"Player action: {action}")
@@ -309,7 +1073,7 @@ class Game:
                 # create two new hands using original two cards
                 hand_one_card = hand.card_one
                 hand_two_card = hand.cards[1]
-                hand_one = Hand(
+                hand_one = self._new_hand(
                     hand_one_card,
                     from_split=True,
                     player=hand.player,
@@ -320,11 +1084,11 @@ class Game:
                     ten_count=start_ten_count,
                     other_count=start_other_count,
                     true_count=self.true_count,
-                    game_params=self.game_params,
+                    game_params=self.table_rules,
                     split_wager=hand.wager,
                     nsplits=self._num_splits,
                 )
-                hand_two = Hand(
+                hand_two = self._new_hand(
                     hand_two_card,
                     from_split=True,
                     player=hand.player,
@@ -335,7 +1099,7 @@ class Game:
                     ten_count=start_ten_count,
                     other_count=start_other_count,
                     true_count=self.true_count,
-                    game_params=self.game_params,
+                    game_params=self.table_rules,
                     split_wager=hand.wager,
                     nsplits=self._num_splits,
                 )
@@ -348,7 +1112,7 @@ class Game:
                 hand_one.add_card_two(card_two)
                 if self.verbose:
                     print(f"New Hand: {hand_one.cards[0]}{card_two}")
-                if from_aces and not self.game_params.hit_split_aces:
+                if from_aces and not self.table_rules.hit_split_aces:
                     setattr(hand_one, "stand", True)
                 self._play_hand(
                     hand_one,
@@ -368,7 +1132,7 @@ class Game:
                 hand_two.add_card_two(card_two)
                 if self.verbose:
                     print(f"New Hand: {hand_two.cards[0]}{card_two}")
-                if from_aces and not self.game_params.hit_split_aces:
+                if from_aces and not self.table_rules.hit_split_aces:
                     setattr(hand_two, "stand", True)
                 self._play_hand(
                     hand_two,
@@ -396,7 +1160,7 @@ class Game:
                 # card yet and if the game rules allow
                 if len(hand) > 2:
                     raise ValueError("Cannot surrender after taking a card")
-                if not self.game_params.surrender_allowed:
+                if not self.table_rules.surrender_allowed:
                     raise ValueError("Surrendering is not allowed")
                 if self.verbose:
                     print("Surrendering")
@@ -421,7 +1185,12 @@ class Game:
                 hit_data["new_total"] = hand.total
                 card_received_value = hit_data["new_total"] - hit_data["start_total"]
                 hit_data["card_received_value"] = card_received_value
-                self.hit_results.append(hit_data)
+                if self._record_level < 2:
+                    pass
+                elif self.recorder is not None:
+                    self._record_hit(hit_data)
+                else:
+                    self.hit_results.append(hit_data)
                 if self.verbose:
                     print(f"Card Received: {card}")
                     print(f"New Total: {hand.total}")
@@ -429,6 +1198,326 @@ class Game:
         if not hand.split:
             self._completed_hands.append(hand)
 
+    def _play_round_fast(self):
+        """
+        Play a single round of blackjack. This follows the same logic as
+        play_round, but without any of the printing, and it settles each hand
+        directly. Cards are delt and player functions are called in exactly
+        the same order, so both methods give the same results.
+        """
+        params = self.table_rules
+        deck = self.deck
+        count = self._count
+        new_hand = self._new_hand
+        start_count = self.count
+        start_ten_count = self.ten_count
+        start_other_count = self.other_count
+        start_composition = self.composition
+        deck.hands_played += 1
+        min_bet = params.min_bet
+        max_bet = params.max_bet
+        players = [
+            player for player in self.player_list if player.bankroll >= min_bet
+        ]
+        if not players:
+            return "break"
+        num_players = len(players)
+        num_cards = 2 * num_players + 2
+        cards = deck.deal_many(num_cards)
+        remaining = len(deck) + num_cards
+        hands = []
+        for player, card_one in zip(players, cards):
+            remaining -= 1
+            count(card_one, remaining)
+            hands.append(
+                new_hand(
+                    card_one, player=player, min_bet=min_bet, max_bet=max_bet,
+                    count=start_count, ten_count=start_ten_count,
+                    other_count=start_other_count, game_params=params,
+                    nsplits=self._num_splits,
+                    **self._optional_kwargs(
+                        player.wager_func, start_composition, self.true_count
+                    ),
+                )
+            )
+        remaining -= 1
+        dealer_up = cards[num_players]
+        count(dealer_up, remaining)
+        dealer = new_hand(dealer_up, dealer=True)
+        for hand, card_two in zip(hands, cards[num_players + 1:-1]):
+            remaining -= 1
+            count(card_two, remaining)
+            hand.add_card_two(card_two)
+        hole_card = cards[-1]
+        dealer.add_card_two(hole_card)
+        if dealer_up.rank == 14 and params.insurance_allowed:
+            insurance_pct = params.insurance_pct
+            for hand in hands:
+                insurance = hand.player.insurance(
+                    start_count=start_count, count=self.count,
+                    ten_count=self.ten_count, other_count=self.other_count,
+                    game_params=params,
+                    **self._optional_kwargs(
+                        hand.player.insurance_func, self.composition,
+                        self.true_count
+                    ),
+                )
+                hand.insurance = insurance
+                if insurance:
+                    hand.player._pay_insurance(insurance_pct * hand.wager)
+        completed = self._completed_hands
+        if dealer.blackjack:
+            count(hole_card)
+            completed.extend(hands)
+        else:
+            up_value = dealer_up.value
+            for hand_id, hand in enumerate(hands, 1):
+                self._play_hand_fast(
+                    hand, up_value, min_bet, max_bet, hand_id, start_count,
+                    start_ten_count, start_other_count,
+                )
+                self._num_splits = 0
+            count(hole_card)
+            for hand in completed:
+                if not hand.bust and not hand.blackjack and not hand.surrender:
+                    deal = deck.deal
+                    stands = self._dealer_stands
+                    add_card = dealer.add_card
+                    while not stands[dealer.state]:
+                        card = deal()
+                        count(card)
+                        add_card(card)
+                    break
+
+        self._last_dealer = dealer
+        # settle up every hand
+        payout = params.payout
+        blackjack_payout = params.blackjack_payout
+        split_bj_payout = params.split_blackjack_payout
+        surrender_pct = params.surrender_pct
+        dealer_total = dealer.total
+        dealer_bust = dealer.bust
+        dealer_blackjack = dealer.blackjack
+        record_hands = self._record_level >= 1
+        recorder = self.recorder
+        outcomes = self._outcomes
+        if record_hands and recorder is None:
+            additional_data = {
+                "round_id": self.round_id,
+                "dealer_blackjack": int(dealer_blackjack),
+                "dealer_up": dealer_up.value,
+                "dealer_cards": " ".join([str(card) for card in dealer.cards]),
+            }
+        for hand_id, hand in enumerate(completed, 1):
+            if hand.bust:
+                result = "loss"
+            elif hand.surrender:
+                result = "surrender"
+            elif dealer_bust or hand.total > dealer_total:
+                result = "win"
+            elif hand.total < dealer_total:
+                result = "loss"
+            else:
+                result = "push"
+            player = hand.player
+            # wagers are recorded, and paid out, as integers
+            wager = int(hand.wager)
+            start_bankroll = player.bankroll + wager
+            player._payoff(
+                wager, result, hand.blackjack, hand.from_split,
+                hand.insurance, dealer_blackjack, payout, blackjack_payout,
+                split_bj_payout, surrender_pct, hand.double_down,
+            )
+            if outcomes is not None:
+                outcomes.append(HandOutcome(
+                    self._player_ids[id(player)], hand_id, hand.total, wager,
+                    hand.blackjack, result
+                ))
+            if not record_hands:
+                continue
+            if recorder is not None:
+                self._record_hand(hand, hand_id, dealer, result, start_bankroll)
+                continue
+            if not player.record_history:
+                continue
+            hand_data = hand.summary_data()
+            hand_data.update(additional_data)
+            hand_data["hand_id"] = hand_id
+            hand_data["dealer_total"] = dealer_total
+            hand_data["start_bankroll"] = start_bankroll
+            hand_data["result"] = result
+            hand_data["end_bankroll"] = player.bankroll
+            hand_data["roi"] = player.roi
+            player.history.append(hand_data)
+
+        del completed[:]
+        self._hand_pool.extend(self._round_hands)
+        del self._round_hands[:]
+        if recorder is not None:
+            recorder.end_round()
+        if deck.check_status(params.shuffle_freq):
+            self.count = 0
+            self.ten_count = 16 * self.num_decks
+            self.other_count = 36 * self.num_decks
+            self._composition = list(full_shoe(self.num_decks))
+        self.round_id += 1
+
+    def _play_hand_fast(self, hand, dealer_up, min_bet, max_bet, hand_id,
+                        start_count, start_ten_count, start_other_count):
+        """
+        Play a hand to completion using the same logic as _play_hand
+        """
+        player = hand.player
+        strategy_func = player.strategy_func
+        strategy_table = self._strategy_table(strategy_func, player)
+        params = self.table_rules
+        deck = self.deck
+        while not hand.stand and not hand.bust and not hand.surrender:
+            if hand.blackjack:
+                action = "STAND"
+            else:
+                action = None
+                mask = hand.valid_mask
+                if strategy_table is not None:
+                    # two card pairs are looked up by the value of the pair
+                    table, action_names = strategy_table
+                    cards = hand.cards
+                    pair = 0
+                    if len(cards) == 2 and cards[0] == cards[1]:
+                        pair = cards[0].value
+                    code = table.item(
+                        dealer_up, hand.state, pair, int(hand.from_split), mask
+                    )
+                    if code >= 0:
+                        action = action_names[code]
+                if action is None:
+                    action = strategy_func(
+                        player=player, hand=hand, dealer_up=dealer_up,
+                        game_params=params, start_count=start_count,
+                        count=self.count, ten_count=self.ten_count,
+                        other_count=self.other_count,
+                        **self._optional_kwargs(
+                            strategy_func, self.composition, self.true_count
+                        ),
+                    ).upper()
+                if not ACTION_FLAGS.get(action, 0) & mask:
+                    player._raise_error(action, hand, params)
+            if action == "STAND":
+                hand.stand = True
+                break
+            elif action == "HIT":
+                pass
+            elif action == "DOUBLE":
+                hand.double_down = True
+                hand.stand = True
+                player.bankroll -= hand.wager
+                player.total_wagered += hand.wager
+                hand.wager *= 2
+            elif action == "SURRENDER":
+                if len(hand) > 2:
+                    raise ValueError("Cannot surrender after taking a card")
+                if not params.surrender_allowed:
+                    raise ValueError("Surrendering is not allowed")
+                hand.surrender = True
+                continue
+            elif action == "SPLIT":
+                self._num_splits += 1
+                hand.split = True
+                from_aces = hand.card_one.rank == 14
+                player.bankroll += hand.wager
+                player.total_wagered -= hand.wager
+                split_hands = [
+                    self._new_hand(
+                        card, from_split=True, player=player, min_bet=min_bet,
+                        max_bet=max_bet, start_count=start_count,
+                        count=start_count, ten_count=start_ten_count,
+                        other_count=start_other_count,
+                        true_count=self.true_count, game_params=params,
+                        split_wager=hand.wager, nsplits=self._num_splits,
+                    )
+                    for card in hand.cards[:2]
+                ]
+                for split_hand in split_hands:
+                    card_two = deck.deal()
+                    self._count(card_two)
+                    split_hand.add_card_two(card_two)
+                    if from_aces and not params.hit_split_aces:
+                        split_hand.stand = True
+                    self._play_hand_fast(
+                        split_hand, dealer_up, min_bet, max_bet, hand_id,
+                        start_count, start_ten_count, start_other_count,
+                    )
+                break
+            # hit or double down
+            start_total = hand.total
+            pre_count = self.count
+            pre_ten_count = self.ten_count
+            pre_other_count = self.other_count
+            pre_true_count = self.true_count
+            soft = hand.soft
+            card = deck.deal()
+            self._count(card)
+            hand.add_card(card)
+            if self._record_level < 2:
+                continue
+            if self.recorder is not None:
+                self.recorder.hits.append((
+                    self.round_id, hand_id, HIT_ACTION_CODES[action], soft,
+                    start_total, pre_count, pre_ten_count, pre_other_count,
+                    pre_true_count, card.rank, hand.total - start_total,
+                    hand.total,
+                ))
+                continue
+            self.hit_results.append(
+                {
+                    "start_total": start_total,
+                    "start_count": pre_count,
+                    "start_ten_count": pre_ten_count,
+                    "start_other_count": pre_other_count,
+                    "round_id": self.round_id,
+                    "hand_id": hand_id,
+                    "action": action,
+                    "soft": int(soft),
+                    "start_true_count": pre_true_count,
+                    "card_received_rank": card.rank,
+                    "new_total": hand.total,
+                    "card_received_value": hand.total - start_total,
+                }
+            )
+        if not hand.split:
+            self._completed_hands.append(hand)
+
+    def _optional_kwargs(self, func, composition, true_count):
+        """
+        Return the keyword arguments from OPTIONAL_KWARGS to call a player
+        function with. Functions that weren't known when the game was created
+        are checked the first time they're called
+        """
+        accepted = self._accepted_kwargs.get(func)
+        if accepted is None:
+            accepted = self._accepted_kwargs[func] = _accepted_kwargs(func)
+        values = {"composition": composition, "true_count": true_count}
+        return {name: values[name] for name in accepted}
+
+    def _strategy_table(self, strategy_func, player):
+        """
+        Return the lookup table py21.vector compiles for a strategy and the
+        action for each code in it, or None if the strategy can't be compiled.
+        Hands the table has no entry for are played by calling the strategy
+        """
+        if strategy_func in self._strategy_tables:
+            return self._strategy_tables[strategy_func]
+        from py21.vector import (
+            is_table_strategy, compiled_strategy, ACTION_NAMES
+        )
+
+        strategy_table = None
+        if is_table_strategy(strategy_func):
+            table, _ = compiled_strategy(player, self.table_rules)
+            strategy_table = (table, ACTION_NAMES)
+        self._strategy_tables[strategy_func] = strategy_table
+        return strategy_table
+
     def _compare(self, dealer, payout, blackjack_payout, split_bj_payout):
         """
         Function to compare the dealer to each hand in hands and settle up
@@ -439,9 +1528,7 @@ class Game:
             "dealer_up": dealer.card_one.value,
             "dealer_cards": " ".join([str(card) for card in dealer.cards]),
         }
-        for hand in self._completed_hands:
-            hand_data = {**hand.summary_data(), **additional_data}
-            hand_data["hand_id"] = self._completed_hands.index(hand) + 1
+        for hand_id, hand in enumerate(self._completed_hands):
             # skip split hands
             if hand.split:
                 continue
@@ -449,94 +1536,126 @@ class Game:
                 print(f"Player Total: {hand.total}")
                 print(f"Dealer Total: {dealer.total}")
             if hand.bust:
-                hand.player.settle_up(
-                    hand_data,
-                    dealer.total,
-                    "loss",
-                    payout,
-                    blackjack_payout,
-                    dealer.blackjack,
-                    split_bj_payout,
-                    self.game_params.surrender_pct,
-                )
+                result = "loss"
             elif hand.surrender:
-                hand.player.settle_up(
-                    hand_data,
-                    dealer.total,
-                    "surrender",
-                    payout,
-                    blackjack_payout,
-                    dealer.blackjack,
-                    split_bj_payout,
-                    self.game_params.surrender_pct,
-                )
+                result = "surrender"
             elif dealer.bust:
-                hand.player.settle_up(
-                    hand_data,
-                    dealer.total,
-                    "win",
-                    payout,
-                    blackjack_payout,
-                    dealer.blackjack,
-                    split_bj_payout,
-                    self.game_params.surrender_pct,
-                )
+                result = "win"
             elif hand > dealer:
-                hand.player.settle_up(
-                    hand_data,
-                    dealer.total,
-                    "win",
-                    payout,
-                    blackjack_payout,
-                    dealer.blackjack,
-                    split_bj_payout,
-                    self.game_params.surrender_pct,
-                )
+                result = "win"
             elif hand < dealer:
+                result = "loss"
+            else:
+                if self.verbose:
+                    print("Push")
+                result = "push"
+            if self._record_level >= 1 and self.recorder is None:
+                hand_data = {**hand.summary_data(), **additional_data}
+                hand_data["hand_id"] = hand_id + 1
                 hand.player.settle_up(
                     hand_data,
                     dealer.total,
-                    "loss",
+                    result,
                     payout,
                     blackjack_payout,
                     dealer.blackjack,
                     split_bj_payout,
-                    self.game_params.surrender_pct,
+                    self.table_rules.surrender_pct,
                 )
             else:
-                if self.verbose:
-                    print("Push")
-                hand.player.settle_up(
-                    hand_data,
-                    dealer.total,
-                    "push",
+                start_bankroll = hand.player.bankroll + int(hand.wager)
+                hand.player._payoff(
+                    int(hand.wager),
+                    result,
+                    hand.blackjack,
+                    hand.from_split,
+                    hand.insurance,
+                    dealer.blackjack,
                     payout,
                     blackjack_payout,
-                    dealer.blackjack,
                     split_bj_payout,
-                    self.game_params.surrender_pct,
+                    self.table_rules.surrender_pct,
+                    hand.double_down,
                 )
+                if self._record_level >= 1:
+                    self._record_hand(
+                        hand, hand_id + 1, dealer, result, start_bankroll
+                    )
+            if self._outcomes is not None:
+                self._outcomes.append(HandOutcome(
+                    self._player_ids[id(hand.player)], hand_id + 1,
+                    hand.total, int(hand.wager), hand.blackjack, result
+                ))
             if self.verbose:
                 print(f"Player Bankroll: {hand.player.bankroll}\n")
 
-    def _count(self, card):
+    def _record_hand(self, hand, hand_id, dealer, result, start_bankroll):
+        """
+        Record a settled hand in self.recorder
+        """
+        player = hand.player
+        cards = hand.cards
+        self.recorder.record_hand(
+            (
+                self.round_id, hand_id, self._player_ids[id(player)],
+                hand.total, hand.soft, hand.from_split, hand.blackjack,
+                len(cards), cards[0].value + cards[1].value, cards[0].rank,
+                cards[0].value, cards[1].rank, cards[1].value,
+                int(hand.wager), hand.insurance, hand.surrender,
+                hand.double_down, hand.num_aces, hand.num_hard_aces,
+                dealer.card_one.value, dealer.total, dealer.blackjack,
+                RESULT_CODES[result], start_bankroll, player.bankroll,
+                player.total_wagered, player.roi,
+            ),
+            cards,
+        )
+
+    def _record_hit(self, hit_data):
+        """
+        Record the data for a hit in self.recorder
+        """
+        self.recorder.hits.append((
+            hit_data["round_id"], hit_data["hand_id"],
+            HIT_ACTION_CODES[hit_data["action"]], hit_data["soft"],
+            hit_data["start_total"], hit_data["start_count"],
+            hit_data["start_ten_count"], hit_data["start_other_count"],
+            hit_data["start_true_count"], hit_data["card_received_rank"],
+            hit_data["card_received_value"], hit_data["new_total"],
+        ))
+
+    def _count(self, card, remaining=None):
         """
         Count cards as they're delt
+        Parameters
+        ----------
+        card: the card being counted
+        remaining: number of cards left in the deck after the card was delt.
+            Defaults to the current size of the deck
         """
         pre_count = self.count
         pre_ten_count = self.ten_count
         pre_true_count = self.true_count
         pre_other_count = self.other_count
-        if 2 <= card.value <= 6:
-            self.count += 1
-        elif card.value == 10:
-            self.count -= 1
-            self.ten_count -= 1
-        if card.value != 10:
-            self.other_count -= 1
+        count_change, ten_change, other_change = COUNT_CHANGES[card.value]
+        self.count += count_change
+        self.ten_count += ten_change
+        self.other_count += other_change
+        # card values start at 2
+        self._composition[card.value - 2] -= 1
         # update true count
-        remaining_decks = len(self.deck) / 52
+        if remaining is None:
+            remaining = len(self.deck)
+        remaining_decks = remaining / 52
         self.true_count = self.count / remaining_decks
+        if self._record_level < 3:
+            return
+        if self.recorder is not None:
+            self.recorder.counts.append((
+                pre_count, self.count, pre_ten_count, self.ten_count,
+                pre_true_count, self.true_count, pre_other_count,
+                self.other_count, card.value,
+            ))
+            return
         self.count_data.append(
             {
                 "pre_count": pre_count,
@@ -550,3 +1669,87 @@ class Game:
                 "card_value": card.value,
             }
         )
+
+
+def _accepted_kwargs(func):
+    """
+    Return which of OPTIONAL_KWARGS a player function can be called with
+    """
+    try:
+        parameters = inspect.signature(func).parameters.values()
+    except (TypeError, ValueError):
+        # callables without a signature get everything
+        return OPTIONAL_KWARGS
+    if any(param.kind is param.VAR_KEYWORD for param in parameters):
+        return OPTIONAL_KWARGS
+    names = {param.name for param in parameters}
+    return tuple(name for name in OPTIONAL_KWARGS if name in names)
+
+
+def _play_block(block):
+    """
+    Play one block of rounds for Game.simulate with workers. This is run in
+    the worker processes.
+    """
+    players, rules, stream, round_id, rounds, record, storage = block
+    game = Game(players, rules=rules, seed=stream, record=record,
+                storage=storage)
+    game.round_id = round_id
+    # lowest bankroll each player had at the start of a round, used to tell
+    # whether the block depended on the bankrolls it started with
+    lows = [player.bankroll for player in players]
+    play_round = game._play_round_fast
+    for _ in range(rounds):
+        for i, player in enumerate(players):
+            if player.bankroll < lows[i]:
+                lows[i] = player.bankroll
+        if play_round():
+            break
+    if game.recorder is not None:
+        for table in game.recorder.tables.values():
+            table.flush()
+    return players, game.hit_results, game.count_data, game.recorder, lows
+
+
+def _safe_bankroll(player, rules):
+    """
+    Smallest bankroll that can't change anything a player does in a round:
+    the most they can bet after splitting to the limit, doubling every hand,
+    and taking insurance. Players with a flat wager always bet the same
+    amount, and any other wager could be as high as the maximum bet
+    """
+    wager = rules.max_bet
+    if player.wager_func is minimum_bet:
+        wager = rules.min_bet
+    insurance = 0
+    if (rules.insurance_allowed
+            and player.insurance_func is not decline_insurance):
+        insurance = rules.insurance_pct
+    return wager * (2 * (rules.max_split_hands + 1) + insurance)
+
+
+def _shift_history(history, bankroll_offset, wagered_offset, start_bankroll):
+    """
+    Shift the bankrolls in a player's history by bankroll_offset and
+    recalculate their ROI as if wagered_offset had been wagered before the
+    first hand
+    """
+    # every wager in a round is made before any hand is settled, so the total
+    # wagered when a hand is settled includes every hand in its round
+    round_wagers = {}
+    for hand_data in history:
+        round_id = hand_data["round_id"]
+        round_wagers[round_id] = (
+            round_wagers.get(round_id, 0) + hand_data["wager"]
+        )
+    total_wagered = wagered_offset
+    last_round = None
+    for hand_data in history:
+        if hand_data["round_id"] != last_round:
+            last_round = hand_data["round_id"]
+            total_wagered += round_wagers[last_round]
+        hand_data["start_bankroll"] += bankroll_offset
+        hand_data["end_bankroll"] += bankroll_offset
+        hand_data["roi"] = (
+            (hand_data["end_bankroll"] - start_bankroll) / total_wagered
+        )
@@ -1,12 +1,21 @@
 """
 Hand class definition
 """
+from py21.actions import HIT, STAND, SURRENDER, DOUBLE, SPLIT, ACTION_LISTS
 from py21.card import Card
+from py21.handstate import EMPTY_HAND, TRANSITIONS
 from py21.player import Player
 
 
 class Hand:
 
+    __slots__ = (
+        "card_one", "player", "wager", "cards", "split", "soft", "stand",
+        "bust", "blackjack", "from_split", "insurance", "total", "surrender",
+        "double_down", "game_params", "nsplits", "dealer", "num_aces",
+        "state", "_valid_mask"
+    )
+
     def __init__(self, card_one, from_split=False, player=None,
                  game_params=None, nsplits=0, dealer=False, **kwargs):
         """
@@ -21,40 +30,51 @@ class Hand:
                     a pair
         player: an instance of a player object that represents which player
                 was delt this hand
+        game_params: Rules snapshot for the game the hand is played in
+        nsplits: number of times the hand has been split
+        dealer: boolean indicator for if this is the dealer's hand
         **kwargs: arguments that get passed to functions called in the hand
                   class such as the wager function of the player
         """
-        if isinstance(card_one, Card):
-            self.card_one = card_one
-        else:
-            raise TypeError("'card_one' must be a Card object.")
+        self.reset(card_one, from_split, player, game_params, nsplits, dealer,
+                   **kwargs)
 
+    def reset(self, card_one, from_split=False, player=None,
+              game_params=None, nsplits=0, dealer=False, **kwargs):
+        """
+        Start the hand over with a new first card. This allows the Game class
+        to reuse hands from previous rounds instead of creating new ones. It
+        takes the same arguments as creating a new hand.
+        """
+        if not isinstance(card_one, Card):
+            raise TypeError("'card_one' must be a Card object.")
+        self.card_one = card_one
+        self.player = player
+        self.wager = 0
         if player:
-            if isinstance(player, Player):
-                self.player = player
-            else:
+            if not isinstance(player, Player):
                 raise TypeError("'player' must be a Player object.")
-            self.wager = self.player.wager(**kwargs)
+            self.wager = player.wager(**kwargs)
         self.cards = [card_one]
         self.split = False
-        self.soft = card_one.rank == 14
+        # state of the hand from py21.handstate
+        self.state, self.total, self.soft, _, _ = (
+            TRANSITIONS[EMPTY_HAND][card_one.value]
+        )
         self.stand = False
         self.bust = False
         self.blackjack = False
         self.from_split = from_split
         self.insurance = False
-        self.total = card_one.value
         self.surrender = False
         self.double_down = False
         self.game_params = game_params
         self.nsplits = nsplits
         self.dealer = dealer
-        # this is used to determine whether to add 11 or 1 when delt an ace
-        self.non_ace_total = 0
         self.num_aces = 1 * self.soft
-        self.num_hard_aces = self.num_aces
-
-        self.valid_actions = None
+        # valid actions are only found once they're needed
+        self._valid_mask = None
+        return self
 
     def add_card_two(self, card):
         """
@@ -71,28 +91,36 @@ class Hand:
             raise TypeError("'card' must be a card object.")
         # append new card to list of cards in the hand
         self.cards.append(card)
-        self.total = card + self.total
-        # aces require a little more work
+        self.state, self.total, self.soft, self.bust, _ = (
+            TRANSITIONS[self.state][card.value]
+        )
         if card.rank == 14:
-            self.soft = True
             self.num_aces += 1
-            self.num_hard_aces += 1
-        # account for soft hands
-        if self.total > 21 and self.soft:
-            self.total -= 10
-            self.num_hard_aces -= 1
-            self.soft = False
-            # catch the edge case where you're delt 12+ aces
-            if self.total > 21:
-                self.total -= 10
-                self.num_hard_aces -= 1
-                self.soft = False
-            if self.num_hard_aces > 0:
-                self.soft = True
-        if self.total > 21:
-            self.bust = True
-        if not self.dealer:
-            self._valid_actions()
+        self._valid_mask = None
+
+    @property
+    def valid_mask(self):
+        """
+        Bitmask of the actions that can be taken with the hand. Use the flags
+        in py21.actions to check for a specific action.
+        """
+        if self._valid_mask is None:
+            self._valid_mask = self._valid_actions()
+        return self._valid_mask
+
+    @property
+    def num_hard_aces(self):
+        """
+        Number of aces being counted as eleven
+        """
+        return int(self.soft)
+
+    @property
+    def valid_actions(self):
+        """
+        List of all the actions that can be taken with the hand
+        """
+        return ACTION_LISTS[self.valid_mask]
 
     def summary_data(self):
         """
@@ -128,28 +156,28 @@ class Hand:
 
     def _valid_actions(self):
         """
-        Find all of the valid actions that can be taken with the hand
+        Find the bitmask for all of the valid actions that can be taken with
+        the hand
         """
         # hitting and standing are always allowed
-        valid = ["HIT", "STAND"]
+        valid = HIT | STAND
         # splits, doubling down, and surrendering can only be done with two cards
-        if len(self.cards) == 2:
-            # first check for surrendering
-            if self.game_params.surrender_allowed:
-                valid.append("SURRENDER")
-                if self.from_split and not self.game_params.surrender_after_split:
-                    valid.remove("SURRENDER")
+        if len(self.cards) != 2:
+            return valid
+        game_params = self.game_params
+        # first check for surrendering
+        if game_params.surrender_allowed:
+            if not self.from_split or game_params.surrender_after_split:
+                valid |= SURRENDER
+        if self.player.bankroll >= self.wager:
             # doubling down
-            if self.player.bankroll >= self.wager:
-                valid.append("DOUBLE")
-                if self.from_split and not self.game_params.double_after_split:
-                    valid.remove("DOUBLE")
+            if not self.from_split or game_params.double_after_split:
+                valid |= DOUBLE
             # splitting
-            if (self.cards[0] == self.cards[1]) and (self.player.bankroll >= self.wager):
-                valid.append("SPLIT")
-                if self.nsplits >= self.game_params.max_split_hands:
-                    valid.remove("SPLIT")
-        setattr(self, "valid_actions", valid)
+            if self.cards[0] == self.cards[1]:
+                if self.nsplits < game_params.max_split_hands:
+                    valid |= SPLIT
+        return valid
 
     def __gt__(self, other):
         if not isinstance(other, Hand):
@@ -0,0 +1,103 @@
+"""
+Precomputed hand state transitions.
+
+Everything needed to score a hand can be reduced to a small state: the total,
+whether or not the total is soft, and the number of cards (one, two, or three
+or more). States are encoded as integers so they can be used as list indices
+or dictionary keys. Adding a card to a hand is a single lookup:
+
+    state, total, soft, bust, blackjack = TRANSITIONS[state][card.value]
+
+Hands start in EMPTY_HAND before their first card is added.
+"""
+
+# card values that can be added to a hand. Aces have a value of 11
+CARD_VALUES = (2, 3, 4, 5, 6, 7, 8, 9, 10, 11)
+# the highest possible total is a hard 21 plus a ten
+MAX_TOTAL = 31
+NUM_STATES = 4 * 2 * (MAX_TOTAL + 1)
+
+
+def encode(total, soft, num_cards):
+    """
+    Return the integer state for a hand
+    Parameters
+    ----------
+    total: total of the hand
+    soft: whether or not the total is soft
+    num_cards: number of cards in the hand. Every hand with three or more
+        cards is in the same state
+    """
+    return (min(num_cards, 3) * 2 + bool(soft)) * (MAX_TOTAL + 1) + total
+
+
+def decode(state):
+    """
+    Return the total, whether the total is soft, and the number of cards
+    (capped at three) for a state
+    """
+    total = state % (MAX_TOTAL + 1)
+    rest = state // (MAX_TOTAL + 1)
+    return total, bool(rest % 2), rest // 2
+
+
+def _transition(state, value):
+    """
+    Find the state a hand moves to when a card with the given value is added
+    """
+    total, soft, num_cards = decode(state)
+    if num_cards == 0:
+        new_total = value
+        new_soft = value == 11
+    else:
+        # count every ace as one, then count one ace as eleven if it doesn't
+        # bust the hand
+        hard_total = total - 10 * soft + (1 if value == 11 else value)
+        new_soft = (soft or value == 11) and hard_total + 10 <= 21
+        new_total = hard_total + 10 * new_soft
+    bust = new_total > 21
+    blackjack = num_cards == 1 and new_total == 21
+    new_state = encode(new_total, new_soft, num_cards + 1)
+    return new_state, new_total, new_soft, bust, blackjack
+
+
+def _build_transitions():
+    transitions = []
+    for state in range(NUM_STATES):
+        total, soft, num_cards = decode(state)
+        # busted hands can't take more cards, and there are no empty hands
+        # with a total
+        if total > 21 or (num_cards == 0 and (total or soft)):
+            transitions.append(None)
+            continue
+        row = [None] * 12
+        for value in CARD_VALUES:
+            row[value] = _transition(state, value)
+        transitions.append(tuple(row))
+    return tuple(transitions)
+
+
+EMPTY_HAND = encode(0, False, 0)
+# TRANSITIONS[state][value] gives the tuple
+# (new state, new total, new total is soft, hand is bust, hand is blackjack)
+TRANSITIONS = _build_transitions()
+STATE_TOTAL = tuple(decode(state)[0] for state in range(NUM_STATES))
+STATE_SOFT = tuple(decode(state)[1] for state in range(NUM_STATES))
+
+
+def dealer_stands(stand_total, soft_stand):
+    """
+    Return a tuple with whether or not the dealer stands in each state
+    Parameters
+    ----------
+    stand_total: total the dealer stands on
+    soft_stand: whether or not the dealer stands on a soft stand_total
+    """
+    stands = []
+    for state in range(NUM_STATES):
+        total, soft, _ = decode(state)
+        if total == stand_total and soft:
+            stands.append(bool(soft_stand))
+        else:
+            stands.append(total >= stand_total)
+    return tuple(stands)
@@ -0,0 +1,202 @@
+"""
+Simulation jobs that can be split into independent shards.
+
+A Job describes a simulation: the rules, the players, the number of rounds,
+and a master seed. It's split into shards of a fixed number of rounds. Each
+shard uses its own child stream of the master seed, so shards can be run in
+any order, on any machine, and always give the same results. Running a shard
+writes a small summary file, and any group of summary files can be merged
+with py21.summary.merge.
+
+    job = Job(rules={"num_decks": 6}, players=[{"bankroll": 10 ** 9}],
+              rounds=10 ** 8, seed=123)
+    job.save("job.json")
+    # on any machine
+    run_shard(Job.load("job.json"), 17, "results")
+    # once the shards are done
+    summary = merge(glob.glob("results/*.json"))
+"""
+import hashlib
+import importlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from py21.deck import ShoeStream
+from py21.game import Game
+from py21.player import Player
+from py21.summary import Summary, merge
+
+
+# keys in a player's spec that refer to functions and the Player argument
+# each one is passed to
+PLAYER_FUNCTIONS = {
+    "strategy": "strategy_func",
+    "wager": "wager_func",
+    "insurance": "insurance_func",
+}
+
+
+def resolve(reference):
+    """
+    Return the object a reference of the form "module:name" refers to, e.g.
+    "py21.strategies:basic_strategy"
+    """
+    module, _, name = reference.partition(":")
+    if not name:
+        raise ValueError(f"'{reference}' must have the form 'module:name'")
+    obj = importlib.import_module(module)
+    for attr in name.split("."):
+        obj = getattr(obj, attr)
+    return obj
+
+
+class Job:
+
+    def __init__(self, players, rounds, seed, rules=None, shard_rounds=100000):
+        """
+        Parameters
+        ----------
+        players: list of dictionaries describing each player. Each has a
+            "bankroll" and can have "strategy", "wager", and "insurance"
+            references to functions in the form "module:name"
+        rounds: total number of rounds in the job
+        seed: master seed for the job
+        rules: dictionary containing any rule updates
+        shard_rounds: number of rounds in each shard
+        """
+        if rounds < 1 or shard_rounds < 1:
+            raise ValueError("'rounds' and 'shard_rounds' must be positive")
+        for player in players:
+            if "bankroll" not in player:
+                raise ValueError("Every player must have a 'bankroll'")
+            unknown = set(player) - set(PLAYER_FUNCTIONS) - {"bankroll"}
+            if unknown:
+                raise ValueError(f"Unknown player keys: {sorted(unknown)}")
+        self.players = [dict(player) for player in players]
+        self.rounds = rounds
+        self.seed = seed
+        self.rules = dict(rules) if rules else {}
+        self.shard_rounds = shard_rounds
+
+    @property
+    def num_shards(self):
+        return -(-self.rounds // self.shard_rounds)
+
+    @property
+    def job_id(self):
+        """
+        ID that's the same for every copy of the job
+        """
+        spec = json.dumps(self.to_dict(), sort_keys=True)
+        return hashlib.sha256(spec.encode()).hexdigest()[:16]
+
+    def shard_size(self, shard):
+        """
+        Number of rounds in a shard
+        """
+        if not 0 <= shard < self.num_shards:
+            raise IndexError(f"Shard {shard} is out of range")
+        return min(self.shard_rounds, self.rounds - shard * self.shard_rounds)
+
+    def make_players(self):
+        """
+        Create a new Player object for each player in the job
+        """
+        players = []
+        for spec in self.players:
+            kwargs = {
+                arg: resolve(spec[key])
+                for key, arg in PLAYER_FUNCTIONS.items() if spec.get(key)
+            }
+            players.append(Player(spec["bankroll"], **kwargs))
+        return players
+
+    def to_dict(self):
+        return {
+            "players": self.players,
+            "rounds": self.rounds,
+            "seed": self.seed,
+            "rules": self.rules,
+            "shard_rounds": self.shard_rounds,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(**data)
+
+    def save(self, path):
+        """
+        Write the job to a JSON file
+        """
+        with open(path, "w") as f:
+            json.dump(self.to_dict(), f, indent=4)
+
+    @classmethod
+    def load(cls, path):
+        """
+        Read a job written by Job.save
+        """
+        with open(path) as f:
+            return cls.from_dict(json.load(f))
+
+
+def shard_path(job, shard, directory):
+    """
+    Path to the summary file for a shard
+    """
+    return os.path.join(directory, f"{job.job_id}-{shard:06d}.json")
+
+
+def run_shard(job, shard, directory):
+    """
+    Run one shard of a job and write its summary file to `directory`
+    Returns
+    -------
+    Path to the summary file
+    """
+    rounds = job.shard_size(shard)
+    stream = ShoeStream(job.seed).stream(shard)
+    game = Game(job.make_players(), rules=job.rules, seed=stream,
+                record="none")
+    summary = Summary(len(job.players), shards=[shard], job=job.job_id)
+    for record in game.iter_rounds(rounds, mode="fast"):
+        summary.add_round(record)
+    os.makedirs(directory, exist_ok=True)
+    path = shard_path(job, shard, directory)
+    # write to a temporary file first so a partial file is never left behind
+    summary.save(path + ".tmp")
+    os.replace(path + ".tmp", path)
+    return path
+
+
+def _run_shard(args):
+    job, shard, directory = args
+    return run_shard(Job.from_dict(job), shard, directory)
+
+
+def run_local(job, directory, workers=None, shards=None):
+    """
+    Run the shards of a job in a local process pool and merge the results.
+    Shards whose summary files already exist are skipped, so an interrupted
+    job can be restarted.
+    Parameters
+    ----------
+    job: Job to run
+    directory: directory the summary files are written to
+    workers: number of processes to use. Defaults to the number of CPUs
+    shards: shards to run. Defaults to all of them
+    Returns
+    -------
+    Merged Summary of the shards
+    """
+    if shards is None:
+        shards = range(job.num_shards)
+    paths = [shard_path(job, shard, directory) for shard in shards]
+    todo = [
+        (job.to_dict(), shard, directory)
+        for shard, path in zip(shards, paths) if not os.path.exists(path)
+    ]
+    if todo:
+        with ProcessPoolExecutor(workers) as executor:
+            list(executor.map(_run_shard, todo))
+    return merge(paths)
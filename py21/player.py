@@ -1,14 +1,15 @@
 """
 Definition of the player class
 """
-from multiprocessing.sharedctypes import Value
+from py21.actions import ACTION_FLAGS
 from py21.strategies import basic_strategy, minimum_bet, decline_insurance
+from py21.summary import PlayerStats
 
 
 class Player:
 
     def __init__(self, bankroll, strategy_func=None, wager_func=None,
-                 insurance_func=None):
+                 insurance_func=None, record_history=True):
         """
         Parameters
         ----------
@@ -17,14 +18,21 @@ class Player:
             under a given situation.
         wager_func: function to determine how much the player will be wagering.
         insurance_func: function to determine when the player takes insurance.
+        record_history: if False, the player's hands are never added to
+            history, whatever the game records. Running statistics are kept
+            in self.stats instead, so memory use doesn't grow with the number
+            of hands played
         """
         self.bankroll = bankroll
         self.start_bankroll = self.bankroll
         # keep a rolling tally of the amount wagered
         self.total_wagered = 0
-        self.roi = 0
         # self.strategy = strategy
         self.history = []  # holds hand history
+        self.record_history = record_history
+        self.stats = None if record_history else PlayerStats()
+        # insurance bought this round that hasn't been added to stats
+        self._insurance_paid = 0
         if not wager_func:
             self.wager_func = minimum_bet
         else:
@@ -38,6 +46,26 @@ class Player:
         else:
             self.insurance_func = insurance_func
 
+    def reset(self):
+        """
+        Give the player their starting bankroll back and clear their history
+        """
+        self.bankroll = self.start_bankroll
+        self.total_wagered = 0
+        self.history = []
+        if self.stats is not None:
+            self.stats = PlayerStats()
+        self._insurance_paid = 0
+
+    @property
+    def roi(self):
+        """
+        Return from betting so far: the change in bankroll per unit wagered
+        """
+        if not self.total_wagered:
+            return 0
+        return (self.bankroll - self.start_bankroll) / self.total_wagered
+
     def wager(self, min_bet, max_bet, split_wager=None, **kwargs):
         """
         This method is a wrapper for the wager function passed in
@@ -71,7 +99,7 @@ class Player:
             player=self, hand=hand, dealer_up=dealer_up,
             game_params=game_params, **kwargs
         ).upper()
-        if action not in hand.valid_actions:
+        if not ACTION_FLAGS.get(action, 0) & hand.valid_mask:
             self._raise_error(action, hand, game_params)
         return action
 
@@ -112,13 +140,33 @@ class Player:
             "start_bankroll": self.bankroll + wager,
             "result": result
         }
+        self._payoff(
+            wager, result, hand_data["blackjack"], hand_data["from_split"],
+            hand_data["insurance"], dealer_blackjack, payout,
+            blackjack_payout, split_bj_payout, surrender_pct,
+            hand_data.get("double_down", False)
+        )
+        if not self.record_history:
+            return
+        additonal_data["end_bankroll"] = self.bankroll
+        additonal_data["roi"] = self.roi
+        self.history.append({**hand_data, **additonal_data})
+
+    def _payoff(self, wager, result, blackjack, from_split, insurance,
+                dealer_blackjack, payout, blackjack_payout, split_bj_payout,
+                surrender_pct, double_down=False):
+        """
+        Adjust the player's bankroll for the result of a hand and add it to
+        the player's stats
+        """
+        start_bankroll = self.bankroll
         # pay off insurance
-        if hand_data["insurance"] and dealer_blackjack:
+        if insurance and dealer_blackjack:
             self.bankroll += wager
         # adjust bankroll according to result
         if result == "win":
-            if hand_data["blackjack"]:
-                if hand_data["from_split"]:
+            if blackjack:
+                if from_split:
                     _payout = wager + (wager * split_bj_payout)
                 else:
                     _payout = wager + (wager * blackjack_payout)
@@ -130,11 +178,21 @@ class Player:
             self.bankroll += wager
         elif result == "surrender":
             self.bankroll += wager * surrender_pct
-        additonal_data["end_bankroll"] = self.bankroll
-        # return from betting the player has gotten
-        self.roi = (self.bankroll - self.start_bankroll) / self.total_wagered
-        additonal_data["roi"] = self.roi
-        self.history.append({**hand_data, **additonal_data})
+        if self.stats is not None:
+            # the cost of any insurance is taken from the first hand settled
+            # in the round
+            net = self.bankroll - start_bankroll - wager - self._insurance_paid
+            self._insurance_paid = 0
+            self.stats.add_hand(net, wager, result, blackjack, double_down,
+                                from_split)
+
+    def _pay_insurance(self, cost):
+        """
+        Take the cost of insurance out of the player's bankroll
+        """
+        self.bankroll -= cost
+        if self.stats is not None:
+            self._insurance_paid += cost
 
     def _raise_error(self, action, hand, game_params):
         """
@@ -0,0 +1,352 @@
+"""
+Columnar storage for the data collected while a game is played.
+
+Each table stores its columns as typed numpy arrays that grow as rows are
+added. Rows are buffered as tuples and moved into the arrays in chunks, which
+keeps the cost of recording a row low while keeping memory use close to the
+size of the raw data.
+"""
+import numpy as np
+from py21.card import CARDS
+
+
+# possible results of a hand. They're stored as their index in this tuple
+RESULTS = ("win", "loss", "push", "surrender")
+RESULT_CODES = {result: code for code, result in enumerate(RESULTS)}
+# actions that lead to a hit
+HIT_ACTIONS = ("HIT", "DOUBLE")
+HIT_ACTION_CODES = {action: code for code, action in enumerate(HIT_ACTIONS)}
+
+HAND_COLUMNS = (
+    ("round_id", np.int64),
+    ("hand_id", np.int16),
+    ("player_id", np.int16),
+    ("total", np.int8),
+    ("soft", np.int8),
+    ("from_split", np.int8),
+    ("blackjack", np.int8),
+    ("num_cards", np.int8),
+    ("start_total", np.int8),
+    ("card_one_rank", np.int8),
+    ("card_one_value", np.int8),
+    ("card_two_rank", np.int8),
+    ("card_two_value", np.int8),
+    ("wager", np.int64),
+    ("insurance", np.int8),
+    ("surrender", np.int8),
+    ("double_down", np.int8),
+    ("num_aces", np.int8),
+    ("num_hard_aces", np.int8),
+    ("dealer_up", np.int8),
+    ("dealer_total", np.int8),
+    ("dealer_blackjack", np.int8),
+    ("result", np.int8),
+    ("start_bankroll", np.float64),
+    ("end_bankroll", np.float64),
+    ("total_wagered", np.float64),
+    ("roi", np.float64),
+    # position of the hand's first card in Recorder.hand_cards
+    ("cards_offset", np.int64),
+)
+HIT_COLUMNS = (
+    ("round_id", np.int64),
+    ("hand_id", np.int16),
+    ("action", np.int8),
+    ("soft", np.int8),
+    ("start_total", np.int8),
+    ("start_count", np.int32),
+    ("start_ten_count", np.int32),
+    ("start_other_count", np.int32),
+    ("start_true_count", np.float64),
+    ("card_received_rank", np.int8),
+    ("card_received_value", np.int8),
+    ("new_total", np.int8),
+)
+COUNT_COLUMNS = (
+    ("pre_count", np.int32),
+    ("post_count", np.int32),
+    ("pre_ten_count", np.int32),
+    ("post_ten_count", np.int32),
+    ("pre_true_count", np.float64),
+    ("post_true_count", np.float64),
+    ("pre_other_count", np.int32),
+    ("post_other_count", np.int32),
+    ("card_value", np.int8),
+)
+# columns stored as integer codes and the labels for each code
+CATEGORIES = {"result": RESULTS, "action": HIT_ACTIONS}
+
+
+class Table:
+
+    def __init__(self, columns, chunk_size=4096):
+        """
+        A table of typed columns that rows can be appended to
+        Parameters
+        ----------
+        columns: sequence of (name, numpy dtype) pairs
+        chunk_size: number of rows buffered before they're moved into the
+            column arrays
+        """
+        self.names = tuple(name for name, _ in columns)
+        self.dtypes = tuple(np.dtype(dtype) for _, dtype in columns)
+        # used to convert buffered rows to arrays in a single call
+        self._row_dtype = np.dtype(list(zip(self.names, self.dtypes)))
+        self.chunk_size = chunk_size
+        self._arrays = [np.zeros(chunk_size, dtype) for dtype in self.dtypes]
+        self._size = 0
+        self._pending = []
+        # add a row to the table. Rows are tuples with one value per column.
+        # This is the buffer's append method so adding a row is as cheap as
+        # possible. Call flush_if_full regularly to move rows into the arrays
+        self.append = self._pending.append
+
+    def flush_if_full(self):
+        """
+        Flush the buffered rows if there are at least chunk_size of them
+        """
+        if len(self._pending) >= self.chunk_size:
+            self.flush()
+
+    def flush(self):
+        """
+        Move any buffered rows into the column arrays
+        """
+        if not self._pending:
+            return
+        new_size = self._size + len(self._pending)
+        self._reserve(new_size)
+        rows = self.take()
+        for name, array in zip(self.names, self._arrays):
+            array[self._size:new_size] = rows[name]
+        self._size = new_size
+
+    def extend(self, columns):
+        """
+        Add rows from a dictionary mapping every column name to an array of
+        values
+        """
+        self.flush()
+        new_size = self._size + len(columns[self.names[0]])
+        self._reserve(new_size)
+        for name, array in zip(self.names, self._arrays):
+            array[self._size:new_size] = columns[name]
+        self._size = new_size
+
+    def take(self):
+        """
+        Remove the buffered rows and return them as a structured array with
+        one field for each column
+        """
+        rows = np.array(self._pending, dtype=self._row_dtype)
+        self._pending.clear()
+        return rows
+
+    def _reserve(self, size):
+        # make sure the arrays can hold `size` rows
+        if size <= len(self._arrays[0]):
+            return
+        capacity = max(size, 2 * len(self._arrays[0]))
+        for i, array in enumerate(self._arrays):
+            grown = np.zeros(capacity, array.dtype)
+            grown[:self._size] = array[:self._size]
+            self._arrays[i] = grown
+
+    def column(self, name):
+        """
+        Return a view of the values in a column
+        """
+        self.flush()
+        return self._arrays[self.names.index(name)][:self._size]
+
+    def columns(self):
+        """
+        Return a dictionary mapping each column name to a view of its values
+        """
+        self.flush()
+        return {
+            name: array[:self._size]
+            for name, array in zip(self.names, self._arrays)
+        }
+
+    def clear(self):
+        """
+        Remove every row from the table, keeping the allocated arrays
+        """
+        self._size = 0
+        self._pending.clear()
+
+    def __len__(self):
+        return self._size + len(self._pending)
+
+
+def card_strings(codes, offsets, num_cards):
+    """
+    Return a list with the cards in each hand, formatted the same way as the
+    `cards` field of a player's history
+    Parameters
+    ----------
+    codes: card codes of every hand, in order
+    offsets: position of each hand's first card in `codes`
+    num_cards: number of cards in each hand
+    """
+    codes = list(codes)
+    return [
+        " ".join([str(CARDS[code]) for code in codes[start:start + n]])
+        for start, n in zip(offsets, num_cards)
+    ]
+
+
+def label(columns):
+    """
+    Replace the coded columns in a dictionary of columns with pandas
+    categoricals
+    """
+    import pandas as pd
+
+    for name, categories in CATEGORIES.items():
+        if name in columns:
+            columns[name] = pd.Categorical.from_codes(
+                columns[name], categories
+            )
+    return columns
+
+
+class Recorder:
+
+    def __init__(self, chunk_size=4096, sink=None):
+        """
+        Holds the hand, hit, and count data recorded by a Game in columnar
+        tables. The columns match the data described in docs/data.md, with
+        results, actions, and cards stored as integer codes.
+        Parameters
+        ----------
+        chunk_size: number of rows buffered before they're moved into the
+            column arrays
+        sink: optional py21.sink.Sink. If one is given, full buffers are sent
+            to the sink instead of being kept in memory
+        """
+        self.sink = sink
+        self.hands = Table(HAND_COLUMNS, chunk_size)
+        self.hits = Table(HIT_COLUMNS, chunk_size)
+        self.counts = Table(COUNT_COLUMNS, chunk_size)
+        # codes of every card in every recorded hand, in order. A hand's
+        # cards start at its cards_offset and it has num_cards of them
+        self._hand_cards = []
+        self._card_chunks = []
+        self._num_cards = 0
+
+    @property
+    def tables(self):
+        return {"hands": self.hands, "hits": self.hits, "counts": self.counts}
+
+    def end_round(self):
+        """
+        Called by Game at the end of every round to move full buffers into
+        the column arrays
+        """
+        if self.sink is None:
+            for table in (self.hands, self.hits, self.counts):
+                table.flush_if_full()
+            return
+        for name, table in self.tables.items():
+            if len(table._pending) >= table.chunk_size:
+                self._send(name)
+
+    def finish(self):
+        """
+        Send every buffered row to the sink
+        """
+        for name, table in self.tables.items():
+            if table._pending:
+                self._send(name)
+
+    def _send(self, name):
+        table = self.tables[name]
+        rows = table.take()
+        if name != "hands":
+            self.sink.write(name, rows)
+            return
+        # the hands take their cards with them. Offsets are relative to the
+        # start of the run so they're shifted back to zero for this chunk
+        cards = np.array(self._hand_cards, np.uint8)
+        self.sink.write(name, rows, cards, self._num_cards)
+        self._num_cards += len(self._hand_cards)
+        self._hand_cards = []
+
+    def record_hand(self, row, cards):
+        """
+        Record a hand. `row` holds every hand column except cards_offset
+        and `cards` is the list of cards in the hand.
+        """
+        offset = self._num_cards + len(self._hand_cards)
+        self._hand_cards.extend([card.code for card in cards])
+        self.hands.append(row + (offset,))
+
+    @property
+    def hand_cards(self):
+        """
+        Array with the codes of every card in every recorded hand
+        """
+        if self._hand_cards:
+            self._card_chunks.append(np.array(self._hand_cards, np.uint8))
+            self._num_cards += len(self._hand_cards)
+            self._hand_cards = []
+        if len(self._card_chunks) > 1:
+            self._card_chunks = [np.concatenate(self._card_chunks)]
+        if self._card_chunks:
+            return self._card_chunks[0]
+        return np.zeros(0, np.uint8)
+
+    def extend(self, other):
+        """
+        Add all of the data recorded by another Recorder to this one
+        """
+        cards = other.hand_cards
+        offset = len(self.hand_cards)
+        for name, table in self.tables.items():
+            columns = other.tables[name].columns()
+            if name == "hands":
+                columns["cards_offset"] = columns["cards_offset"] + offset
+            table.extend(columns)
+        if len(cards):
+            self._card_chunks.append(cards)
+            self._num_cards += len(cards)
+
+    def hand_card_strings(self):
+        """
+        Return a list with the cards in each recorded hand, formatted the
+        same way as the `cards` field of a player's history
+        """
+        return card_strings(
+            self.hand_cards.tolist(),
+            self.hands.column("cards_offset").tolist(),
+            self.hands.column("num_cards").tolist(),
+        )
+
+    def to_frame(self, table="hands", cards=False):
+        """
+        Return one of the tables as a pandas DataFrame. Numeric columns are
+        views of the recorded arrays, not copies.
+        Parameters
+        ----------
+        table: "hands", "hits", or "counts"
+        cards: if True, include the `cards` column with a string of the
+            cards in each hand. Only used for the hands table
+        """
+        import pandas as pd
+
+        columns = label(self.tables[table].columns())
+        if table == "hands" and cards:
+            columns["cards"] = self.hand_card_strings()
+        return pd.DataFrame(columns, copy=False)
+
+    def clear(self):
+        """
+        Remove all recorded data
+        """
+        for table in self.tables.values():
+            table.clear()
+        self._hand_cards = []
+        self._card_chunks = []
+        self._num_cards = 0
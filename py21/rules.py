@@ -0,0 +1,69 @@
+"""
+Frozen snapshot of a game's rules
+"""
+import json
+from pathlib import Path
+
+
+CUR_PATH = Path(__file__).resolve().parent
+# contents of the default rules file
+DEFAULT_RULES = Path(CUR_PATH, "rules.json").read_text()
+# names of all of the rules that can be set
+RULE_NAMES = tuple(
+    name for name in json.loads(DEFAULT_RULES) if name != "schema"
+)
+
+
+class Rules:
+    """
+    Read only snapshot of a game's validated rules. Every rule is a plain
+    Python value stored in a slot, so reading one is a normal attribute
+    lookup. The full GameParams object is kept in `params`, and anything that
+    isn't a rule is looked up there.
+    """
+
+    __slots__ = ("params",) + RULE_NAMES
+
+    def __init__(self, params):
+        """
+        Parameters
+        ----------
+        params: validated GameParams object created with array_first=True
+        """
+        object.__setattr__(self, "params", params)
+        for name in RULE_NAMES:
+            object.__setattr__(self, name, getattr(params, name).item())
+
+    def __getattr__(self, name):
+        # only called for names that aren't rules
+        if name == "params":
+            raise AttributeError(name)
+        return getattr(self.params, name)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Rules can't be changed. Use Game.with_rules")
+
+    def __delattr__(self, name):
+        raise AttributeError("Rules can't be changed. Use Game.with_rules")
+
+    def __reduce__(self):
+        # GameParams objects can't be pickled, so the rules are validated
+        # again when they're loaded
+        return (_load_rules, (self.to_dict(),))
+
+    def __repr__(self):
+        values = ", ".join(
+            f"{name}={getattr(self, name)!r}" for name in RULE_NAMES
+        )
+        return f"Rules({values})"
+
+    def to_dict(self):
+        """
+        Return a dictionary with the value of every rule
+        """
+        return {name: getattr(self, name) for name in RULE_NAMES}
+
+
+def _load_rules(rules):
+    from py21.game import load_rules
+    return load_rules(rules)
@@ -0,0 +1,235 @@
+"""
+Stream the data recorded during a simulation to disk.
+
+A Sink receives chunks of hand, hit, and count data from a game's recorder
+and writes them to one file per table on a background thread. The simulation
+only has to hand each chunk off, so it never waits on the disk, and at most a
+few chunks are held in memory at once no matter how many rounds are played.
+"""
+import gzip
+import os
+import queue
+import threading
+from py21.recorder import card_strings, label
+
+
+FORMATS = ("csv", "parquet")
+TABLES = ("hands", "hits", "counts")
+
+
+class Sink:
+
+    def __init__(self, path, format="csv", chunk_size=65536, compression=None,
+                 max_pending=4):
+        """
+        Write the data from Game.simulate to files in a directory. Each table
+        is written to its own file (hands.csv, hits.csv, and counts.csv for
+        CSV output) with the columns described in docs/data.md.
+        Parameters
+        ----------
+        path: directory the files are written to. It's created if it
+            doesn't exist
+        format: "csv" or "parquet". Parquet output requires pyarrow
+        chunk_size: number of rows recorded before they're sent to be
+            written. Chunks are sent at the end of a round so they can be
+            slightly larger than this
+        compression: compression to use. For CSV files this can be None or
+            "gzip". For parquet files it's passed to pyarrow and defaults to
+            "snappy"
+        max_pending: number of chunks that can be waiting to be written. If
+            the disk can't keep up the simulation waits once this many are
+            queued, keeping memory use bounded
+        """
+        if format not in FORMATS:
+            raise ValueError(f"'format' must be one of {FORMATS}")
+        if format == "csv" and compression not in (None, "gzip"):
+            raise ValueError("CSV compression must be None or 'gzip'")
+        if format == "parquet":
+            try:
+                import pyarrow  # noqa: F401
+            except ImportError:
+                raise ImportError(
+                    "pyarrow is required to write parquet files"
+                )
+            if compression is None:
+                compression = "snappy"
+        os.makedirs(path, exist_ok=True)
+        self.path = path
+        self.format = format
+        self.chunk_size = chunk_size
+        self.compression = compression
+        self.rows_written = dict.fromkeys(TABLES, 0)
+        self._writers = {}
+        self._error = None
+        self._queue = queue.Queue(max_pending)
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def file_path(self, table):
+        """
+        Path to the file a table is written to
+        """
+        extension = self.format
+        if self.format == "csv" and self.compression == "gzip":
+            extension += ".gz"
+        return os.path.join(self.path, f"{table}.{extension}")
+
+    def write(self, table, rows, cards=None, cards_offset=0):
+        """
+        Queue a chunk of rows to be written. This is called by the game's
+        recorder.
+        Parameters
+        ----------
+        table: "hands", "hits", or "counts"
+        rows: structured array with the recorded rows
+        cards: codes of the cards in each hand. Only used for the hands table
+        cards_offset: value of cards_offset for the first card in `cards`
+        """
+        self._check()
+        if self._thread is None:
+            raise ValueError("Can't write to a closed sink")
+        self._queue.put((table, rows, cards, cards_offset))
+
+    def flush(self):
+        """
+        Wait for every queued chunk to be written
+        """
+        self._queue.join()
+        self._check()
+
+    def position(self):
+        """
+        Wait for every queued chunk to be written and return how much has
+        been written to each file. Used by Game.checkpoint so a resumed
+        game can cut the files back with truncate
+        """
+        self._check_resumable()
+        self.flush()
+        sizes = {}
+        for table, handle in self._writers.items():
+            handle.flush()
+            sizes[table] = handle.tell()
+        return {"sizes": sizes, "rows_written": dict(self.rows_written)}
+
+    def truncate(self, position):
+        """
+        Cut the files back to a position returned by position and write
+        any new chunks after it
+        """
+        self._check_resumable()
+        self.flush()
+        for writer in self._writers.values():
+            writer.close()
+        self._writers = {}
+        for table, size in position["sizes"].items():
+            handle = open(self.file_path(table), "r+", newline="")
+            handle.truncate(size)
+            handle.seek(size)
+            self._writers[table] = handle
+        self.rows_written = dict(position["rows_written"])
+
+    def close(self):
+        """
+        Write any queued chunks and close the files
+        """
+        if self._thread is None:
+            return
+        self._queue.put(None)
+        self._thread.join()
+        self._thread = None
+        for writer in self._writers.values():
+            writer.close()
+        self._writers = {}
+        self._check()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    # Start private methods
+
+    def _check(self):
+        # errors on the background thread are raised on the main thread
+        if self._error is not None:
+            error, self._error = self._error, None
+            raise error
+
+    def _check_resumable(self):
+        # compressed and parquet files can't be cut back to a position
+        if self.format != "csv" or self.compression is not None:
+            raise ValueError(
+                "Only uncompressed CSV sinks can be used with checkpoints"
+            )
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            try:
+                if item is None:
+                    return
+                if self._error is None:
+                    self._write(*item)
+            except Exception as error:
+                self._error = error
+            finally:
+                self._queue.task_done()
+
+    def _write(self, table, rows, cards, cards_offset):
+        import pandas as pd
+
+        columns = label({name: rows[name] for name in rows.dtype.names})
+        if table == "hands":
+            offsets = columns.pop("cards_offset") - cards_offset
+            columns["cards"] = card_strings(
+                cards.tolist(), offsets.tolist(), rows["num_cards"].tolist()
+            )
+        frame = pd.DataFrame(columns, copy=False)
+        if self.format == "csv":
+            self._write_csv(table, frame)
+        else:
+            self._write_parquet(table, frame)
+        self.rows_written[table] += len(frame)
+
+    def _write_csv(self, table, frame):
+        header = table not in self._writers
+        if header:
+            if self.compression == "gzip":
+                handle = gzip.open(self.file_path(table), "wt", newline="")
+            else:
+                handle = open(self.file_path(table), "w", newline="")
+            self._writers[table] = handle
+        frame.to_csv(self._writers[table], header=header, index=False)
+
+    def _write_parquet(self, table, frame):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        arrow_table = pa.Table.from_pandas(frame, preserve_index=False)
+        if table not in self._writers:
+            self._writers[table] = pq.ParquetWriter(
+                self.file_path(table), arrow_table.schema,
+                compression=self.compression
+            )
+        self._writers[table].write_table(arrow_table)
+
+
+def read(path, table="hands"):
+    """
+    Read a table written by a Sink into a pandas DataFrame
+    Parameters
+    ----------
+    path: directory the sink wrote to
+    table: "hands", "hits", or "counts"
+    """
+    import pandas as pd
+
+    for extension, reader in [
+        ("csv", pd.read_csv), ("csv.gz", pd.read_csv),
+        ("parquet", pd.read_parquet)
+    ]:
+        file_path = os.path.join(path, f"{table}.{extension}")
+        if os.path.exists(file_path):
+            return reader(file_path)
+    raise FileNotFoundError(f"No {table} data found in {path}")
@@ -0,0 +1,361 @@
+"""
+Basic strategy for any set of rules.
+
+generate_strategy works out the best total dependent strategy for a set of
+rules with the exact calculator and saves it in the same format as the files
+in strategy_files, so strategies.rule_strategy can load it. For each dealer
+up card, the expected value of every action is found for every two card
+hand, with perfect play after the first decision. The expected values of the
+hands with the same total are weighted by how likely each hand is and the
+action with the highest total is used. Each up card is worked out in its own
+process.
+
+Generated strategies are saved in CACHE_DIR/strategies, in a directory for
+the rules that change which action is best, so each one is only worked out
+once. basic_strategy always plays the default tables, so a generated strategy
+is only played when it's passed to a player explicitly.
+
+generate_deviations finds the Hi-Lo true count at which each cell of the
+basic strategy, and insurance, should be played differently. Each true count
+is checked exactly with the expected shoe composition at that count, and the
+results are saved in a file strategies.Deviations can play.
+
+    from py21.solver import generate_strategy
+    from py21.strategies import rule_strategy
+    rules = {"num_decks": 2, "soft_stand": False}
+    generate_strategy(rules)
+    game = Game([Player(100, strategy_func=rule_strategy(rules))],
+                rules=rules)
+"""
+import csv
+import hashlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from py21.exact import (
+    Calculator, remove, prob_no_blackjack, VALUE_INDEX
+)
+from py21.game import load_rules, full_shoe
+from py21.handstate import (
+    TRANSITIONS, EMPTY_HAND, STATE_TOTAL, STATE_SOFT, CARD_VALUES
+)
+from py21.strategies import STRATEGY_FILES, strategy_dir, read_strategy
+
+
+# rows of each table, in the same order as the files in strategy_files
+HARD_TOTALS = range(21, 3, -1)
+SOFT_TOTALS = range(21, 11, -1)
+PAIR_VALUES = range(11, 1, -1)
+# hands in each of the tables in STRATEGY_FILES
+TABLE_HANDS = ("hard", "soft", "pair")
+# true counts checked by generate_deviations
+TRUE_COUNTS = range(-6, 11)
+# codes that can be used in the split table. When more than one plays the
+# best action, the first one is used
+SPLIT_CODES = ("N", "S", "P", "Ph", "Rp")
+
+
+def _total_code(evs):
+    """
+    Return the code for the action with the highest expected value in the
+    hard or soft table
+    """
+    fallback = "H" if evs["HIT"] > evs["STAND"] else "S"
+    best = max(evs, key=evs.get)
+    if best == "DOUBLE":
+        return "D" + fallback.lower()
+    if best == "SURRENDER":
+        return "R" + fallback.lower()
+    return fallback
+
+
+def _resolve(code, total_code, rules):
+    """
+    Return the action basic_strategy takes for a code with a two card hand
+    that hasn't been split. total_code is the hand's code in the hard or soft
+    table
+    """
+    if code == "P":
+        return "SPLIT"
+    if code == "Ph":
+        return "SPLIT" if rules.double_after_split else "HIT"
+    if code == "Rp":
+        return "SURRENDER" if rules.surrender_allowed else "SPLIT"
+    if code == "N":
+        code = total_code
+    if code.startswith("D"):
+        return "DOUBLE"
+    if code.startswith("R") and rules.surrender_allowed:
+        return "SURRENDER"
+    return "HIT" if code.endswith(("H", "h")) else "STAND"
+
+
+def _solve_up(task):
+    """
+    Work out the hard, soft, and split table columns for one up card and
+    shoe composition. The composition defaults to a full shoe
+    """
+    rules, up, composition = task
+    calc = Calculator(rules)
+    rules = calc.rules
+    if composition is None:
+        composition = calc.shoe
+    shoe = remove(composition, up)
+    size = sum(shoe)
+    # weighted expected values of each total's hands that aren't pairs, and
+    # of the pairs for the totals that can only be made with a pair
+    totals = {}
+    pair_totals = {}
+    pairs = {}
+    for i, first in enumerate(CARD_VALUES):
+        for second in CARD_VALUES[i:]:
+            if first + second == 21:
+                continue
+            try:
+                rest = remove(shoe, first, second)
+            except ValueError:
+                continue
+            # either card can be delt first
+            prob = shoe[i] / size * (
+                shoe[CARD_VALUES.index(second)] - (first == second)
+            ) / (size - 1)
+            if first != second:
+                prob *= 2
+            weight = prob * prob_no_blackjack(rest, up)
+            evs = calc.action_evs([first, second], up, rest)
+            state = TRANSITIONS[TRANSITIONS[EMPTY_HAND][first][0]][second][0]
+            key = (STATE_SOFT[state], STATE_TOTAL[state])
+            if first == second:
+                pairs[first] = (evs, key)
+                evs = {action: ev for action, ev in evs.items()
+                       if action != "SPLIT"}
+                sums = pair_totals.setdefault(key, dict.fromkeys(evs, 0.0))
+            else:
+                sums = totals.setdefault(key, dict.fromkeys(evs, 0.0))
+            for action, ev in evs.items():
+                sums[action] += weight * ev
+    codes = {}
+    for key in set(totals) | set(pair_totals):
+        codes[key] = _total_code(totals.get(key) or pair_totals[key])
+    # only 21 can't be made with two cards that aren't a blackjack
+    hard = {total: codes.get((False, total), "S") for total in HARD_TOTALS}
+    soft = {total: codes.get((True, total), "S") for total in SOFT_TOTALS}
+    split = {}
+    for value in PAIR_VALUES:
+        if value not in pairs:
+            split[value] = "N"
+            continue
+        evs, key = pairs[value]
+        actions = {
+            code: _resolve(code, codes[key], rules) for code in SPLIT_CODES
+        }
+        best = max(evs[action] for action in actions.values()
+                   if action in evs)
+        split[value] = next(
+            code for code, action in actions.items()
+            if evs.get(action) == best
+        )
+    return hard, soft, split
+
+
+def _solve(tasks, workers):
+    """
+    Run _solve_up for every task, in a process pool unless workers is 1
+    """
+    if workers == 1:
+        return [_solve_up(task) for task in tasks]
+    with ProcessPoolExecutor(workers) as executor:
+        return list(executor.map(_solve_up, tasks))
+
+
+def _write_table(path, columns, rows):
+    """
+    Write a table in the format of the files in strategy_files
+    """
+    tmp = Path(str(path) + ".tmp")
+    with tmp.open("w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow([""] + [str(up) for up in CARD_VALUES])
+        for row in rows:
+            writer.writerow([row] + [column[row] for column in columns])
+    os.replace(tmp, path)
+
+
+def generate_strategy(rules=None, workers=None, cache_dir=None):
+    """
+    Generate the basic strategy for a set of rules and save it so it can be
+    played with strategies.rule_strategy
+    Parameters
+    ----------
+    rules: dictionary containing any rule updates
+    workers: number of processes to use. If 1, every up card is worked out
+        in this process. Defaults to the number of CPUs
+    cache_dir: directory generated files are saved in. Defaults to
+        strategies.CACHE_DIR, which is where rule_strategy looks for them
+    Returns
+    -------
+    Path to the directory with the hard, soft, and split tables
+    """
+    rules = load_rules(rules)
+    directory = strategy_dir(rules, cache_dir)
+    paths = [Path(directory, name) for name in STRATEGY_FILES]
+    if all(path.exists() for path in paths):
+        return directory
+    tasks = [(rules.to_dict(), up, None) for up in CARD_VALUES]
+    results = _solve(tasks, workers)
+    directory.mkdir(parents=True, exist_ok=True)
+    for i, (path, rows) in enumerate(
+            zip(paths, (HARD_TOTALS, SOFT_TOTALS, PAIR_VALUES))):
+        _write_table(path, [result[i] for result in results], rows)
+    return directory
+
+
+def count_composition(num_decks, true_count, decks_remaining):
+    """
+    Return the expected composition of a shoe once enough cards have been
+    delt to leave `decks_remaining` decks at a Hi-Lo true count. The seen
+    cards have the running count, and within the low, neutral, and high
+    cards every value is seen in proportion to how many there are. Counts
+    are rounded to whole cards
+    Parameters
+    ----------
+    num_decks: number of decks in the full shoe
+    true_count: Hi-Lo true count
+    decks_remaining: number of decks left in the shoe
+    """
+    size = round(52 * decks_remaining)
+    seen = 52 * num_decks - size
+    running = true_count * size / 52
+    # low cards count +1 and high cards count -1
+    low = 20 / 52 * seen + running / 2
+    high = 20 / 52 * seen - running / 2
+    shoe = full_shoe(num_decks)
+    left = []
+    for value, count in zip(CARD_VALUES, shoe):
+        if value <= 6:
+            left.append(count - low * count / (20 * num_decks))
+        elif value >= 10:
+            left.append(count - high * count / (20 * num_decks))
+        else:
+            left.append(count - 12 / 52 * seen * count / (12 * num_decks))
+    if min(left) < 0 or max(a - b for a, b in zip(left, shoe)) > 0:
+        raise ValueError(
+            f"A true count of {true_count} isn't possible with "
+            f"{decks_remaining} of {num_decks} decks left"
+        )
+    # round down, then give the leftover cards to the values that lost the
+    # most to rounding
+    composition = [int(count) for count in left]
+    order = sorted(range(len(left)), key=lambda i: composition[i] - left[i])
+    for i in order[:size - sum(composition)]:
+        composition[i] += 1
+    return tuple(composition)
+
+
+def _deviation(base, codes):
+    """
+    Return the code and index of the deviation from `base` that's made at
+    every true count from the index on, or None. `codes` holds the best code
+    at each true count, starting with the one furthest from zero
+    """
+    result = None
+    for true_count, code in codes:
+        if code == base or (result is not None and code != result[0]):
+            break
+        result = (code, true_count)
+    return result
+
+
+def generate_deviations(rules=None, true_counts=TRUE_COUNTS,
+                        decks_remaining=None, workers=None, cache_dir=None):
+    """
+    Find the Hi-Lo true count index of every deviation from the basic
+    strategy for a set of rules and save them in a file that can be loaded
+    with strategies.Deviations. The basic strategy is generated with
+    generate_strategy if it hasn't been already. At each true count, the best
+    action in every cell is worked out exactly for the shoe from
+    count_composition, so there's no noise from simulation. A cell's index is
+    the true count closest to zero from which the best action differs from
+    the basic strategy at every true count further from zero. Insurance is
+    taken from the true count where it has a positive expected value
+    Parameters
+    ----------
+    rules: dictionary containing any rule updates
+    true_counts: true counts to check. Indexes are always one of these
+    decks_remaining: number of decks left in the shoes the true counts are
+        checked with. Defaults to half of the shoe
+    workers: number of processes to use. If 1, everything is worked out in
+        this process. Defaults to the number of CPUs
+    cache_dir: directory generated files are saved in. Defaults to
+        strategies.CACHE_DIR
+    Returns
+    -------
+    Path to the deviation file
+    """
+    rules = load_rules(rules)
+    if decks_remaining is None:
+        decks_remaining = rules.num_decks / 2
+    true_counts = sorted(set(true_counts))
+    directory = generate_strategy(rules, workers, cache_dir)
+    # the strategy's directory is already specific to the rules that change
+    # the best action
+    settings = json.dumps([
+        rules.insurance_allowed, rules.insurance_pct, decks_remaining,
+        true_counts
+    ])
+    key = hashlib.sha256(settings.encode()).hexdigest()[:16]
+    path = Path(directory, f"deviations_{key}.csv")
+    if path.exists():
+        return path
+    base = [
+        read_strategy(Path(directory, name)) for name in STRATEGY_FILES
+    ]
+    compositions = {
+        true_count: count_composition(
+            rules.num_decks, true_count, decks_remaining
+        )
+        for true_count in true_counts
+    }
+    tasks = [
+        (rules.to_dict(), up, compositions[true_count])
+        for true_count in true_counts for up in CARD_VALUES
+    ]
+    results = iter(_solve(tasks, workers))
+    # best codes for each table, up card, and row at every true count
+    best = {}
+    for true_count in true_counts:
+        for up in CARD_VALUES:
+            for name, column in zip(TABLE_HANDS, next(results)):
+                for row, code in column.items():
+                    best.setdefault((name, row, up), []).append(
+                        (true_count, code)
+                    )
+    rows = []
+    for (name, row, up), codes in best.items():
+        base_code = base[TABLE_HANDS.index(name)][str(up)][row]
+        above = [item for item in reversed(codes) if item[0] > 0]
+        below = [item for item in codes if item[0] < 0]
+        for when, side in ((">=", above), ("<=", below)):
+            deviation = _deviation(base_code, side)
+            if deviation is not None:
+                rows.append((name, row, up, deviation[0], when, deviation[1]))
+    # insurance pays back the whole wager when the hole card is worth ten
+    insure = [
+        (true_count, "I") if (
+            remove(compositions[true_count], 11)[VALUE_INDEX[10]] /
+            (sum(compositions[true_count]) - 1) > rules.insurance_pct
+        ) else (true_count, None)
+        for true_count in reversed(true_counts) if true_count > 0
+    ]
+    deviation = _deviation(None, insure)
+    if rules.insurance_allowed and deviation is not None:
+        rows.append(("insurance", 0, 11, "I", ">=", deviation[1]))
+    tmp = Path(str(path) + ".tmp")
+    with tmp.open("w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["hand", "total", "up", "code", "when", "index"])
+        for row in rows:
+            writer.writerow(row)
+    os.replace(tmp, path)
+    return path
@@ -3,30 +3,304 @@ This file contains a number of built in strategies that can be passed to the
 Player class as arguments for strategy_func, wager_func, or insurance_func
 """
 
+import csv
+import hashlib
+import json
+import math
+import os
 import random
-import pandas as pd
+from bisect import bisect_right
+from collections import OrderedDict
+import numpy as np
+from py21.actions import HIT, STAND, SPLIT, DOUBLE, SURRENDER, ACTION_FLAGS
+from py21.rules import Rules
 from pathlib import Path
 
 
 CUR_PATH = Path(__file__).resolve().parent
+# where generated files are saved. Set PY21_CACHE to change it
+CACHE_DIR = Path(
+    os.environ.get("PY21_CACHE", Path.home() / ".cache" / "py21")
+)
+# names of the generated strategy files
+STRATEGY_FILES = ("basic_hard.csv", "basic_soft.csv", "basic_split.csv")
+# rules that change which action is best
+STRATEGY_RULES = (
+    "num_decks", "soft_stand", "stand_total", "double_after_split", "payout",
+    "surrender_allowed", "surrender_after_split", "surrender_pct",
+    "max_split_hands", "split_blackjack_payout", "hit_split_aces"
+)
+# index of each table in a compiled TableStrategy
+HARD, SOFT, PAIR = range(3)
+# most sets of rules a TableStrategy keeps compiled tables for
+MAX_COMPILED_RULES = 16
+# most generated strategies kept by rule_strategy
+MAX_RULE_STRATEGIES = 8
+# action for each flag
+ACTION_NAMES = {flag: action for action, flag in ACTION_FLAGS.items()}
+
+
+def read_strategy(path):
+    """
+    Read a strategy file into a dictionary mapping each dealer up card to a
+    dictionary of the action for each hand total
+    Parameters
+    ----------
+    path: path to a CSV file with one row for each hand total and one column
+        for each dealer up card
+    """
+    with open(path, newline="") as f:
+        rows = list(csv.reader(f))
+    up_cards = rows[0][1:]
+    return {
+        up: {int(row[0]): row[i + 1] for row in rows[1:]}
+        for i, up in enumerate(up_cards)
+    }
+
+
+def _compile_code(code, game_params, pair):
+    """
+    Return a code from a strategy table as an integer. The flag for the
+    action to take is in the lowest five bits and the flag for the action to
+    take when it isn't allowed is in the next five. Codes in the split table
+    that fall through to the hard and soft tables are 0
+    """
+    if pair:
+        if code == "P":
+            action = fallback = SPLIT
+        elif code == "Ph":
+            action = fallback = SPLIT if game_params.double_after_split else HIT
+        elif code == "Rp":
+            action = SURRENDER if game_params.surrender_allowed else SPLIT
+            fallback = SPLIT
+        elif code == "S":
+            action = fallback = STAND
+        else:
+            return 0
+    elif code == "H":
+        action = fallback = HIT
+    elif code == "S":
+        action = fallback = STAND
+    elif code.startswith(("D", "R")):
+        action = DOUBLE if code.startswith("D") else SURRENDER
+        if code.endswith("h"):
+            fallback = HIT
+        elif code.endswith("s"):
+            fallback = STAND
+        else:
+            fallback = action
+    else:
+        raise ValueError(f"{code} does not have associated action")
+    return action | fallback << 5
+
+
+class TableStrategy:
+    """
+    Strategy function that plays from hard, soft, and split tables like the
+    ones in strategy_files. The tables are compiled once for each set of
+    rules into an integer array indexed by [true count, table, total or
+    pair value, dealer up card], so each decision is a couple of list
+    lookups. Charts can also depend on the true count, with a set of tables
+    for each range of counts.
+
+    Instances can be used as the strategy_func argument of the Player class.
+    """
+
+    def __init__(self, hard, soft, split, true_counts=None):
+        """
+        Parameters
+        ----------
+        hard, soft, split: tables read with read_strategy. For count
+            dependent charts, lists with a table for each true count in
+            true_counts
+        true_counts: sorted list of the lowest true count each set of tables
+            is used for. Each set is used until the next one's true count,
+            and the first is also used for every lower count
+        """
+        if true_counts is None:
+            hard, soft, split = [hard], [soft], [split]
+        else:
+            true_counts = list(true_counts)
+            if true_counts != sorted(true_counts):
+                raise ValueError("'true_counts' must be sorted")
+            if not len(hard) == len(soft) == len(split) == len(true_counts):
+                raise ValueError(
+                    "There must be a hard, soft, and split table for every "
+                    "true count"
+                )
+        self.hard = hard
+        self.soft = soft
+        self.split = split
+        self.true_counts = true_counts
+        # compiled tables for each set of rules, as arrays and nested lists.
+        # Only the MAX_COMPILED_RULES most recently compiled are kept
+        self.tables = {}
+        self._lists = {}
+
+    @classmethod
+    def from_csv(cls, hard, soft, split, true_counts=None):
+        """
+        Create a TableStrategy from CSV files in the format of the files in
+        strategy_files
+        Parameters
+        ----------
+        hard, soft, split: paths to the tables. For count dependent charts,
+            lists with a path for each true count in true_counts
+        true_counts: see TableStrategy
+        """
+        if true_counts is None:
+            return cls(read_strategy(hard), read_strategy(soft),
+                       read_strategy(split))
+        return cls(
+            [read_strategy(path) for path in hard],
+            [read_strategy(path) for path in soft],
+            [read_strategy(path) for path in split],
+            true_counts,
+        )
+
+    def compile(self, game_params):
+        """
+        Return the tables compiled for a set of rules: an array indexed by
+        [true count, table, total or pair value, dealer up card]. The tables
+        are HARD, SOFT, and PAIR, and each entry is a code from _compile_code
+        Parameters
+        ----------
+        game_params: rules of the specific game
+        """
+        table = self.tables.get(game_params)
+        if table is not None:
+            return table
+        if game_params is None:
+            from py21.game import load_rules
+            rules = load_rules()
+        elif isinstance(game_params, Rules):
+            rules = game_params
+        else:
+            rules = Rules(game_params)
+        table = np.zeros((len(self.hard), 3, 22, 12), dtype=np.int16)
+        for i, charts in enumerate(zip(self.hard, self.soft, self.split)):
+            for kind, chart in enumerate(charts):
+                for up, column in chart.items():
+                    for total, code in column.items():
+                        table[i, kind, total, int(up)] = _compile_code(
+                            code, rules, kind == PAIR
+                        )
+        if len(self.tables) >= MAX_COMPILED_RULES:
+            # drop the oldest entry
+            oldest = next(iter(self.tables))
+            del self.tables[oldest]
+            del self._lists[oldest]
+        self.tables[game_params] = table
+        self._lists[game_params] = table.tolist()
+        return table
+
+    def __call__(self, player, hand, dealer_up, game_params, true_count=0,
+                 **kwargs):
+        tables = self._lists.get(game_params)
+        if tables is None:
+            self.compile(game_params)
+            tables = self._lists[game_params]
+        if self.true_counts is None:
+            table = tables[0]
+        else:
+            table = tables[
+                max(bisect_right(self.true_counts, true_count) - 1, 0)
+            ]
+        mask = hand.valid_mask
+        if mask & SPLIT:
+            code = table[PAIR][hand.cards[0].value][dealer_up]
+            if code:
+                action = code & 31
+                return ACTION_NAMES[action if action & mask else code >> 5]
+        code = table[hand.soft][hand.total][dealer_up]
+        if not code:
+            kind = "soft" if hand.soft else "hard"
+            raise ValueError(
+                f"No action for a {kind} {hand.total} against a {dealer_up}"
+            )
+        action = code & 31
+        return ACTION_NAMES[action if action & mask else code >> 5]
+
+
 # read in strategy files
-BASIC_HARD = pd.read_csv(
-    Path(CUR_PATH, "strategy_files", "basic_hard.csv"),
-    index_col=0
-).to_dict()
-BASIC_SOFT = pd.read_csv(
-    Path(CUR_PATH, "strategy_files", "basic_soft.csv"),
-    index_col=0
-).to_dict()
-BASIC_SPLIT = pd.read_csv(
-    Path(CUR_PATH, "strategy_files", "basic_split.csv"),
-    index_col=0
-).to_dict()
+BASIC_HARD = read_strategy(Path(CUR_PATH, "strategy_files", "basic_hard.csv"))
+BASIC_SOFT = read_strategy(Path(CUR_PATH, "strategy_files", "basic_soft.csv"))
+BASIC_SPLIT = read_strategy(
+    Path(CUR_PATH, "strategy_files", "basic_split.csv")
+)
+BASIC_TABLES = (BASIC_HARD, BASIC_SOFT, BASIC_SPLIT)
+BASIC_STRATEGY = TableStrategy(*BASIC_TABLES)
+# strategies loaded by rule_strategy for each directory of generated tables,
+# from least to most recently used
+_rule_strategies = OrderedDict()
+
+
+def strategy_key(rules):
+    """
+    Return a key for the rules that change which action is best. Rules with
+    the same key share a generated strategy
+    Parameters
+    ----------
+    rules: Rules snapshot
+    """
+    values = {name: getattr(rules, name) for name in STRATEGY_RULES}
+    digest = hashlib.sha256(json.dumps(values, sort_keys=True).encode())
+    return digest.hexdigest()[:16]
+
+
+def strategy_dir(rules, cache_dir=None):
+    """
+    Return the directory the strategy generated for a set of rules is saved
+    in
+    Parameters
+    ----------
+    rules: Rules snapshot
+    cache_dir: directory generated files are saved in. Defaults to CACHE_DIR
+    """
+    if cache_dir is None:
+        cache_dir = CACHE_DIR
+    return Path(cache_dir, "strategies", strategy_key(rules))
+
+
+def rule_strategy(rules=None, cache_dir=None):
+    """
+    Return a TableStrategy that plays the tables py21.solver.generate_strategy
+    saved for a set of rules. basic_strategy always plays the tables in
+    strategy_files, so this is how generated tables are played
+    Parameters
+    ----------
+    rules: dictionary containing any rule updates, or a Rules snapshot
+    cache_dir: directory generated files are saved in. Defaults to CACHE_DIR
+    Raises
+    ------
+    FileNotFoundError if no strategy has been generated for the rules
+    """
+    from py21.game import load_rules
+
+    directory = strategy_dir(load_rules(rules), cache_dir)
+    strategy = _rule_strategies.get(directory)
+    if strategy is not None:
+        _rule_strategies.move_to_end(directory)
+        return strategy
+    paths = [Path(directory, name) for name in STRATEGY_FILES]
+    for path in paths:
+        if not path.exists():
+            raise FileNotFoundError(
+                f"No strategy has been generated for these rules: {path} "
+                "doesn't exist. Use py21.solver.generate_strategy"
+            )
+    strategy = TableStrategy.from_csv(*paths)
+    _rule_strategies[directory] = strategy
+    if len(_rule_strategies) > MAX_RULE_STRATEGIES:
+        _rule_strategies.popitem(last=False)
+    return strategy
 
 
 def basic_strategy(player, hand, dealer_up, game_params, **kwargs):
     """
-    Function that plays with the basic strategy. Source:
+    Function that plays with the basic strategy from the tables in
+    strategy_files. Use rule_strategy to play a strategy generated for the
+    game's rules instead. Source of the tables:
     https://www.blackjackapprenticeship.com/blackjack-strategy-charts/
 
     This function can be used at the strategy_func argument in an instance of
@@ -40,60 +314,114 @@ def basic_strategy(player, hand, dealer_up, game_params, **kwargs):
     **kwargs: misc. arguements that get passed into the function
     Returns
     -------
-    One of the following: HIT, STAND, DOUBLE, SPLIT
-    """
-    # strategy for splits
-    if "SPLIT" in hand.valid_actions:
-        action = BASIC_SPLIT[str(dealer_up)][hand.cards[0].value]
-        if action == "P":
-            return "SPLIT"
-        elif action == "Ph":
-            if game_params.double_after_split:
-                return "SPLIT"
-            else:
-                return "HIT"
-        elif action == "Rp":
-            if game_params.surrender_allowed:
-                return "SURRENDER"
-            else:
-                return "SPLIT"
-        elif action == "S":
-            return "STAND"
-    # strategy for hard hands
-    if not hand.soft:
-        action = BASIC_HARD[str(dealer_up)][hand.total]
-    else:
-        action = BASIC_SOFT[str(dealer_up)][hand.total]
+    One of the following: HIT, STAND, DOUBLE, SPLIT, SURRENDER
+    """
+    return BASIC_STRATEGY(player, hand, dealer_up, game_params)
 
-    # return input accepted by the blackjack game
-    if action == "H":
-        return "HIT"
-    elif action == "S":
-        return "STAND"
-    elif action.startswith("D"):
-        # see if double down is allowed
-        # allowed = len(hand.cards) == 2 and hand.player.bankroll >= hand.wager
-        allowed = "DOUBLE" in hand.valid_actions
-        if hand.from_split and allowed:
-            allowed = game_params.double_after_split
-        if not allowed:
-            if action.endswith("h"):
-                return "HIT"
-            elif action.endswith("s"):
-                return "STAND"
-        return "DOUBLE"
-    elif action.startswith("R"):
-        allowed = "SURRENDER" in hand.valid_actions
-        if allowed:
-            return "SURRENDER"
-        else:
-            if action.endswith("h"):
-                return "HIT"
-            elif action.endswith("s"):
-                return "STAND"
-    else:
-        msg = f"{action} does not have associated action"
-        raise ValueError(msg)
+
+def read_deviations(path):
+    """
+    Read a deviation file written by py21.solver.generate_deviations
+    Parameters
+    ----------
+    path: path to the CSV file
+    Returns
+    -------
+    A dictionary mapping each (hand, total, dealer up card) cell to a list of
+    (when, index, code) deviations. hand is "hard", "soft", "pair", or
+    "insurance", and when is ">=" if the deviation is made when the true
+    count is at least the index and "<=" if it's at most the index
+    """
+    with open(path, newline="") as f:
+        rows = list(csv.DictReader(f))
+    deviations = {}
+    for row in rows:
+        cell = (row["hand"], int(row["total"]), int(row["up"]))
+        deviations.setdefault(cell, []).append(
+            (row["when"], float(row["index"]), row["code"])
+        )
+    return deviations
+
+
+class Deviations:
+    """
+    Plays the basic strategy tables the deviations were generated against,
+    but switches to another action in a cell when the true count passes the
+    cell's index. The deviations are compiled into a TableStrategy with a
+    set of tables for each range of true counts where the same deviations
+    are made. The strategy attribute and the insurance method can be used as
+    the strategy_func and insurance_func arguments of the Player class.
+    """
+
+    def __init__(self, path):
+        """
+        Parameters
+        ----------
+        path: path to a deviation file written by
+            py21.solver.generate_deviations. The hard, soft, and split tables
+            the indexes were computed from are read from the same directory
+        """
+        self.path = path
+        self.deviations = read_deviations(path)
+        self.tables = tuple(
+            read_strategy(Path(path).parent / name) for name in STRATEGY_FILES
+        )
+        # the same deviations are made from each of these true counts up to
+        # the next one. Deviations made at or below an index stop just above
+        # it
+        starts = {-math.inf}
+        for (hand, _, _), cells in self.deviations.items():
+            if hand == "insurance":
+                continue
+            for when, index, _ in cells:
+                starts.add(index if when == ">=" else
+                           math.nextafter(index, math.inf))
+        true_counts = sorted(starts)
+        charts = [
+            [
+                {
+                    up: {
+                        total: self.code(hand, total, int(up), true_count,
+                                         code)
+                        for total, code in column.items()
+                    }
+                    for up, column in table.items()
+                }
+                for true_count in true_counts
+            ]
+            for hand, table in zip(("hard", "soft", "pair"), self.tables)
+        ]
+        self.strategy = TableStrategy(*charts, true_counts=true_counts)
+        # lowest true count insurance is taken at
+        self.insurance_index = math.inf
+        for when, index, code in self.deviations.get(("insurance", 0, 11), ()):
+            if when == ">=" and code == "I":
+                self.insurance_index = index
+
+    def code(self, hand, total, up, true_count, default):
+        """
+        Return the code played in a cell at a true count
+        Parameters
+        ----------
+        hand: "hard", "soft", "pair", or "insurance"
+        total: hand total, or the value of the paired card
+        up: dealer's up card
+        true_count: true count when the decision is made
+        default: code played when no deviation applies
+        """
+        for when, index, code in self.deviations.get((hand, total, up), ()):
+            if when == ">=" and true_count >= index:
+                return code
+            if when == "<=" and true_count <= index:
+                return code
+        return default
+
+    def insurance(self, true_count=0, **kwargs):
+        """
+        Insurance function that takes insurance when the true count is at or
+        above the insurance index
+        """
+        return true_count >= self.insurance_index
 
 
 def user_input(player, hand, dealer_up, count, ten_count, other_count,
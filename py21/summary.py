@@ -0,0 +1,531 @@
+"""
+Mergeable summaries of simulation results.
+
+A summary only holds counts, sums, sums of squares, and histograms, so the
+summaries from any number of independent simulations can be added together in
+any order to get the summary of all of them.
+"""
+import json
+import math
+from statistics import NormalDist
+
+
+RESULTS = ("win", "loss", "push", "surrender")
+# totals kept by PlayerSummary that are added together when merging
+SUMS = ("rounds", "hands", "blackjacks", "total_wagered", "net", "net_sq",
+        "wagered_sq", "net_wagered")
+
+
+class PlayerSummary:
+
+    def __init__(self):
+        """
+        Summary of one player's results. The net result of every round the
+        player took part in is used for the mean, variance, and histogram.
+        """
+        self.rounds = 0
+        self.hands = 0
+        self.blackjacks = 0
+        self.results = dict.fromkeys(RESULTS, 0)
+        self.total_wagered = 0
+        # sum and sum of squares of the net result of each round
+        self.net = 0
+        self.net_sq = 0
+        # sums of the squared amount wagered in each round and of the net
+        # result times the amount wagered, used for the house edge's stderr
+        self.wagered_sq = 0
+        self.net_wagered = 0
+        # number of rounds with each net result
+        self.histogram = {}
+
+    def add_round(self, change, hands):
+        """
+        Add a round to the summary
+        Parameters
+        ----------
+        change: change in the player's bankroll over the round
+        hands: HandOutcome records for the player's hands in the round
+        """
+        if not hands:
+            return
+        change = float(change)
+        self.rounds += 1
+        self.net += change
+        self.net_sq += change * change
+        self.histogram[change] = self.histogram.get(change, 0) + 1
+        wagered = 0
+        for hand in hands:
+            self.hands += 1
+            self.blackjacks += hand.blackjack
+            self.results[hand.result] += 1
+            wagered += hand.wager
+        self.total_wagered += wagered
+        self.wagered_sq += wagered * wagered
+        self.net_wagered += change * wagered
+
+    def merge(self, other):
+        """
+        Return a new summary combining this one and `other`
+        """
+        merged = PlayerSummary()
+        for name in SUMS:
+            setattr(merged, name, getattr(self, name) + getattr(other, name))
+        for result in RESULTS:
+            merged.results[result] = (
+                self.results[result] + other.results[result]
+            )
+        merged.histogram = dict(self.histogram)
+        for change, count in other.histogram.items():
+            merged.histogram[change] = merged.histogram.get(change, 0) + count
+        return merged
+
+    @property
+    def mean(self):
+        """
+        Average net result per round
+        """
+        return self.net / self.rounds if self.rounds else 0
+
+    @property
+    def variance(self):
+        """
+        Sample variance of the net result per round
+        """
+        if self.rounds < 2:
+            return 0
+        variance = (self.net_sq - self.net * self.net / self.rounds) / (
+            self.rounds - 1
+        )
+        return max(variance, 0)
+
+    @property
+    def stderr(self):
+        """
+        Standard error of the mean net result per round
+        """
+        if not self.rounds:
+            return 0
+        return math.sqrt(self.variance / self.rounds)
+
+    @property
+    def house_edge(self):
+        """
+        Amount the player lost per unit wagered
+        """
+        if not self.total_wagered:
+            return 0
+        return -self.net / self.total_wagered
+
+    @property
+    def house_edge_stderr(self):
+        """
+        Standard error of the house edge. The house edge is a ratio of the
+        net result to the amount wagered, so the delta method is used the
+        same way as in RatioEstimate
+        """
+        if self.rounds < 2 or not self.total_wagered:
+            return 0
+        ratio = self.net / self.total_wagered
+        variance = (
+            self.net_sq - 2 * ratio * self.net_wagered
+            + ratio * ratio * self.wagered_sq
+        ) / (self.rounds - 1)
+        mean_wagered = self.total_wagered / self.rounds
+        return math.sqrt(max(variance, 0) / self.rounds) / mean_wagered
+
+    def to_dict(self):
+        data = {name: getattr(self, name) for name in SUMS + ("results",)}
+        # JSON keys have to be strings
+        data["histogram"] = [
+            [change, count] for change, count in sorted(self.histogram.items())
+        ]
+        return data
+
+    @classmethod
+    def from_dict(cls, data):
+        missing = [name for name in SUMS if name not in data]
+        if missing:
+            raise KeyError(f"Summary is missing {', '.join(missing)}")
+        summary = cls()
+        for name in SUMS:
+            setattr(summary, name, data[name])
+        summary.results.update(data["results"])
+        summary.histogram = {
+            change: count for change, count in data["histogram"]
+        }
+        return summary
+
+
+class PlayerStats:
+
+    def __init__(self):
+        """
+        Running statistics of every hand a player settles, kept in constant
+        memory. Used in place of the hand history by players created with
+        record_history=False. The variance of the net result of each hand is
+        updated with Welford's algorithm, and the drawdown is measured on the
+        player's cumulative net result.
+        """
+        self.hands = 0
+        self.results = dict.fromkeys(RESULTS, 0)
+        self.blackjacks = 0
+        self.doubles = 0
+        self.split_hands = 0
+        self.total_wagered = 0
+        # mean and sum of squared deviations of the net result of each hand
+        self.mean = 0.0
+        self.m2 = 0.0
+        # cumulative net result, its highest and lowest values, and the
+        # largest drop from a high
+        self.net = 0
+        self.peak = 0
+        self.trough = 0
+        self.max_drawdown = 0
+
+    def add_hand(self, net, wager, result, blackjack, double_down,
+                 from_split):
+        """
+        Add a settled hand
+        Parameters
+        ----------
+        net: change in the player's bankroll from the hand, including any
+            insurance
+        wager: final wager on the hand
+        result: "win", "loss", "push", or "surrender"
+        blackjack, double_down, from_split: whether the hand was a
+            blackjack, was doubled down, or came from a split
+        """
+        self.hands += 1
+        self.results[result] += 1
+        self.blackjacks += blackjack
+        self.doubles += double_down
+        self.split_hands += from_split
+        self.total_wagered += wager
+        delta = net - self.mean
+        self.mean += delta / self.hands
+        self.m2 += delta * (net - self.mean)
+        self.net += net
+        if self.net > self.peak:
+            self.peak = self.net
+        if self.net < self.trough:
+            self.trough = self.net
+        if self.peak - self.net > self.max_drawdown:
+            self.max_drawdown = self.peak - self.net
+
+    def merge(self, other):
+        """
+        Return new stats combining this one and `other`, with the hands in
+        `other` played after the hands in this one. The order only matters
+        for the drawdown
+        """
+        merged = PlayerStats()
+        for name in ["hands", "blackjacks", "doubles", "split_hands",
+                     "total_wagered", "net"]:
+            setattr(merged, name, getattr(self, name) + getattr(other, name))
+        for result in RESULTS:
+            merged.results[result] = (
+                self.results[result] + other.results[result]
+            )
+        if merged.hands:
+            delta = other.mean - self.mean
+            merged.mean = self.mean + delta * other.hands / merged.hands
+            merged.m2 = (
+                self.m2 + other.m2
+                + delta * delta * self.hands * other.hands / merged.hands
+            )
+        merged.peak = max(self.peak, self.net + other.peak)
+        merged.trough = min(self.trough, self.net + other.trough)
+        # the largest drop could start in this one and end in `other`
+        merged.max_drawdown = max(
+            self.max_drawdown, other.max_drawdown,
+            self.peak - self.net - other.trough
+        )
+        return merged
+
+    def __add__(self, other):
+        return self.merge(other)
+
+    @property
+    def rates(self):
+        """
+        Fraction of hands with each result
+        """
+        return {
+            result: count / self.hands if self.hands else 0
+            for result, count in self.results.items()
+        }
+
+    @property
+    def blackjack_rate(self):
+        return self.blackjacks / self.hands if self.hands else 0
+
+    @property
+    def double_rate(self):
+        return self.doubles / self.hands if self.hands else 0
+
+    @property
+    def split_rate(self):
+        """
+        Fraction of hands that came from a split
+        """
+        return self.split_hands / self.hands if self.hands else 0
+
+    @property
+    def ev(self):
+        """
+        Average net result per unit wagered
+        """
+        return self.net / self.total_wagered if self.total_wagered else 0
+
+    @property
+    def variance(self):
+        """
+        Sample variance of the net result per hand
+        """
+        return self.m2 / (self.hands - 1) if self.hands > 1 else 0
+
+    @property
+    def stderr(self):
+        """
+        Standard error of the mean net result per hand
+        """
+        return math.sqrt(self.variance / self.hands) if self.hands else 0
+
+    def to_dict(self):
+        return {
+            name: getattr(self, name)
+            for name in ["hands", "results", "blackjacks", "doubles",
+                         "split_hands", "total_wagered", "mean", "m2", "net",
+                         "peak", "trough", "max_drawdown"]
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        stats = cls()
+        for name, value in data.items():
+            setattr(stats, name, value)
+        stats.results = dict(data["results"])
+        return stats
+
+
+class RatioEstimate:
+
+    def __init__(self):
+        """
+        Online estimate of the house edge from the net result and amount
+        wagered in each round. Rounds are the samples, so hands in the same
+        round, which are correlated through splits and the dealer's hand,
+        are never treated as independent. The means and co-moments are
+        updated with Welford's algorithm and the standard error of the ratio
+        comes from the delta method.
+        """
+        self.rounds = 0
+        self.mean_net = 0.0
+        self.mean_wagered = 0.0
+        # sums of squared deviations from the means and of the products of
+        # the deviations
+        self.m_net = 0.0
+        self.m_wagered = 0.0
+        self.m_cross = 0.0
+
+    def add(self, net, wagered):
+        """
+        Add a round with a net result of `net` and `wagered` bet
+        """
+        self.rounds += 1
+        d_net = net - self.mean_net
+        d_wagered = wagered - self.mean_wagered
+        self.mean_net += d_net / self.rounds
+        self.mean_wagered += d_wagered / self.rounds
+        self.m_net += d_net * (net - self.mean_net)
+        self.m_wagered += d_wagered * (wagered - self.mean_wagered)
+        self.m_cross += d_net * (wagered - self.mean_wagered)
+
+    def merge(self, other):
+        """
+        Return a new estimate combining this one and `other`
+        """
+        merged = RatioEstimate()
+        n = merged.rounds = self.rounds + other.rounds
+        if not n:
+            return merged
+        d_net = other.mean_net - self.mean_net
+        d_wagered = other.mean_wagered - self.mean_wagered
+        weight = self.rounds * other.rounds / n
+        merged.mean_net = self.mean_net + d_net * other.rounds / n
+        merged.mean_wagered = (
+            self.mean_wagered + d_wagered * other.rounds / n
+        )
+        merged.m_net = self.m_net + other.m_net + d_net * d_net * weight
+        merged.m_wagered = (
+            self.m_wagered + other.m_wagered + d_wagered * d_wagered * weight
+        )
+        merged.m_cross = (
+            self.m_cross + other.m_cross + d_net * d_wagered * weight
+        )
+        return merged
+
+    @property
+    def house_edge(self):
+        """
+        Amount lost per unit wagered
+        """
+        if not self.mean_wagered:
+            return 0
+        return -self.mean_net / self.mean_wagered
+
+    @property
+    def stderr(self):
+        """
+        Standard error of the house edge. Infinite until there are at least
+        two rounds
+        """
+        if self.rounds < 2 or not self.mean_wagered:
+            return math.inf
+        ratio = self.mean_net / self.mean_wagered
+        variance = (
+            self.m_net - 2 * ratio * self.m_cross
+            + ratio * ratio * self.m_wagered
+        ) / (self.rounds - 1)
+        return math.sqrt(max(variance, 0) / self.rounds) / self.mean_wagered
+
+    def interval(self, level=0.95):
+        """
+        Return the lower and upper bounds of a confidence interval for the
+        house edge
+        """
+        z = NormalDist().inv_cdf(0.5 + level / 2)
+        return (self.house_edge - z * self.stderr,
+                self.house_edge + z * self.stderr)
+
+
+class Precision:
+
+    def __init__(self, num_players):
+        """
+        Estimates kept by Game.simulate when it's stopped by until_stderr or
+        time_budget. Each player has a RatioEstimate, and `table` pools the
+        rounds of every player so the seats' shared dealer hands are
+        accounted for.
+        """
+        self.players = [RatioEstimate() for _ in range(num_players)]
+        self.table = RatioEstimate()
+        # time spent playing and why the simulation stopped: "stderr",
+        # "time", "rounds", or "bankroll"
+        self.seconds = 0
+        self.reason = None
+
+    @property
+    def rounds(self):
+        return self.table.rounds
+
+    @property
+    def stderr(self):
+        """
+        Largest standard error of any player's house edge
+        """
+        return max(
+            (player.stderr for player in self.players if player.rounds),
+            default=math.inf
+        )
+
+    def interval(self, level=0.95):
+        """
+        Return a confidence interval for each player's house edge
+        """
+        return [player.interval(level) for player in self.players]
+
+
+class Summary:
+
+    def __init__(self, num_players=0, shards=(), job=None):
+        """
+        Summary of a simulation, or a group of simulations, with one
+        PlayerSummary for each player
+        Parameters
+        ----------
+        num_players: number of players in the simulation
+        shards: IDs of the shards included in the summary. Used to make sure
+            a shard isn't counted twice when summaries are merged
+        job: ID of the job the shards are from. Only summaries from the same
+            job can be merged
+        """
+        self.players = [PlayerSummary() for _ in range(num_players)]
+        self.shards = set(shards)
+        self.job = job
+
+    def add_round(self, record):
+        """
+        Add a RoundRecord from Game.iter_rounds to the summary
+        """
+        for player_id, player in enumerate(self.players):
+            hands = [
+                hand for hand in record.hands if hand.player_id == player_id
+            ]
+            player.add_round(record.bankroll_changes[player_id], hands)
+
+    def merge(self, other):
+        """
+        Return a new summary combining this one and `other`. Merging is
+        associative and commutative, so summaries can be merged in any order.
+        """
+        if self.job != other.job:
+            raise ValueError("Summaries must be from the same job")
+        if len(self.players) != len(other.players):
+            raise ValueError("Summaries must have the same number of players")
+        overlap = self.shards & other.shards
+        if overlap:
+            raise ValueError(f"Shards {sorted(overlap)} are in both summaries")
+        merged = Summary(shards=self.shards | other.shards, job=self.job)
+        merged.players = [
+            player.merge(other_player)
+            for player, other_player in zip(self.players, other.players)
+        ]
+        return merged
+
+    def __add__(self, other):
+        return self.merge(other)
+
+    def to_dict(self):
+        return {
+            "job": self.job,
+            "shards": sorted(self.shards),
+            "players": [player.to_dict() for player in self.players],
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        summary = cls(shards=data["shards"], job=data["job"])
+        summary.players = [
+            PlayerSummary.from_dict(player) for player in data["players"]
+        ]
+        return summary
+
+    def save(self, path):
+        """
+        Write the summary to a JSON file
+        """
+        with open(path, "w") as f:
+            json.dump(self.to_dict(), f)
+
+    @classmethod
+    def load(cls, path):
+        """
+        Read a summary written by Summary.save
+        """
+        with open(path) as f:
+            return cls.from_dict(json.load(f))
+
+
+def merge(summaries):
+    """
+    Merge any number of summaries, or paths to summary files, into one
+    """
+    merged = None
+    for summary in summaries:
+        if not isinstance(summary, Summary):
+            summary = Summary.load(summary)
+        merged = summary if merged is None else merged.merge(summary)
+    if merged is None:
+        raise ValueError("No summaries to merge")
+    return merged
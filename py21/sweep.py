@@ -0,0 +1,157 @@
+"""
+Estimate the house edge over a grid of rules.
+
+Every combination of the values in the grid is a cell. Cells are played in
+rungs on one pool of worker processes. After each rung, only the cells whose
+confidence intervals are still wide or overlap with another cell's interval
+are played again, with twice as many rounds as the rung before, so most of
+the rounds go to the cells that are hardest to tell apart.
+"""
+import itertools
+import math
+from concurrent.futures import ProcessPoolExecutor
+from py21.deck import ShoeStream
+from py21.game import Game
+from py21.vector import simulate_tables
+
+
+def grid_cells(grid):
+    """
+    Return a list with the rules for every cell in a grid
+    Parameters
+    ----------
+    grid: dictionary mapping rule names to lists of values
+    """
+    names = list(grid)
+    return [
+        dict(zip(names, values))
+        for values in itertools.product(*[grid[name] for name in names])
+    ]
+
+
+def _run_cell(task):
+    players, rules, tables, rounds, stream, engine = task
+    return simulate_tables(players, rules, tables=tables, rounds=rounds,
+                           seed=stream, engine=engine)
+
+
+def _intervals(summaries, z):
+    """
+    Return the house edge and half width of the confidence interval for
+    each player in each cell
+    """
+    return [
+        [
+            (player.house_edge, z * player.house_edge_stderr)
+            for player in summary.players
+        ]
+        for summary in summaries
+    ]
+
+
+def _next_cells(active, summaries, z, keep, tolerance):
+    """
+    Pick the cells to play in the next rung
+    """
+    intervals = _intervals(summaries, z)
+    priorities = {}
+    for cell in active:
+        for player_id, (edge, width) in enumerate(intervals[cell]):
+            wide = tolerance is not None and width > z * tolerance
+            gaps = [
+                abs(edge - other[player_id][0])
+                for i, other in enumerate(intervals) if i != cell
+            ]
+            overlaps = [
+                abs(edge - other[player_id][0]) <= width + other[player_id][1]
+                for i, other in enumerate(intervals) if i != cell
+            ]
+            if not (wide or any(overlaps)):
+                continue
+            # cells with wide intervals close to another cell come first
+            gap = max(min(gaps, default=math.inf), 1e-12)
+            priorities[cell] = max(priorities.get(cell, 0), width / gap)
+    num_kept = math.ceil(keep * len(priorities))
+    ranked = sorted(priorities, key=lambda cell: (-priorities[cell], cell))
+    return sorted(ranked[:num_kept])
+
+
+def sweep(grid, players, rounds, seed=None, rules=None, tables=100, rungs=3,
+          keep=0.5, z=1.96, tolerance=None, workers=None, engine="auto"):
+    """
+    Estimate the house edge for every cell in a grid of rules
+    Parameters
+    ----------
+    grid: dictionary mapping rule names to lists of values
+    players: list of Player objects used at every table
+    rounds: number of rounds played for each cell in the first rung. Each
+        rung after that plays twice as many rounds as the one before
+    seed: master seed. Each cell and rung uses its own child stream
+    rules: rules shared by every cell
+    tables: number of tables each cell's rounds are split across
+    rungs: largest number of rungs to play
+    keep: fraction of the unresolved cells that are played in the next rung
+    z: z-score used for the confidence intervals
+    tolerance: cells whose house edge standard error is at most this are
+        resolved and not played again
+    workers: number of worker processes. If 1, the cells are played in this
+        process
+    engine: engine passed to py21.vector.simulate_tables
+    Returns
+    -------
+    A pandas DataFrame with one row for each cell and player
+    """
+    import pandas as pd
+
+    base_rules = dict(rules) if rules else {}
+    cells = [{**base_rules, **cell} for cell in grid_cells(grid)]
+    # validate every cell's rules before starting
+    for cell_rules in cells:
+        Game(players, rules=cell_rules, record="none")
+    stream = ShoeStream(seed)
+    summaries = [None] * len(cells)
+    played = [0] * len(cells)
+    executor = ProcessPoolExecutor(workers) if workers != 1 else None
+    try:
+        active = list(range(len(cells)))
+        for rung in range(rungs):
+            rung_rounds = rounds * 2 ** rung
+            tasks = [
+                (players, cells[cell], tables, -(-rung_rounds // tables),
+                 stream.stream(cell).stream(rung), engine)
+                for cell in active
+            ]
+            if executor is None:
+                results = map(_run_cell, tasks)
+            else:
+                results = executor.map(_run_cell, tasks)
+            for cell, summary in zip(active, results):
+                if summaries[cell] is not None:
+                    summary = summaries[cell].merge(summary)
+                summaries[cell] = summary
+                played[cell] += 1
+            if rung + 1 < rungs:
+                active = _next_cells(active, summaries, z, keep, tolerance)
+                if not active:
+                    break
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    rows = []
+    for cell, cell_rules in enumerate(grid_cells(grid)):
+        for player_id, player in enumerate(summaries[cell].players):
+            edge = player.house_edge
+            stderr = player.house_edge_stderr
+            rows.append({
+                **cell_rules,
+                "player_id": player_id,
+                "rounds": player.rounds,
+                "hands": player.hands,
+                "house_edge": edge,
+                "stderr": stderr,
+                "ci_low": edge - z * stderr,
+                "ci_high": edge + z * stderr,
+                "rungs": played[cell],
+            })
+    return pd.DataFrame(rows)
@@ -1,8 +1,11 @@
 """
 Test Suite for Card class
 """
+import copy
+import pickle
 import pytest
 from py21 import Card
+from py21.card import CARDS
 
 
 def test_card_implementation():
@@ -18,3 +21,21 @@ def test_add_cards():
     assert isinstance(card_one + card_two, int)
     with pytest.raises(TypeError):
         card_one + []
+
+
+def test_flyweight():
+    card = Card(14, "S")
+    assert card is Card(14, "S")
+    assert CARDS[card.code] is card
+    assert str(card) == "A♠"
+    assert str(Card(10, "H")) == "10♥"
+    with pytest.raises(AttributeError):
+        card.rank = 2
+    with pytest.raises(AttributeError):
+        card.other = 2
+    # copies are the same object
+    assert pickle.loads(pickle.dumps(card)) is card
+    assert copy.deepcopy(card) is card
+    # cards compare and hash by value
+    assert Card(12, "H") == Card(13, "C")
+    assert hash(Card(12, "H")) == hash(Card(13, "C"))
@@ -1,8 +1,10 @@
 """
 Test suite for the deck class
 """
+import numpy as np
 import pytest
 from py21 import Card, Deck
+from py21.deck import ShoeStream
 
 
 def test_deck():
@@ -16,3 +18,67 @@ def test_deck():
     # test without burning a card
     deck = Deck(3, burn=False)
     assert len(deck) == 52 * 3
+
+
+def test_deal_many():
+    deck = Deck(1, burn=False, seed=123)
+    top = deck.deck[:5]
+    cards = deck.deal_many(5)
+    assert [str(card) for card in cards] == [str(card) for card in top]
+    assert len(deck) == 52 - 5
+    with pytest.raises(IndexError):
+        deck.deal_many(48)
+    # a failed deal shouldn't remove any cards
+    assert len(deck) == 52 - 5
+
+
+def test_shoe_generator():
+    deck = Deck(2, seed=5)
+    shoes = deck.generator.generate(0, 10)
+    assert shoes.shape == (10, 104)
+    # every shoe contains each card exactly twice
+    assert np.all(np.sort(shoes, axis=1) == np.sort(deck.generator.base))
+    # the same seed gives the same shoes
+    first = [str(card) for card in Deck(2, seed=5).deck]
+    assert first == [str(card) for card in Deck(2, seed=5).deck]
+    assert first != [str(card) for card in Deck(2, seed=6).deck]
+    # a new shoe is taken from the batch when the deck is shuffled
+    deck = Deck(2, seed=5, batch_size=4)
+    for _ in range(6):
+        deck.create_deck()
+        assert len(deck) == 103
+    assert deck.num_creates == 7
+
+
+def test_independent_streams():
+    # creating a second deck must not change the first deck's shoes
+    deck_one = Deck(1, seed=10)
+    first = [str(card) for card in deck_one.deck]
+    Deck(1, seed=11)
+    deck_one.create_deck()
+    expected = Deck(1, seed=10)
+    expected.create_deck()
+    assert [str(card) for card in deck_one.deck] == (
+        [str(card) for card in expected.deck]
+    )
+    assert first != [str(card) for card in deck_one.deck]
+    # child streams are independent and match SeedSequence.spawn
+    stream = ShoeStream(10)
+    children = stream.spawn(3)
+    assert children[2].seed_seq.spawn_key == (2,)
+    assert np.array_equal(children[1].key, stream.stream(1).key)
+    assert not np.array_equal(children[0].key, children[1].key)
+
+
+def test_seek():
+    deck = Deck(2, seed=3, batch_size=4, stream=7)
+    for _ in range(9):
+        deck.create_deck()
+    assert deck.shoe_id == 9
+    shoe = deck.shoe.copy()
+    # jump straight to the same shoe in a new deck
+    other = Deck(2, seed=3, stream=7)
+    other.seek(9)
+    assert np.array_equal(other.shoe, shoe)
+    assert np.array_equal(other.generator.shoe(9), shoe)
+    assert len(other) == len(deck)
@@ -0,0 +1,145 @@
+"""
+Test suite for the exact calculations
+"""
+import pytest
+from py21 import Card, Game, Hand, Player, exact
+from py21.exact import (
+    Calculator, house_edge, full_shoe, remove, perfect_play, perfect_insurance
+)
+from py21.game import load_rules
+from py21.handstate import TRANSITIONS, EMPTY_HAND, STATE_TOTAL, CARD_VALUES
+from py21.strategies import basic_strategy, hit_to_seventeen
+
+
+def dealer_brute_force(composition, state, stands):
+    """
+    Probability of each final dealer total found one card at a time
+    """
+    total = STATE_TOTAL[state]
+    if stands[state]:
+        return {min(total, 22): 1.0}
+    results = {}
+    size = sum(composition)
+    for i, count in enumerate(composition):
+        if not count:
+            continue
+        rest = remove(composition, CARD_VALUES[i])
+        sub = dealer_brute_force(
+            rest, TRANSITIONS[state][CARD_VALUES[i]][0], stands
+        )
+        for final, prob in sub.items():
+            results[final] = results.get(final, 0) + count / size * prob
+    return results
+
+
+@pytest.mark.parametrize("up", [2, 6, 10, 11])
+def test_dealer_probabilities(up):
+    calc = Calculator({"num_decks": 1, "soft_stand": False})
+    # a small shoe so the brute force version is quick
+    composition = (1, 1, 2, 1, 2, 1, 1, 1, 5, 2)
+    probs = calc.dealer_probabilities(up, composition)
+    assert sum(probs.values()) == pytest.approx(1)
+    expected = {}
+    up_state = TRANSITIONS[EMPTY_HAND][up][0]
+    size = sum(composition)
+    for i, count in enumerate(composition):
+        value = CARD_VALUES[i]
+        if not count:
+            continue
+        hole_state = TRANSITIONS[up_state][value][0]
+        if STATE_TOTAL[hole_state] == 21:
+            expected["blackjack"] = expected.get("blackjack", 0) + count / size
+            continue
+        sub = dealer_brute_force(
+            remove(composition, value), hole_state, calc._stands
+        )
+        for final, prob in sub.items():
+            final = "bust" if final == 22 else final
+            expected[final] = expected.get(final, 0) + count / size * prob
+    for result, prob in probs.items():
+        assert prob == pytest.approx(expected.get(result, 0))
+
+
+def test_action_evs():
+    calc = Calculator()
+    evs = calc.action_evs([10, 6], 10)
+    assert set(evs) == {"STAND", "HIT", "DOUBLE", "SURRENDER"}
+    assert evs["SURRENDER"] == pytest.approx(-0.5)
+    assert evs["HIT"] > evs["STAND"]
+    assert calc.best_action([10, 6], 10) == "SURRENDER"
+    assert calc.best_action([11, 11], 6) == "SPLIT"
+    assert calc.best_action([10, 10], 6) == "STAND"
+    # no surrender after splitting by default
+    assert "SURRENDER" not in calc.action_evs([10, 6], 10, from_split=True)
+    with pytest.raises(ValueError):
+        remove(full_shoe(1), *[11] * 5)
+
+
+def test_evaluate():
+    # a small shoe so every strategy can be worked out quickly
+    composition = (2, 2, 2, 2, 2, 2, 2, 2, 8, 2)
+    calc = Calculator()
+    basic = calc.evaluate(basic_strategy, composition=composition)
+    perfect = calc.evaluate(composition=composition)
+    worse = calc.evaluate(hit_to_seventeen, composition=composition)
+    assert perfect["ev"] >= basic["ev"] > worse["ev"]
+    # hit_to_seventeen never doubles or splits
+    assert worse["wagered"] == pytest.approx(1)
+    assert basic["wagered"] > 1
+
+
+def test_house_edge(tmp_path):
+    rules = {"num_decks": 2, "blackjack_payout": 1.2}
+    result = house_edge(rules, basic_strategy, cache_dir=tmp_path)
+    assert 0.01 < result["house_edge"] < 0.02
+    # the result is saved and reused
+    assert len(list(tmp_path.iterdir())) == 1
+    assert house_edge(rules, basic_strategy, cache_dir=tmp_path) == result
+
+
+def test_perfect_play():
+    rules = load_rules({"num_decks": 1})
+    player = Player(100)
+    hand = Hand(Card(10, "S"), player=player, min_bet=5, max_bet=500,
+                game_params=rules)
+    hand.add_card_two(Card(6, "D"))
+    small = (4, 4, 4, 4, 4, 4, 4, 4, 4, 4)
+    tens = (1, 1, 1, 1, 1, 1, 1, 1, 14, 1)
+    assert perfect_play(player, hand, 10, rules, small) == "HIT"
+    assert perfect_play(player, hand, 10, rules, tens) == "SURRENDER"
+    assert perfect_insurance(rules, tens)
+    assert not perfect_insurance(rules, small)
+    # a game played perfectly
+    player = Player(10 ** 6, strategy_func=perfect_play,
+                    insurance_func=perfect_insurance)
+    game = Game([player, Player(10 ** 6)], rules={"num_decks": 1}, seed=3,
+                record="none")
+    game.simulate(50, mode="fast")
+    assert player.total_wagered >= 250
+    # only the most recently used calculators are kept
+    for num_decks in range(1, exact.MAX_CALCULATORS + 3):
+        params = load_rules({"num_decks": num_decks})
+        perfect_play(player, hand, 10, params, small)
+    assert len(exact._calculators) == exact.MAX_CALCULATORS
+    assert list(exact._calculators)[-1] is params
+
+
+def test_set_shoe():
+    calc = Calculator({"num_decks": 1})
+    shoe = remove(full_shoe(1), 10, 6, 10)
+    calc.set_shoe(shoe)
+    evs = calc.action_evs([10, 6], 10, shoe)
+    saved = calc._num_saved()
+    # results for smaller shoes are kept and reused
+    smaller = remove(shoe, 2)
+    calc.set_shoe(smaller)
+    assert calc._num_saved() == saved
+    calc.action_evs([10, 6, 2], 10, smaller)
+    assert calc._num_saved() == saved
+    # results that can't be reached again are dropped
+    calc.set_shoe(remove(smaller, 11), max_saved=saved - 1)
+    assert 0 < calc._num_saved() < saved
+    # a new shoe starts over
+    calc.set_shoe(full_shoe(1))
+    assert calc._num_saved() == 0
+    assert calc.action_evs([10, 6], 10, shoe) == evs
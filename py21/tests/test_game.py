@@ -5,10 +5,19 @@ Test suite for the game class
 # ignore no-member in pylist because it's raised for the game parameters
 # because pylint doesn't know about paramtools
 # pylint: disable=no-member
+import random
 import pandas as pd
 import numpy as np
 import pytest
 from py21 import Game, Player
+from py21.deck import ShoeStream
+import py21.game
+from py21.game import full_shoe, _play_block, _safe_bankroll
+from py21.handstate import CARD_VALUES
+from py21.strategies import (
+    random_choice, maximum_bet, hit_to_seventeen, accept_insurance
+)
+from py21.summary import RatioEstimate
 
 
 def test_game_implementation():
@@ -36,7 +45,7 @@ def test_game_implementation():
         return "SURRENDER"
 
     player = Player(100, strategy_func=surrender)
-    game = Game([player], rules=rules, verbose=True)
+    game = Game([player], rules=rules, verbose=True, seed=1)
     with pytest.raises(ValueError):
         game.play_round()
 
@@ -74,3 +83,387 @@ def test_data():
     assert data["num_aces"].max() >= 0
     assert np.all(data["num_hard_aces"] <= data["num_aces"])
     assert np.all(data["num_aces"] <= data["num_cards"])
+
+
+@pytest.mark.parametrize(
+    "rules", [None, {"num_decks": 2, "hit_split_aces": True, "shuffle_freq": 5}]
+)
+def test_fast_mode(rules):
+    """
+    The fast engine must give exactly the same results as play_round
+    """
+    def play(mode):
+        players = [Player(10000), Player(10000, strategy_func=random_choice)]
+        game = Game(players, rules=rules, seed=42)
+        random.seed(1)
+        game.simulate(2000, mode=mode)
+        return game, players
+
+    ref_game, ref_players = play("reference")
+    fast_game, fast_players = play("fast")
+    for ref, fast in zip(ref_players, fast_players):
+        assert ref.bankroll == fast.bankroll
+        assert ref.total_wagered == fast.total_wagered
+        assert ref.history == fast.history
+    assert ref_game.hit_results == fast_game.hit_results
+    assert ref_game.count_data == fast_game.count_data
+    with pytest.raises(ValueError):
+        fast_game.simulate(10, mode="slow")
+
+
+@pytest.mark.parametrize(
+    "rules", [
+        None,
+        {"surrender_allowed": True, "surrender_after_split": True,
+         "double_after_split": False},
+        {"num_decks": 1, "shuffle_freq": 0.5, "hit_split_aces": True,
+         "max_split_hands": 1},
+    ]
+)
+def test_fast_mode_tables(rules):
+    """
+    Players whose strategies are looked up in compiled tables must also get
+    exactly the same results as with play_round
+    """
+    def play(mode):
+        players = [
+            Player(300),
+            Player(10**6, wager_func=maximum_bet,
+                   insurance_func=accept_insurance),
+            Player(10000, strategy_func=hit_to_seventeen),
+            Player(10000, record_history=False),
+        ]
+        game = Game(players, rules=rules, seed=7)
+        game.simulate(3000, mode=mode)
+        return game, players
+
+    ref_game, ref_players = play("reference")
+    fast_game, fast_players = play("fast")
+    for ref, fast in zip(ref_players, fast_players):
+        assert ref.bankroll == fast.bankroll
+        assert ref.total_wagered == fast.total_wagered
+        assert ref.history == fast.history
+    assert ref_players[3].stats.to_dict() == fast_players[3].stats.to_dict()
+    assert ref_game.hit_results == fast_game.hit_results
+    assert ref_game.count_data == fast_game.count_data
+    assert ref_game.composition == fast_game.composition
+    assert ref_game.true_count == fast_game.true_count
+    assert ref_game.deck.num_pop == fast_game.deck.num_pop
+
+
+@pytest.mark.parametrize("mode", ["reference", "fast"])
+def test_functions_without_kwargs(mode):
+    """
+    Player functions that don't take **kwargs are only passed the keyword
+    arguments they accept
+    """
+    def strategy(player, hand, dealer_up, game_params, start_count, count,
+                 ten_count, other_count):
+        return random_choice(player, hand, dealer_up, game_params)
+
+    def wager(player, min_bet, max_bet, count, ten_count, other_count):
+        return min_bet
+
+    def insurance(player, start_count, count, ten_count, other_count,
+                  game_params):
+        return True
+
+    def composition_strategy(player, hand, dealer_up, game_params,
+                             start_count, count, ten_count, other_count,
+                             composition):
+        assert sum(composition) < 52
+        return random_choice(player, hand, dealer_up, game_params)
+
+    players = [
+        Player(10 ** 6, strategy_func=strategy, wager_func=wager,
+               insurance_func=insurance),
+        Player(10 ** 6, strategy_func=composition_strategy),
+    ]
+    Game(players, rules={"num_decks": 1}, seed=3).simulate(200, mode=mode)
+    assert all(player.history for player in players)
+
+
+def test_record_levels():
+    for record, lengths in [("none", (0, 0, 0)), ("hands", (1, 0, 0)),
+                            ("hits", (1, 1, 0)), ("cards", (1, 1, 1))]:
+        p = Player(1000)
+        game = Game([p], seed=3, record=record)
+        game.simulate(200, mode="fast")
+        data = (p.history, game.hit_results, game.count_data)
+        assert tuple(min(len(d), 1) for d in data) == lengths
+    with pytest.raises(ValueError):
+        Game([Player(100)], record="everything")
+
+
+@pytest.mark.parametrize("mode", ["reference", "fast"])
+def test_iter_rounds(mode):
+    """
+    iter_rounds gives the same results as simulate, one round at a time
+    """
+    sim_players = [Player(1000), Player(1000)]
+    Game(sim_players, seed=11).simulate(300, mode=mode)
+    players = [Player(1000), Player(1000)]
+    game = Game(players, seed=11)
+    records = list(game.iter_rounds(300, mode=mode))
+    assert len(records) == 300
+    assert [p.bankroll for p in players] == [p.bankroll for p in sim_players]
+    assert [p.history for p in players] == [p.history for p in sim_players]
+    history = pd.DataFrame(players[0].history)
+    outcomes = [
+        hand for record in records for hand in record.hands
+        if hand.player_id == 0
+    ]
+    assert [hand.result for hand in outcomes] == list(history["result"])
+    assert [hand.total for hand in outcomes] == list(history["total"])
+    # bankroll changes add up to the final bankroll
+    change = sum(record.bankroll_changes[1] for record in records)
+    assert players[1].bankroll - 1000 == pytest.approx(change)
+    assert records[0].round_id == 1 and records[0].count == 0
+    # the generator can be stopped and restarted between rounds
+    for record in game.iter_rounds():
+        if record.round_id == 310:
+            break
+    assert game.round_id == 311
+
+
+@pytest.mark.parametrize("storage", ["lists", "columns"])
+def test_workers(storage):
+    """
+    Simulating with workers gives the same results for any number of workers
+    """
+    def play(workers):
+        players = [Player(10000), Player(10000)]
+        game = Game(players, seed=21, storage=storage)
+        game.simulate(2500, mode="fast", workers=workers, block_size=500)
+        return game, players
+
+    game_one, players_one = play(1)
+    game_two, players_two = play(2)
+    for one, two in zip(players_one, players_two):
+        assert one.bankroll == two.bankroll
+        assert one.total_wagered == two.total_wagered
+        assert one.roi == two.roi
+        assert one.history == two.history
+    assert game_one.count_data == game_two.count_data
+    assert game_one.hit_results == game_two.hit_results
+    assert game_one.round_id == game_two.round_id == 2501
+    if storage == "lists":
+        history = pd.DataFrame(players_one[0].history)
+        assert history["round_id"].is_monotonic_increasing
+        assert history["round_id"].max() <= 2500
+        last = players_one[0].history[-1]
+        hit_results = game_one.hit_results
+    else:
+        hands = game_one.recorder.to_frame("hands", cards=True)
+        other = game_two.recorder.to_frame("hands", cards=True)
+        assert hands.equals(other)
+        last = hands[hands["player_id"] == 0].iloc[-1]
+        hit_results = game_one.recorder.to_frame("hits")
+    # the merged history carries on from one block to the next
+    assert last["end_bankroll"] == players_one[0].bankroll
+    assert last["roi"] == pytest.approx(players_one[0].roi)
+    assert len(hit_results) > 0
+    with pytest.raises(ValueError):
+        game_one.simulate(10, workers=0)
+
+
+def test_workers_ruin():
+    """
+    A player who runs out of money in one block stays out of money in the
+    blocks after it
+    """
+    def play(workers):
+        players = [Player(200), Player(10 ** 6)]
+        Game(players, seed=5).simulate(20000, mode="fast", workers=workers)
+        return players
+
+    players_one = play(1)
+    players_two = play(2)
+    for one, two in zip(players_one, players_two):
+        assert one.bankroll == two.bankroll
+        assert one.history == two.history
+    history = pd.DataFrame(players_one[0].history)
+    assert players_one[0].bankroll < 5
+    assert history["end_bankroll"].min() >= 0
+    assert history["end_bankroll"].iloc[-1] == players_one[0].bankroll
+
+
+def test_workers_replays(monkeypatch):
+    """
+    Blocks are only played again when a player's bankroll could have changed
+    what they did, which depends on the amount they really bet
+    """
+    plays = []
+
+    def play_block(block):
+        plays.append(block[3])
+        return _play_block(block)
+
+    monkeypatch.setattr(py21.game, "_play_block", play_block)
+    players = [Player(1000)]
+    Game(players, seed=3).simulate(8000, mode="fast", workers=1,
+                                   block_size=1000)
+    assert len(plays) == 8
+    # the most that can be bet in a round: four hands that are all doubled,
+    # and insurance for players who take it
+    rules = Game(players).table_rules
+    assert _safe_bankroll(players[0], rules) == 40
+    player = Player(10000, wager_func=maximum_bet,
+                    insurance_func=accept_insurance)
+    assert _safe_bankroll(player, rules) == 4250
+
+
+def test_workers_streams():
+    """
+    Blocks are played on their own child streams of the game's seed
+    """
+    # each block is played on child stream i of the game's seed, so a single
+    # block is the same as a serial game seeded with child stream 0
+    block, serial = Player(10000), Player(10000)
+    Game([block], seed=21).simulate(1000, mode="fast", workers=1)
+    Game([serial], seed=ShoeStream(21).stream(0)).simulate(1000, mode="fast")
+    assert block.history == serial.history
+    # the serial path plays every round on the game's own stream instead
+    other = Player(10000)
+    Game([other], seed=21).simulate(1000, mode="fast")
+    assert other.history != block.history
+
+
+def test_reset():
+    """
+    Resetting a game replays it from the start, and games with the same
+    rules share their validated parameters
+    """
+    rules = {"num_decks": 2, "blackjack_payout": 1.2}
+    game = Game([Player(1000)], rules=dict(rules), seed=5)
+    assert Game([Player(100)], rules={**rules}).game_params is game.game_params
+    assert Game([Player(100)]).game_params is not game.game_params
+    game.simulate(200, mode="fast")
+    history = game.player_list[0].history
+    bankroll = game.player_list[0].bankroll
+    game.reset()
+    assert game.round_id == 1
+    assert game.player_list[0].history == []
+    assert game.player_list[0].bankroll == 1000
+    game.simulate(200, mode="fast")
+    assert game.player_list[0].history == history
+    assert game.player_list[0].bankroll == bankroll
+
+    # changing the rules keeps the players and the deck's stream
+    other = game.with_rules({"blackjack_payout": 1.5})
+    assert other.player_list is game.player_list
+    assert other.game_params.blackjack_payout == 1.5
+    assert other.rules == {"num_decks": 2, "blackjack_payout": 1.5}
+    assert game.game_params.blackjack_payout == 1.2
+    assert other.game_params is Game([Player(100)], other.rules).game_params
+    other.simulate(200, mode="fast")
+    fresh = Game([Player(1000)], rules=other.rules, seed=5)
+    fresh.simulate(200, mode="fast")
+    assert other.player_list[0].history == fresh.player_list[0].history
+    with pytest.raises(ValueError):
+        game.with_rules({"num_deck": 2})
+
+
+def test_composition():
+    """
+    The composition is the full shoe less every card that's been seen
+    """
+    game = Game([Player(1000)], rules={"num_decks": 2, "burn": False}, seed=4)
+    assert game.composition == full_shoe(2)
+    for _ in range(5):
+        game.play_round()
+        left = [card.value for card in game.deck.deck]
+        assert game.composition == tuple(
+            left.count(value) for value in CARD_VALUES
+        )
+
+
+class Interrupt(Exception):
+    pass
+
+
+@pytest.mark.parametrize("storage", ["lists", "columns"])
+def test_checkpoint(tmp_path, storage):
+    """
+    A simulation resumed from a checkpoint gives the same results as one
+    that was never interrupted
+    """
+    def play(players, path=None):
+        game = Game(players, rules={"num_decks": 2}, seed=8, storage=storage)
+        every = 200 if path else None
+        game.simulate(700, mode="fast", checkpoint=path, checkpoint_every=every)
+        return game
+
+    expected = play([Player(10000), Player(10000)])
+
+    def interrupt(player, min_bet, **kwargs):
+        if player.total_wagered > 2500:
+            raise Interrupt
+        return min_bet
+
+    path = tmp_path / "game.ckpt"
+    with pytest.raises(Interrupt):
+        play([Player(10000, wager_func=interrupt), Player(10000)], path)
+    # the interrupted run got past the first checkpoint
+    resumed = Game([Player(1), Player(1)], rules={"num_decks": 2},
+                   storage=storage)
+    assert resumed.resume(path) >= 200
+    game = play([Player(10000), Player(10000)], path)
+    assert game.round_id == expected.round_id == 701
+    for player, other in zip(game.player_list, expected.player_list):
+        assert player.bankroll == other.bankroll
+        assert player.roi == other.roi
+        assert player.history == other.history
+    assert game.count_data == expected.count_data
+    assert game.count == expected.count
+    assert game.deck.deck == expected.deck.deck
+    if storage == "columns":
+        assert game.recorder.to_frame(cards=True).equals(
+            expected.recorder.to_frame(cards=True)
+        )
+    # a finished simulation isn't played again
+    assert play([Player(10000), Player(10000)], path).round_id == 701
+    # checkpoints only fit games with the same rules and players
+    game.checkpoint(path)
+    with pytest.raises(ValueError):
+        Game([Player(10000)], rules={"num_decks": 2}).resume(path)
+    with pytest.raises(ValueError):
+        Game([Player(10000)] * 2, storage=storage).resume(path)
+    with pytest.raises(ValueError):
+        expected.simulate(10, checkpoint_every=5)
+
+
+def test_until():
+    """
+    Simulations stop once the house edge is precise enough or the time
+    budget runs out
+    """
+    players = [Player(10 ** 7), Player(10 ** 7, wager_func=maximum_bet)]
+    game = Game(players, seed=3, record="none")
+    precision = game.simulate(until_stderr=0.02, mode="fast")
+    assert precision.reason == "stderr"
+    assert precision.stderr <= 0.02
+    assert precision.rounds == game.round_id - 1
+    assert precision.rounds % 100 == 0
+    # the estimate of the first player matches their results
+    estimate = precision.players[0]
+    assert estimate.house_edge == pytest.approx(
+        -(players[0].bankroll - 10 ** 7) / players[0].total_wagered
+    )
+    low, high = estimate.interval()
+    assert low < estimate.house_edge < high
+    # estimates can be merged
+    first, second, both = RatioEstimate(), RatioEstimate(), RatioEstimate()
+    for i, (net, wagered) in enumerate([(5, 5), (-10, 10), (0, 5), (7.5, 5)]):
+        (first if i < 2 else second).add(net, wagered)
+        both.add(net, wagered)
+    merged = first.merge(second)
+    assert merged.house_edge == pytest.approx(both.house_edge) == -0.1
+    assert merged.stderr == pytest.approx(both.stderr)
+    precision = game.simulate(500, time_budget=0, mode="fast")
+    assert precision.reason == "time" and precision.rounds == 100
+    assert game.simulate(150, until_stderr=1e-9, mode="fast").rounds == 150
+    with pytest.raises(ValueError):
+        game.simulate()
+    with pytest.raises(ValueError):
+        game.simulate(until_stderr=0.01, workers=2)
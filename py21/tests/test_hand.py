@@ -3,6 +3,9 @@ Test suite for the Hand class
 """
 import pytest
 from py21 import Card, Hand, Player
+from py21.actions import HIT, STAND, SURRENDER, DOUBLE, SPLIT
+from py21.handstate import (EMPTY_HAND, TRANSITIONS, encode, decode,
+                            dealer_stands)
 
 
 def test_hand_implementation(basic_game):
@@ -41,6 +44,8 @@ def test_add_card_two(basic_game):
     card_two = Card(2, "D")
     hand.add_card_two(card_two)
     assert hand.total == 5
+    with pytest.raises(TypeError):
+        hand.add_card("4D")
 
 
 def test_comparisons(basic_game):
@@ -139,3 +144,62 @@ def test_soft(basic_game):
     assert hand.total == 12
     assert not hand.soft
     assert hand.num_hard_aces == 0
+
+
+def test_valid_actions(basic_game):
+    hand = Hand(
+        Card(8, "C"), player=Player(100), game_params=basic_game.game_params,
+        min_bet=5, max_bet=500
+    )
+    hand.add_card_two(Card(8, "D"))
+    assert hand.valid_actions == ["HIT", "STAND", "SURRENDER", "DOUBLE", "SPLIT"]
+    assert hand.valid_mask == HIT | STAND | SURRENDER | DOUBLE | SPLIT
+    hand.add_card(Card(2, "D"))
+    assert hand.valid_actions == ["HIT", "STAND"]
+    # split hands can't surrender under the default rules
+    hand = Hand(
+        Card(8, "C"), player=Player(100), game_params=basic_game.game_params,
+        min_bet=5, max_bet=500, from_split=True, nsplits=3
+    )
+    hand.add_card_two(Card(8, "D"))
+    assert hand.valid_mask == HIT | STAND | DOUBLE
+
+
+def test_reset(basic_game):
+    player = Player(100)
+    hand = Hand(
+        Card(14, "C"), player=player, game_params=basic_game.game_params,
+        min_bet=5, max_bet=500
+    )
+    hand.add_card_two(Card(10, "D"))
+    assert hand.blackjack
+    reused = hand.reset(
+        Card(5, "C"), player=player, game_params=basic_game.game_params,
+        min_bet=5, max_bet=500
+    )
+    assert reused is hand
+    assert not hand.blackjack
+    assert hand.total == 5
+    assert len(hand) == 1
+    assert player.bankroll == 90
+
+
+def test_hand_state():
+    # every hand with the same total, softness, and number of cards ends up
+    # in the same state
+    state = EMPTY_HAND
+    for value in [11, 6]:
+        state = TRANSITIONS[state][value][0]
+    assert state == encode(17, True, 2)
+    assert decode(state) == (17, True, 2)
+    state, total, soft, bust, blackjack = TRANSITIONS[state][10]
+    assert (total, soft, bust, blackjack) == (17, False, False, False)
+    # a hard 21 busts when it's given an ace
+    state = encode(21, False, 3)
+    assert TRANSITIONS[state][11][1:4] == (22, False, True)
+    assert TRANSITIONS[EMPTY_HAND][10][0] == encode(10, False, 1)
+    assert TRANSITIONS[encode(10, False, 1)][11][4]
+    # dealer stands on soft 17 by default, but not when hitting soft 17
+    assert dealer_stands(17, True)[encode(17, True, 3)]
+    assert not dealer_stands(17, False)[encode(17, True, 3)]
+    assert dealer_stands(17, False)[encode(25, False, 3)]
@@ -0,0 +1,49 @@
+"""
+Benchmark for importing py21
+"""
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+
+# run from the directory containing the py21 package
+ROOT = Path(__file__).resolve().parents[2]
+# longest import time we allow, in seconds. Importing py21 currently takes
+# about 0.3 seconds, most of which is numpy and paramtools
+MAX_IMPORT_TIME = 2.5
+
+
+def run(code):
+    return subprocess.run(
+        [sys.executable, "-c", code], check=True, capture_output=True,
+        text=True, cwd=ROOT
+    ).stdout
+
+
+def test_core_import():
+    """
+    The core engine doesn't import the analytics or plotting packages
+    """
+    loaded = run(
+        "import sys, py21; "
+        "from py21 import Card, Deck, Hand, Player, Game; "
+        "from py21.strategies import basic_strategy; "
+        "print(' '.join(m for m in ('pandas', 'altair', 'tqdm') "
+        "if m in sys.modules))"
+    )
+    assert loaded.strip() == ""
+    # the analytics helpers are still available when they're used
+    assert run("import py21; print(py21.utils.house_edge.__name__)").strip() \
+        == "house_edge"
+
+
+def test_import_time():
+    # the fastest of a few runs, so a busy machine doesn't fail the test
+    times = []
+    for _ in range(3):
+        start = time.perf_counter()
+        run("import py21")
+        times.append(time.perf_counter() - start)
+    print(f"import py21: {min(times):.3f}s")
+    assert min(times) < MAX_IMPORT_TIME
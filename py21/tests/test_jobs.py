@@ -0,0 +1,92 @@
+"""
+Test suite for sharded simulation jobs
+"""
+import pytest
+from py21 import Game, Player
+from py21.jobs import Job, run_shard, run_local, resolve
+from py21.strategies import basic_strategy, maximum_bet
+from py21.summary import Summary, RatioEstimate, merge
+
+
+def make_job():
+    return Job(
+        players=[
+            {"bankroll": 10 ** 6},
+            {
+                "bankroll": 10 ** 6,
+                "strategy": "py21.strategies:hit_to_seventeen",
+                "wager": "py21.strategies:maximum_bet",
+            },
+        ],
+        rounds=2500, seed=4, rules={"num_decks": 2}, shard_rounds=1000,
+    )
+
+
+def test_job(tmp_path):
+    job = make_job()
+    assert job.num_shards == 3
+    assert [job.shard_size(i) for i in range(3)] == [1000, 1000, 500]
+    with pytest.raises(IndexError):
+        job.shard_size(3)
+    path = tmp_path / "job.json"
+    job.save(path)
+    assert Job.load(path).job_id == job.job_id
+    assert resolve("py21.strategies:basic_strategy") is basic_strategy
+    with pytest.raises(ValueError):
+        resolve("py21.strategies")
+    with pytest.raises(ValueError):
+        Job([{"strategy": "py21.strategies:basic_strategy"}], 10, 1)
+
+
+def test_shards_merge(tmp_path):
+    job = make_job()
+    paths = [run_shard(job, shard, tmp_path / "a") for shard in range(3)]
+    summaries = [Summary.load(path) for path in paths]
+    # merging is associative and commutative
+    left = (summaries[0] + summaries[1]) + summaries[2]
+    right = summaries[2] + (summaries[1] + summaries[0])
+    assert left.to_dict() == right.to_dict()
+    assert left.shards == {0, 1, 2}
+    player = left.players[0]
+    assert player.rounds == 2500
+    assert sum(player.results.values()) == player.hands
+    assert sum(player.histogram.values()) == player.rounds
+    assert player.stderr > 0
+    with pytest.raises(ValueError):
+        left + summaries[0]
+
+    # the local launcher gives the same result and shards are reproducible
+    merged = run_local(job, tmp_path / "b", workers=2)
+    assert merged.to_dict() == left.to_dict()
+    assert merge(paths[:2]).players[0].rounds == 2000
+
+
+def test_house_edge_stderr():
+    """
+    The summary's house edge stderr agrees with the estimate used by
+    simulate(until_stderr=...)
+    """
+    players = [Player(10 ** 6), Player(10 ** 6, wager_func=maximum_bet)]
+    summary = Summary(2)
+    estimates = [RatioEstimate(), RatioEstimate()]
+    for record in Game(players, seed=8).iter_rounds(2000, mode="fast"):
+        summary.add_round(record)
+        for player_id, estimate in enumerate(estimates):
+            wagered = sum(
+                hand.wager for hand in record.hands
+                if hand.player_id == player_id
+            )
+            estimate.add(record.bankroll_changes[player_id], wagered)
+    for player, estimate in zip(summary.players, estimates):
+        assert player.house_edge == pytest.approx(estimate.house_edge)
+        assert player.house_edge_stderr == pytest.approx(estimate.stderr)
+    # the sums survive a round trip through to_dict
+    loaded = Summary.from_dict(summary.to_dict())
+    assert loaded.players[1].house_edge_stderr == pytest.approx(
+        estimates[1].stderr
+    )
+    # summaries without the co-moments can't give the standard error
+    data = summary.to_dict()
+    del data["players"][0]["net_wagered"]
+    with pytest.raises(KeyError):
+        Summary.from_dict(data)
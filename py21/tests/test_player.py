@@ -1,8 +1,11 @@
 """
 Test suite for Player class
 """
+import pandas as pd
 import pytest
-from py21 import Player
+from py21 import Game, Player
+from py21.strategies import accept_insurance
+from py21.summary import PlayerStats
 
 
 def test_wager():
@@ -88,3 +91,45 @@ def test_settle_up():
     }
     p.settle_up(hand_data, 17, "surrender", 1, 1.5, False, 1, 0.5)
     assert p.bankroll == 142.5
+
+
+def test_stats():
+    """
+    Players that don't record their history keep running stats that match
+    the history a recording player would have
+    """
+    def play(**kwargs):
+        player = Player(10 ** 6, insurance_func=accept_insurance, **kwargs)
+        game = Game([player], seed=6, record="hands")
+        game.simulate(2000, mode="fast")
+        return player
+
+    player = play(record_history=False)
+    history = pd.DataFrame(play().history)
+    stats = player.stats
+    assert player.history == []
+    assert stats.hands == len(history)
+    assert stats.results == history["result"].value_counts().to_dict()
+    assert stats.doubles == history["double_down"].sum()
+    assert stats.split_hands == history["from_split"].sum()
+    assert stats.blackjack_rate == pytest.approx(history["blackjack"].mean())
+    assert stats.net == pytest.approx(player.bankroll - 10 ** 6)
+    assert stats.ev == pytest.approx(player.roi)
+    # stats from two runs merge into the stats of both
+    nets = [5, -10, 20, -15, -15, 5, -10, 30, -5, -20]
+    first, second, both = PlayerStats(), PlayerStats(), PlayerStats()
+    for i, net in enumerate(nets):
+        (first if i < 4 else second).add_hand(net, 5, "win", False, False,
+                                              False)
+        both.add_hand(net, 5, "win", False, False, False)
+    merged = first + second
+    assert merged.max_drawdown == both.max_drawdown == 35
+    assert merged.variance == pytest.approx(both.variance)
+    for name in ["hands", "total_wagered", "net", "peak", "trough", "mean"]:
+        assert getattr(merged, name) == pytest.approx(getattr(both, name))
+    assert merged.results == both.results
+    assert PlayerStats.from_dict(merged.to_dict()).to_dict() == (
+        merged.to_dict()
+    )
+    player.reset()
+    assert player.stats.hands == 0 and player.roi == 0
@@ -0,0 +1,64 @@
+"""
+Test suite for the columnar recorder
+"""
+import numpy as np
+import pandas as pd
+import pytest
+from py21 import Game, Player
+from py21.recorder import Table
+
+
+def play(storage, mode, record="cards"):
+    players = [Player(10000), Player(10000)]
+    game = Game(players, seed=8, storage=storage, record=record)
+    game.simulate(500, mode=mode)
+    return game, players
+
+
+@pytest.mark.parametrize("mode", ["reference", "fast"])
+def test_columns_match_lists(mode):
+    list_game, list_players = play("lists", mode)
+    col_game, col_players = play("columns", mode)
+    recorder = col_game.recorder
+    # nothing is stored in the lists when using columns
+    assert col_players[0].history == []
+    assert col_game.hit_results == [] and col_game.count_data == []
+    assert col_players[0].bankroll == list_players[0].bankroll
+
+    hands = recorder.to_frame("hands", cards=True)
+    for player_id, player in enumerate(list_players):
+        expected = pd.DataFrame(player.history)
+        actual = hands[hands["player_id"] == player_id].reset_index(drop=True)
+        for column in expected.columns:
+            if column == "dealer_cards":
+                continue
+            assert list(actual[column]) == list(expected[column]), column
+    hits = recorder.to_frame("hits")
+    expected = pd.DataFrame(list_game.hit_results)
+    for column in expected.columns:
+        assert list(hits[column]) == list(expected[column]), column
+    counts = recorder.to_frame("counts")
+    expected = pd.DataFrame(list_game.count_data)
+    for column in expected.columns:
+        assert np.allclose(counts[column], expected[column]), column
+
+
+def test_record_levels():
+    game, _ = play("columns", "fast", record="hits")
+    assert len(game.recorder.hands) > 0
+    assert len(game.recorder.hits) > 0
+    assert len(game.recorder.counts) == 0
+    game.recorder.clear()
+    assert len(game.recorder.to_frame("hands")) == 0
+
+
+def test_table():
+    table = Table([("a", np.int8), ("b", np.float64)], chunk_size=3)
+    for i in range(10):
+        table.append((i, i / 2))
+    assert len(table) == 10
+    assert table.column("a").dtype == np.int8
+    assert list(table.column("a")) == list(range(10))
+    # to_frame shouldn't copy the recorded arrays
+    columns = table.columns()
+    assert np.shares_memory(columns["b"], table.column("b"))
@@ -0,0 +1,47 @@
+"""
+Test suite for the rules snapshot
+"""
+import copy
+import pickle
+import pytest
+from py21 import Game, Player
+from py21.rules import Rules, RULE_NAMES
+
+
+def test_rules():
+    game = Game([Player(100)], {"num_decks": 2, "blackjack_payout": 1.2})
+    rules = game.table_rules
+    assert isinstance(rules, Rules)
+    assert rules.params is game.game_params
+    # every rule is a plain Python value
+    assert type(rules.num_decks) is int and rules.num_decks == 2
+    assert type(rules.blackjack_payout) is float
+    assert type(rules.soft_stand) is bool
+    assert set(rules.to_dict()) == set(RULE_NAMES)
+    # everything else comes from the full GameParams object
+    assert rules.specification() == game.game_params.specification()
+    with pytest.raises(AttributeError):
+        rules.num_decks = 4
+    with pytest.raises(AttributeError):
+        del rules.num_decks
+    assert pickle.loads(pickle.dumps(rules)).to_dict() == rules.to_dict()
+    assert copy.copy(rules).num_decks == 2
+
+
+def test_strategy_rules():
+    """
+    Strategies are passed the snapshot and can still reach the GameParams
+    """
+    seen = []
+
+    def strategy(game_params, **kwargs):
+        seen.append((game_params, game_params.params))
+        return "STAND"
+
+    game = Game([Player(100, strategy_func=strategy)], seed=1)
+    game.simulate(20)
+    assert seen
+    assert all(
+        rules is game.table_rules and params is game.game_params
+        for rules, params in seen
+    )
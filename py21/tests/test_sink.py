@@ -0,0 +1,96 @@
+"""
+Test suite for streaming simulation data to disk
+"""
+import numpy as np
+import pytest
+from py21 import Game, Player
+from py21.sink import Sink, read
+
+
+def play(sink=None, storage="columns"):
+    players = [Player(10000), Player(10000)]
+    game = Game(players, seed=5, storage=storage)
+    game.simulate(400, mode="fast", sink=sink)
+    return game
+
+
+def assert_same(actual, expected):
+    for column in actual.columns:
+        if expected[column].dtype.kind == "f":
+            assert np.allclose(actual[column], expected[column]), column
+        else:
+            assert list(actual[column]) == list(expected[column]), column
+
+
+@pytest.mark.parametrize("compression", [None, "gzip"])
+def test_csv_sink(tmp_path, compression):
+    expected = play().recorder
+    with Sink(tmp_path, chunk_size=100, compression=compression) as sink:
+        game = play(sink, storage="lists")
+    # nothing is kept in memory when a sink is used
+    assert game.recorder is None
+    assert game.player_list[0].history == [] and game.count_data == []
+    assert sink.rows_written["hands"] == len(expected.hands)
+
+    hands = read(tmp_path, "hands")
+    expected_hands = expected.to_frame("hands", cards=True)
+    assert list(hands.columns) == [
+        name for name in expected_hands.columns if name != "cards_offset"
+    ]
+    assert_same(hands, expected_hands)
+    for table in ["hits", "counts"]:
+        actual = read(tmp_path, table)
+        frame = expected.to_frame(table)
+        assert len(actual) == len(frame)
+        assert_same(actual, frame)
+
+
+def test_parquet_sink(tmp_path):
+    pytest.importorskip("pyarrow")
+    expected = play().recorder.to_frame("hits")
+    with Sink(tmp_path, format="parquet", chunk_size=100) as sink:
+        play(sink)
+    hits = read(tmp_path, "hits")
+    assert list(hits["action"]) == list(expected["action"])
+    assert list(hits["new_total"]) == list(expected["new_total"])
+
+
+def test_sink_errors(tmp_path):
+    with pytest.raises(ValueError):
+        Sink(tmp_path, format="json")
+    with pytest.raises(ValueError):
+        Sink(tmp_path, compression="bz2")
+    sink = Sink(tmp_path)
+    sink.close()
+    with pytest.raises(ValueError):
+        play(sink)
+
+
+def test_checkpoint(tmp_path):
+    """
+    A run resumed from a checkpoint cuts the files back to where they were
+    and writes the same data as a run that was never interrupted
+    """
+    expected = play().recorder.to_frame("hands", cards=True)
+
+    def wager(player, min_bet, **kwargs):
+        if player.total_wagered > 1500:
+            raise KeyboardInterrupt
+        return min_bet
+
+    path = tmp_path / "game.ckpt"
+    out = tmp_path / "out"
+    for players in [[Player(10000, wager_func=wager), Player(10000)],
+                    [Player(10000), Player(10000)]]:
+        game = Game(players, seed=5, storage="lists")
+        with Sink(out, chunk_size=100) as sink:
+            try:
+                game.simulate(400, mode="fast", sink=sink, checkpoint=path,
+                              checkpoint_every=100)
+            except KeyboardInterrupt:
+                pass
+    assert sink.rows_written["hands"] == len(expected)
+    assert_same(read(out, "hands"), expected)
+    with pytest.raises(ValueError):
+        with Sink(tmp_path / "gzip", compression="gzip") as sink:
+            game.simulate(10, sink=sink, checkpoint=tmp_path / "other.ckpt")
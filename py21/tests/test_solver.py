@@ -0,0 +1,123 @@
+"""
+Test the basic strategy generator
+"""
+from bisect import bisect_right
+import pytest
+from py21 import strategies, Card, Game, Hand, Player
+from py21.game import load_rules
+from py21.solver import generate_strategy, generate_deviations, TABLE_HANDS
+from py21.strategies import (
+    read_strategy, read_deviations, rule_strategy, basic_strategy,
+    Deviations, TableStrategy, STRATEGY_FILES, _compile_code
+)
+
+
+@pytest.fixture(scope="module")
+def cache_dir(tmp_path_factory):
+    # shared so the strategy generated in the first test is reused
+    return tmp_path_factory.mktemp("cache")
+
+
+def test_generate_strategy(cache_dir, monkeypatch):
+    monkeypatch.setattr(strategies, "CACHE_DIR", cache_dir)
+    rules = {"num_decks": 1, "soft_stand": False}
+    game_params = load_rules(rules)
+    with pytest.raises(FileNotFoundError):
+        rule_strategy(rules)
+    directory = generate_strategy(rules, workers=1)
+    hard = read_strategy(directory / "basic_hard.csv")
+    soft = read_strategy(directory / "basic_soft.csv")
+    split = read_strategy(directory / "basic_split.csv")
+    assert set(hard["2"]) == set(range(4, 22))
+    assert set(soft["2"]) == set(range(12, 22))
+    assert set(split["2"]) == set(range(2, 12))
+    # single deck rules where the dealer hits soft 17
+    assert hard["11"][11] == "Dh"
+    assert hard["10"][16] == "Rh"
+    assert hard["4"][12] == "S"
+    assert soft["2"][17] == "Dh"
+    assert split["10"][7] == "Rp"
+    assert split["2"][11] == "P"
+    # the generated tables are only played when they're asked for
+    strategy = rule_strategy(game_params)
+    assert (strategy.hard, strategy.soft, strategy.split) == (
+        [hard], [soft], [split]
+    )
+    assert rule_strategy(rules) is strategy
+    player = Player(100)
+    cards = Hand(Card(10, "S"), player=player, min_bet=5, max_bet=500,
+                 game_params=game_params)
+    cards.add_card_two(Card(6, "D"))
+    assert strategy(player, cards, 9, game_params) == "HIT"
+    assert basic_strategy(player, cards, 9, game_params) == "SURRENDER"
+    with pytest.raises(FileNotFoundError):
+        rule_strategy({"num_decks": 2})
+    # the saved tables are used instead of being generated again
+    mtime = (directory / "basic_hard.csv").stat().st_mtime_ns
+    assert generate_strategy(rules) == directory
+    assert (directory / "basic_hard.csv").stat().st_mtime_ns == mtime
+
+
+def test_generate_deviations(cache_dir):
+    # insurance pays back the wager, so it's only worth taking with a lower
+    # price
+    rules = {"num_decks": 1, "soft_stand": False, "insurance_pct": 0.35}
+    path = generate_deviations(
+        rules, true_counts=[-4, 0, 4, 8], decks_remaining=0.5, workers=1,
+        cache_dir=cache_dir
+    )
+    deviations = read_deviations(path)
+    assert deviations[("insurance", 0, 11)] == [(">=", 4, "I")]
+    for (hand, total, up), cells in deviations.items():
+        assert hand in ("hard", "soft", "pair", "insurance")
+        for when, index, code in cells:
+            assert (when == ">=" and index > 0) or (when == "<=" and index < 0)
+    # the saved file is reused
+    assert generate_deviations(
+        rules, true_counts=[-4, 0, 4, 8], decks_remaining=0.5,
+        cache_dir=cache_dir
+    ) == path
+    # deviations are played once the true count reaches their index
+    game_params = load_rules(rules)
+    player = Player(100)
+    hand = Hand(Card(10, "S"), player=player, min_bet=5, max_bet=500,
+                game_params=game_params)
+    hand.add_card_two(Card(6, "D"))
+    strategy = Deviations(path)
+    (when, index, code), = deviations[("hard", 16, 10)][:1]
+    assert strategy.code("hard", 16, 10, index, "H") == code
+    assert strategy.code("hard", 16, 10, 0, "H") == "H"
+    assert strategy.insurance(true_count=4)
+    assert not strategy.insurance(true_count=3)
+    # the deviations are played on top of the tables they were computed from
+    tables = tuple(
+        read_strategy(path.parent / name) for name in STRATEGY_FILES
+    )
+    assert strategy.tables == tables
+    assert strategy.strategy(player, hand, 10, game_params, true_count=0) == (
+        TableStrategy(*tables)(player, hand, 10, game_params)
+    )
+    # every deviation is compiled into the tables for the true counts it's
+    # made at
+    compiled = strategy.strategy.compile(game_params)
+    true_counts = strategy.strategy.true_counts
+    for (kind, total, up), cells in deviations.items():
+        if kind == "insurance":
+            continue
+        for when, index, code in cells:
+            i = bisect_right(true_counts, index) - 1
+            assert compiled[i, TABLE_HANDS.index(kind), total, up] == (
+                _compile_code(code, game_params, kind == "pair")
+            )
+            # and not past the index
+            i += -1 if when == ">=" else 1
+            if 0 <= i < len(true_counts):
+                assert compiled[i, TABLE_HANDS.index(kind), total, up] != (
+                    _compile_code(code, game_params, kind == "pair")
+                )
+    # a game played with the deviations
+    player = Player(10 ** 6, strategy_func=strategy.strategy,
+                    insurance_func=strategy.insurance)
+    Game([player], rules=rules, seed=1, record="none").simulate(
+        100, mode="fast"
+    )
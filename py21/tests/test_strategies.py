@@ -1,9 +1,14 @@
 """
 Test the various strategies in strategies.py
 """
+from pathlib import Path
+import pytest
+from py21 import Card, Hand, Player
+from py21.game import load_rules
 from py21.strategies import (basic_strategy, hit_to_seventeen,
                              minimum_bet, maximum_bet, decline_insurance,
-                             accept_insurance)
+                             accept_insurance, TableStrategy, BASIC_TABLES,
+                             CUR_PATH, STRATEGY_FILES, MAX_COMPILED_RULES)
 
 
 def test_insurance():
@@ -26,3 +31,50 @@ def test_basic_betting(basic_player):
     assert min_bet == 5
     max_bet = maximum_bet(basic_player, 5, 500)
     assert max_bet == 500
+
+
+def test_table_strategy(basic_game, tmp_path):
+    player = Player(10 ** 6)
+    paths = [Path(CUR_PATH, "strategy_files", name) for name in STRATEGY_FILES]
+    game_params = basic_game.game_params
+    chart = TableStrategy.from_csv(*paths)
+    assert chart(player, hand(player, game_params, 5, 6), 7,
+                 game_params) == "DOUBLE"
+    for first in range(2, 12):
+        for second in range(first, 12):
+            cards = hand(player, game_params, first, second)
+            for up in range(2, 12):
+                if cards.total != 21:
+                    assert chart(player, cards, up, game_params) == (
+                        basic_strategy(player, cards, up, game_params)
+                    )
+    table = chart.compile(game_params)
+    assert table.shape == (1, 3, 22, 12)
+    # only the tables for the most recent rules are kept
+    for min_bet in range(1, MAX_COMPILED_RULES + 5):
+        chart.compile(load_rules({"min_bet": min_bet}))
+    assert len(chart.tables) == len(chart._lists) == MAX_COMPILED_RULES
+    assert game_params not in chart.tables
+    # surrender 16 against a 10 at low counts and stand from a true count of 0
+    hard = tmp_path / "hard.csv"
+    text = paths[0].read_text()
+    hard.write_text(text.replace("16,S,S,S,S,S,H,H,Rh,Rh,Rh",
+                                 "16,S,S,S,S,S,H,H,Rh,S,Rh"))
+    counted = TableStrategy.from_csv(
+        [paths[0], hard], [paths[1]] * 2, [paths[2]] * 2, true_counts=[-10, 0]
+    )
+    sixteen = hand(player, game_params, 10, 6)
+    assert counted(player, sixteen, 10, game_params,
+                   true_count=-20) == "SURRENDER"
+    assert counted(player, sixteen, 10, game_params,
+                   true_count=0) == "STAND"
+    with pytest.raises(ValueError):
+        TableStrategy(*BASIC_TABLES, true_counts=[2, 0])
+
+
+def hand(player, game_params, first, second):
+    # aces are rank 14
+    cards = Hand(Card(first + 3 * (first == 11), "D"), player=player,
+                 min_bet=5, max_bet=500, game_params=game_params)
+    cards.add_card_two(Card(second + 3 * (second == 11), "S"))
+    return cards
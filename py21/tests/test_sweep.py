@@ -0,0 +1,31 @@
+"""
+Test suite for rule sweeps
+"""
+from py21 import Player
+from py21.sweep import sweep, grid_cells
+
+
+GRID = {"num_decks": [2, 6], "blackjack_payout": [1.5, 1.2]}
+
+
+def test_grid_cells():
+    cells = grid_cells(GRID)
+    assert len(cells) == 4
+    assert cells[0] == {"num_decks": 2, "blackjack_payout": 1.5}
+
+
+def test_sweep():
+    players = [Player(10 ** 6)]
+    results = sweep(GRID, players, rounds=2000, seed=3, tables=10, rungs=3,
+                    workers=1)
+    assert len(results) == 4
+    assert list(results.columns[:2]) == ["num_decks", "blackjack_payout"]
+    assert (results["stderr"] > 0).all()
+    assert (results["ci_low"] < results["ci_high"]).all()
+    # only some of the cells get the extra rounds
+    assert results["rungs"].min() >= 1
+    assert set(results["rounds"]) <= {2000, 6000, 14000}
+    # the results don't depend on the number of workers
+    parallel = sweep(GRID, players, rounds=2000, seed=3, tables=10, rungs=3,
+                     workers=2)
+    assert parallel.equals(results)
@@ -0,0 +1,83 @@
+"""
+Test suite for the vectorized multi-table engine
+"""
+import pytest
+from py21 import Game, Player
+from py21.actions import HIT, STAND, SURRENDER, DOUBLE
+from py21.handstate import encode
+from py21.strategies import (
+    hit_to_seventeen, maximum_bet, accept_insurance, random_choice,
+    TableStrategy, BASIC_TABLES
+)
+from py21.vector import (
+    VectorGame, simulate_tables, compile_strategy, SURRENDER_CODE, HIT_CODE
+)
+
+
+def make_players():
+    return [
+        Player(10 ** 6),
+        Player(10 ** 6, strategy_func=hit_to_seventeen, wager_func=maximum_bet,
+               insurance_func=accept_insurance),
+    ]
+
+
+@pytest.mark.parametrize(
+    "rules",
+    [
+        None,
+        {"num_decks": 2, "hit_split_aces": True, "shuffle_freq": 5,
+         "surrender_after_split": True, "max_split_hands": 1},
+    ]
+)
+def test_matches_reference(rules):
+    """
+    Every table plays exactly the same rounds as the reference engine
+    """
+    vector = simulate_tables(make_players(), rules, tables=3, rounds=1500,
+                             seed=9, engine="vector")
+    reference = simulate_tables(make_players(), rules, tables=3, rounds=1500,
+                                seed=9, engine="reference")
+    assert vector.to_dict() == reference.to_dict()
+    assert vector.players[0].rounds == 4500
+
+
+def test_fallback():
+    players = [Player(10 ** 6, strategy_func=random_choice)]
+    with pytest.raises(ValueError):
+        VectorGame(players, tables=2)
+    with pytest.raises(ValueError):
+        simulate_tables(players, tables=2, rounds=10, engine="vector")
+    summary = simulate_tables(players, tables=2, rounds=10)
+    assert summary.players[0].rounds == 20
+
+
+def test_compile_strategy():
+    game = Game([Player(100)])
+    table, _ = compile_strategy(Player(100), game.game_params)
+    hard_16 = encode(16, False, 2)
+    mask = HIT | STAND | SURRENDER | DOUBLE
+    assert table[10, hard_16, 0, 0, mask] == SURRENDER_CODE
+    assert table[10, hard_16, 0, 0, HIT | STAND] == HIT_CODE
+
+
+def test_broke_players():
+    game = VectorGame([Player(10)], tables=50, seed=2)
+    summary = game.simulate(500)
+    assert game.done.any()
+    assert (game.bankroll[game.done] < 5).all()
+    assert summary.players[0].rounds < 50 * 500
+
+
+def test_table_strategy():
+    chart = TableStrategy(*BASIC_TABLES)
+    players = [Player(10 ** 6, strategy_func=chart)]
+    vector = simulate_tables(players, tables=2, rounds=500, seed=3,
+                             engine="vector")
+    reference = simulate_tables(make_players()[:1], tables=2, rounds=500,
+                                seed=3, engine="reference")
+    assert vector.to_dict() == reference.to_dict()
+    counted = TableStrategy([BASIC_TABLES[0]], [BASIC_TABLES[1]],
+                            [BASIC_TABLES[2]], true_counts=[0])
+    with pytest.raises(ValueError):
+        VectorGame([Player(10 ** 6, strategy_func=counted)], tables=2)
@@ -1,4 +1,3 @@
-import altair as alt
 import pandas as pd
 import numpy as np
 import copy
@@ -113,7 +112,9 @@ def result_heatmap(data, result="win", title=None,
     values = [
         round(x * 0.1, 1) for x in range(min_int, max_int + 1)
     ]
-    # create altair heatmap
+    # create altair heatmap. altair is only imported when it's needed
+    import altair as alt
+
     chart = alt.Chart(
         pct_data, title=title, width=width, height=height
     ).mark_rect(binSpacing=1).encode(
@@ -196,6 +197,8 @@ def outcome_bars(data, name=None, width=100):
     plot_data = pd.DataFrame(plot_data_list)
 
     # create altair chart
+    import altair as alt
+
     chart = alt.Chart(plot_data, width=width).mark_bar().encode(
         x=alt.X(
             "game",
@@ -223,7 +226,8 @@ def outcome_bars(data, name=None, width=100):
 
 def house_edge(player, params):
     """
-    Function for calculating house edge.
+    Function for calculating house edge from a player's history. Use
+    py21.exact.house_edge for the exact house edge of a strategy.
     Parameters
     ----------
     player: an instance of the Player class whose house edge you want
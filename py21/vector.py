@@ -0,0 +1,675 @@
+"""
+Vectorized simulator for many independent tables.
+
+VectorGame plays thousands of tables in lockstep. Every table has its own shoe
+from its own stream, and the shoes, shoe positions, hands, and dealer hands of
+all the tables are stored in numpy arrays so each step of a round is a handful
+of array operations instead of a loop over Python objects.
+
+This only works when the players' decisions can be written as a table. The
+strategy has to be one of TABLE_STRATEGIES, which are compiled into a lookup
+table by calling them once for every hand they could see, bets have to be
+flat, and insurance is either always or never taken. simulate_tables checks
+this and falls back to playing each table with Game when it can't be used.
+
+Table t of a VectorGame plays exactly the same rounds as a Game created with
+the seed ShoeStream(seed).stream(t).
+"""
+import copy
+import numpy as np
+from collections import OrderedDict
+from py21.actions import HIT, STAND, SURRENDER, DOUBLE, SPLIT, ACTION_LISTS
+from py21.card import Card, CARDS
+from py21.deck import ShoeStream, ShoeGenerator
+from py21.game import Game
+from py21.handstate import (
+    TRANSITIONS, EMPTY_HAND, NUM_STATES, STATE_TOTAL, STATE_SOFT, CARD_VALUES,
+    decode
+)
+from py21.strategies import (
+    basic_strategy, hit_to_seventeen, minimum_bet, maximum_bet,
+    decline_insurance, accept_insurance, TableStrategy
+)
+from py21.summary import Summary, PlayerStats, RESULTS
+
+
+# strategies that only depend on the hand, the dealer's up card, and the rules,
+# along with TableStrategy instances without a true count dimension
+TABLE_STRATEGIES = {basic_strategy, hit_to_seventeen}
+FLAT_WAGERS = {minimum_bet, maximum_bet}
+INSURANCE_FUNCS = {decline_insurance: False, accept_insurance: True}
+# largest value of max_split_hands the vectorized engine supports
+MAX_SPLIT_HANDS = 4
+# number of shoes each table shuffles at once
+SHOE_BATCH = 8
+# most strategy tables kept by compiled_strategy
+MAX_COMPILED = 8
+
+# action codes used in the compiled strategy tables
+STAND_CODE, HIT_CODE, DOUBLE_CODE, SURRENDER_CODE, SPLIT_CODE = range(5)
+ACTION_CODES = {
+    "STAND": STAND_CODE, "HIT": HIT_CODE, "DOUBLE": DOUBLE_CODE,
+    "SURRENDER": SURRENDER_CODE, "SPLIT": SPLIT_CODE
+}
+# action for each code
+ACTION_NAMES = tuple(sorted(ACTION_CODES, key=ACTION_CODES.get))
+INVALID = -1
+RESULT_CODES = {result: code for code, result in enumerate(RESULTS)}
+
+# array versions of the hand state tables. NEXT_STATE is -1 for transitions
+# that can't happen
+NEXT_STATE = np.full((NUM_STATES, 12), -1, dtype=np.int16)
+for _state, _row in enumerate(TRANSITIONS):
+    if _row is not None:
+        for _value in CARD_VALUES:
+            NEXT_STATE[_state, _value] = _row[_value][0]
+TOTALS = np.array(STATE_TOTAL, dtype=np.int16)
+NUM_CARDS = np.array(
+    [decode(state)[2] for state in range(NUM_STATES)], dtype=np.int8
+)
+CODE_VALUES = np.array([card.value for card in CARDS], dtype=np.int8)
+# a card with each value, used when compiling strategies
+VALUE_CARDS = {value: Card(min(value, 10) if value < 11 else 14, "C")
+               for value in CARD_VALUES}
+
+
+class _HandView:
+    """
+    Stand in for a Hand that's passed to strategy functions when they're
+    compiled
+    """
+
+    def __init__(self, cards, state, from_split, mask, player, wager):
+        self.cards = cards
+        self.state = state
+        self.total = STATE_TOTAL[state]
+        self.soft = STATE_SOFT[state]
+        self.from_split = from_split
+        self.valid_mask = mask
+        self.player = player
+        self.wager = wager
+        self.blackjack = False
+        self.split = False
+        self.stand = False
+        self.bust = False
+        self.surrender = False
+        self.double_down = False
+        self.insurance = False
+
+    @property
+    def valid_actions(self):
+        return ACTION_LISTS[self.valid_mask]
+
+    def __len__(self):
+        return len(self.cards)
+
+
+def compile_strategy(player, game_params):
+    """
+    Build the lookup table for a player's strategy
+    Returns
+    -------
+    An array indexed by [dealer up value, hand state, pair value, from split,
+    valid action mask] holding the code of the action the strategy takes.
+    The pair value is the value of the cards for two card pairs and zero for
+    every other hand. Hands the strategy can't handle are set to INVALID and
+    their errors are returned in a dictionary with the same keys.
+    """
+    table = np.full((12, NUM_STATES, 12, 2, 32), INVALID, dtype=np.int8)
+    errors = {}
+    wager = game_params.min_bet
+    hands = []
+    # every two card hand
+    for i, first in enumerate(CARD_VALUES):
+        for second in CARD_VALUES[i:]:
+            state = TRANSITIONS[TRANSITIONS[EMPTY_HAND][first][0]][second][0]
+            pair = first if first == second else 0
+            cards = [VALUE_CARDS[first], VALUE_CARDS[second]]
+            extras = [SURRENDER, DOUBLE] + ([SPLIT] if pair else [])
+            for extra in range(2 ** len(extras)):
+                mask = HIT | STAND
+                for bit, flag in enumerate(extras):
+                    if extra & (1 << bit):
+                        mask |= flag
+                hands.append((cards, state, pair, mask))
+    # hands with three or more cards can only hit or stand
+    for state in range(NUM_STATES):
+        total, soft, num_cards = decode(state)
+        if num_cards == 3 and total <= 21 and (total >= 13 or not soft):
+            cards = [VALUE_CARDS[2]] * 3
+            hands.append((cards, state, 0, HIT | STAND))
+    for up in CARD_VALUES:
+        for cards, state, pair, mask in hands:
+            for from_split in (0, 1):
+                if STATE_TOTAL[state] == 21 and len(cards) == 2:
+                    # blackjacks always stand
+                    table[up, state, pair, from_split, mask] = STAND_CODE
+                    continue
+                hand = _HandView(cards, state, bool(from_split), mask, player,
+                                 wager)
+                key = (up, state, pair, from_split, mask)
+                try:
+                    action = player.action(
+                        hand, up, game_params, start_count=0, count=0,
+                        ten_count=0, other_count=0, true_count=0,
+                    )
+                    table[key] = ACTION_CODES[action]
+                except Exception as error:
+                    errors[key] = error
+    return table, errors
+
+
+# tables built by compiled_strategy for each strategy and set of rules, from
+# least to most recently used
+_compiled = OrderedDict()
+
+
+def is_table_strategy(strategy):
+    """
+    Return whether a strategy function can be compiled into a lookup table
+    """
+    return strategy in TABLE_STRATEGIES or (
+        isinstance(strategy, TableStrategy) and strategy.true_counts is None
+    )
+
+
+def compiled_strategy(player, game_params):
+    """
+    Return the table and errors built by compile_strategy for a player's
+    strategy. Each strategy is only compiled once for a set of rules, and the
+    tables are shared by VectorGame and the fast mode of Game
+    """
+    key = (player.strategy_func, game_params)
+    compiled = _compiled.get(key)
+    if compiled is None:
+        compiled = _compiled[key] = compile_strategy(player, game_params)
+        if len(_compiled) > MAX_COMPILED:
+            _compiled.popitem(last=False)
+    else:
+        _compiled.move_to_end(key)
+    return compiled
+
+
+def unsupported(players, game_params):
+    """
+    Return the reason the vectorized engine can't play a game with these
+    players and rules, or None if it can
+    """
+    for player in players:
+        strategy = player.strategy_func
+        if not is_table_strategy(strategy):
+            name = getattr(strategy, "__name__", type(strategy).__name__)
+            return f"{name} isn't a table strategy"
+        if player.wager_func not in FLAT_WAGERS:
+            return f"{player.wager_func.__name__} isn't a flat wager"
+        if player.insurance_func not in INSURANCE_FUNCS:
+            return (
+                f"{player.insurance_func.__name__} isn't a fixed insurance "
+                "decision"
+            )
+    if game_params.max_split_hands > MAX_SPLIT_HANDS:
+        return f"max_split_hands can be at most {MAX_SPLIT_HANDS}"
+    return None
+
+
+class VectorGame:
+
+    def __init__(self, players, rules=None, tables=1000, seed=None):
+        """
+        Parameters
+        ----------
+        players: list of Player objects for the seats at every table. Each
+            table starts with a copy of each player's bankroll
+        rules: dictionary containing any rule updates
+        tables: number of tables to play
+        seed: seed for the tables' shoes. Table t uses child stream t
+        """
+        # creating a Game validates the rules and players
+        game = Game(players, rules=rules, record="none")
+        params = game.table_rules
+        reason = unsupported(players, params)
+        if reason is not None:
+            raise ValueError(reason)
+        self.players = players
+        self.table_rules = params
+        self.tables = tables
+        self.num_decks = params.num_decks
+        self.shoe_size = 52 * self.num_decks
+        self.dealer_stands = np.array(game._dealer_stands, dtype=bool)
+        self.max_hands = 2 * params.max_split_hands + 2
+
+        stream = seed if isinstance(seed, ShoeStream) else ShoeStream(seed)
+        self.generators = [
+            ShoeGenerator(self.num_decks, stream.stream(t), SHOE_BATCH)
+            for t in range(tables)
+        ]
+        self.shoes = np.zeros((tables, self.shoe_size), dtype=np.uint8)
+        self.pos = np.zeros(tables, dtype=np.int64)
+        self.hands_played = np.zeros(tables, dtype=np.int64)
+        for t in range(tables):
+            self._new_shoe(t)
+        self.hands_played[:] = 0
+
+        num_players = len(players)
+        self.bankroll = np.tile(
+            np.array([player.bankroll for player in players], dtype=float),
+            (tables, 1)
+        )
+        self.total_wagered = np.zeros((tables, num_players))
+        # tables where every player has run out of money
+        self.done = np.zeros(tables, dtype=bool)
+        self.wagers = np.array([
+            player.wager_func(player=player, min_bet=params.min_bet,
+                              max_bet=params.max_bet)
+            for player in players
+        ], dtype=np.int64)
+        self.insure = np.array(
+            [INSURANCE_FUNCS[player.insurance_func] for player in players]
+        )
+        self._strategies = [
+            compiled_strategy(player, params) for player in players
+        ]
+        self.summary = Summary(num_players)
+        self._changes = [[] for _ in players]
+
+    def simulate(self, rounds):
+        """
+        Play the given number of rounds at every table
+        """
+        for _ in range(rounds):
+            if not self._play_round():
+                break
+        self._update_histograms()
+        return self.summary
+
+    # Start private methods
+
+    def _new_shoe(self, t):
+        self.shoes[t] = self.generators[t].next_shoe()
+        self.pos[t] = 1 if self.table_rules.burn else 0
+        self.hands_played[t] = 0
+
+    def _deal(self, tables):
+        """
+        Deal one card to each of the given tables and return their values
+        """
+        pos = self.pos[tables]
+        if np.any(pos >= self.shoe_size):
+            raise IndexError("Deck is empty")
+        self.pos[tables] = pos + 1
+        return CODE_VALUES[self.shoes[tables, pos]]
+
+    def _play_round(self):
+        """
+        Play one round at every table that still has players. Returns False
+        if every table is done
+        """
+        params = self.table_rules
+        tables = np.nonzero(~self.done)[0]
+        self.hands_played[tables] += 1
+        bank = self.bankroll[tables]
+        seated = bank >= params.min_bet
+        broke = ~seated.any(axis=1)
+        if broke.any():
+            self.done[tables[broke]] = True
+            tables = tables[~broke]
+            bank = bank[~broke]
+            seated = seated[~broke]
+        if not tables.size:
+            return False
+        if np.any(seated & (self.wagers > bank)):
+            raise ValueError("A wager is greater than the player's bankroll")
+        n, num_players = seated.shape
+        start_bank = bank.copy()
+        wagered = self.total_wagered[tables]
+
+        # deal the first two cards to every seated player and the dealer
+        num_seated = seated.sum(axis=1)
+        num_cards = 2 * num_seated + 2
+        pos = self.pos[tables]
+        if np.any(pos + num_cards > self.shoe_size):
+            raise IndexError("Not enough cards left in the deck")
+        offset = np.cumsum(seated, axis=1) - 1
+        shoes = self.shoes
+        first = CODE_VALUES[shoes[tables[:, None], pos[:, None] + offset]]
+        second = CODE_VALUES[
+            shoes[tables[:, None], (pos + num_seated + 1)[:, None] + offset]
+        ]
+        up = CODE_VALUES[shoes[tables, pos + num_seated]]
+        hole = CODE_VALUES[shoes[tables, pos + 2 * num_seated + 1]]
+        self.pos[tables] = pos + num_cards
+
+        wagers = np.where(seated, self.wagers, 0)
+        bank -= wagers
+        wagered += wagers
+        # hand arrays are indexed by [table, seat, hand]
+        shape = (n, num_players, self.max_hands)
+        hands = {
+            "state": np.zeros(shape, dtype=np.int16),
+            "card_one": np.zeros(shape, dtype=np.int8),
+            "pair": np.zeros(shape, dtype=np.int8),
+            "wager": np.zeros(shape, dtype=np.int64),
+            "from_split": np.zeros(shape, dtype=np.int8),
+            "nsplits": np.zeros(shape, dtype=np.int64),
+            "stand": np.zeros(shape, dtype=bool),
+            "bust": np.zeros(shape, dtype=bool),
+            "surrender": np.zeros(shape, dtype=bool),
+            "blackjack": np.zeros(shape, dtype=bool),
+        }
+        num_hands = seated.astype(np.int64)
+        state = NEXT_STATE[NEXT_STATE[EMPTY_HAND, first], second]
+        hands["state"][:, :, 0] = state
+        hands["card_one"][:, :, 0] = first
+        hands["pair"][:, :, 0] = np.where(first == second, first, 0)
+        hands["wager"][:, :, 0] = wagers
+        blackjack = (TOTALS[state] == 21) & seated
+        hands["blackjack"][:, :, 0] = blackjack
+        hands["stand"][:, :, 0] = blackjack
+
+        insurance = np.zeros_like(seated)
+        if params.insurance_allowed:
+            insurance = seated & self.insure & (up == 11)[:, None]
+            bank -= np.where(insurance, params.insurance_pct * wagers, 0)
+
+        dealer = NEXT_STATE[NEXT_STATE[EMPTY_HAND, up], hole]
+        dealer_blackjack = TOTALS[dealer] == 21
+        for seat in range(num_players):
+            playing = np.nonzero(seated[:, seat] & ~dealer_blackjack)[0]
+            if playing.size:
+                self._play_seat(
+                    playing, seat, tables, hands, num_hands, bank, wagered,
+                    up
+                )
+
+        # the dealer only plays if a hand is still waiting to be settled
+        slot = np.arange(self.max_hands)
+        valid = slot < num_hands[:, :, None]
+        open_hands = valid & ~(
+            hands["bust"] | hands["blackjack"] | hands["surrender"]
+        )
+        dealer_plays = open_hands.any(axis=(1, 2)) & ~dealer_blackjack
+        drawing = np.nonzero(dealer_plays & ~self.dealer_stands[dealer])[0]
+        while drawing.size:
+            value = self._deal(tables[drawing])
+            dealer[drawing] = NEXT_STATE[dealer[drawing], value]
+            drawing = drawing[~self.dealer_stands[dealer[drawing]]]
+
+        self._settle(
+            hands, valid, dealer, dealer_blackjack, insurance, bank,
+            start_bank, seated
+        )
+        self.bankroll[tables] = bank
+        self.total_wagered[tables] = wagered
+        self._check_shoes(tables)
+        return True
+
+    def _play_seat(self, playing, seat, tables, hands, num_hands, bank,
+                   wagered, up):
+        """
+        Play one seat's hands at each of the tables in `playing` (row
+        indices into the round's arrays)
+        """
+        params = self.table_rules
+        strategy, errors = self._strategies[seat]
+        surrender_allowed = params.surrender_allowed
+        surrender_after_split = params.surrender_after_split
+        double_after_split = params.double_after_split
+        hit_split_aces = params.hit_split_aces
+        max_split_hands = params.max_split_hands
+        state = hands["state"][:, seat]
+        card_one = hands["card_one"][:, seat]
+        pair = hands["pair"][:, seat]
+        wager = hands["wager"][:, seat]
+        from_split = hands["from_split"][:, seat]
+        nsplits = hands["nsplits"][:, seat]
+        stand = hands["stand"][:, seat]
+        bust = hands["bust"][:, seat]
+        surrender = hands["surrender"][:, seat]
+        blackjack = hands["blackjack"][:, seat]
+        seat_hands = num_hands[:, seat]
+        n = len(bank)
+        # hand being played, split hands waiting to be played, and the number
+        # of times the seat has split this round at each table
+        current = np.zeros(n, dtype=np.int64)
+        stack = np.zeros((n, self.max_hands), dtype=np.int64)
+        stack_size = np.zeros(n, dtype=np.int64)
+        num_splits = np.zeros(n, dtype=np.int64)
+
+        def add_card_two(rows, slot):
+            value = self._deal(tables[rows])
+            new_state = NEXT_STATE[state[rows, slot], value]
+            state[rows, slot] = new_state
+            pair[rows, slot] = np.where(
+                value == card_one[rows, slot], value, 0
+            )
+            is_blackjack = TOTALS[new_state] == 21
+            blackjack[rows, slot] = is_blackjack
+            aces = card_one[rows, slot] == 11
+            stand[rows, slot] = is_blackjack | (aces & (not hit_split_aces))
+
+        live = playing
+        while live.size:
+            slot = current[live]
+            finished = (
+                stand[live, slot] | bust[live, slot] | surrender[live, slot]
+            )
+            # move on to the next split hand, if there is one
+            done = live[finished]
+            popping = done[stack_size[done] > 0]
+            if popping.size:
+                stack_size[popping] -= 1
+                next_slot = stack[popping, stack_size[popping]]
+                current[popping] = next_slot
+                add_card_two(popping, next_slot)
+            acting = live[~finished]
+            live = np.concatenate([popping, acting])
+            if not acting.size:
+                continue
+
+            slot = current[acting]
+            hand_state = state[acting, slot]
+            two_cards = NUM_CARDS[hand_state] == 2
+            split_hand = from_split[acting, slot].astype(bool)
+            hand_wager = wager[acting, slot]
+            affordable = bank[acting, seat] >= hand_wager
+            mask = np.full(acting.size, HIT | STAND, dtype=np.int64)
+            if surrender_allowed:
+                mask |= np.where(
+                    two_cards & (~split_hand | surrender_after_split),
+                    SURRENDER, 0
+                )
+            mask |= np.where(
+                two_cards & affordable & (~split_hand | double_after_split),
+                DOUBLE, 0
+            )
+            hand_pair = np.where(two_cards, pair[acting, slot], 0)
+            mask |= np.where(
+                two_cards & affordable & (hand_pair > 0) &
+                (nsplits[acting, slot] < max_split_hands),
+                SPLIT, 0
+            )
+            key = (up[acting], hand_state, hand_pair, split_hand.astype(int),
+                   mask)
+            action = strategy[key]
+            if np.any(action == INVALID):
+                i = np.nonzero(action == INVALID)[0][0]
+                error = errors.get(tuple(int(k[i]) for k in key))
+                if error is not None:
+                    raise error
+                raise ValueError("The strategy returned an invalid action")
+
+            rows = acting[action == STAND_CODE]
+            stand[rows, current[rows]] = True
+            rows = acting[action == SURRENDER_CODE]
+            surrender[rows, current[rows]] = True
+
+            rows = acting[action == DOUBLE_CODE]
+            if rows.size:
+                slot = current[rows]
+                bank[rows, seat] -= wager[rows, slot]
+                wagered[rows, seat] += wager[rows, slot]
+                wager[rows, slot] *= 2
+                stand[rows, slot] = True
+            rows = acting[(action == HIT_CODE) | (action == DOUBLE_CODE)]
+            if rows.size:
+                slot = current[rows]
+                value = self._deal(tables[rows])
+                new_state = NEXT_STATE[state[rows, slot], value]
+                state[rows, slot] = new_state
+                bust[rows, slot] = TOTALS[new_state] > 21
+
+            rows = acting[action == SPLIT_CODE]
+            if rows.size:
+                slot = current[rows]
+                split_wager = wager[rows, slot]
+                bank[rows, seat] -= split_wager
+                wagered[rows, seat] += split_wager
+                num_splits[rows] += 1
+                value = card_one[rows, slot]
+                first_state = NEXT_STATE[EMPTY_HAND, value]
+                # the second hand gets its second card once the first hand
+                # has been played
+                new_slot = seat_hands[rows]
+                seat_hands[rows] += 1
+                for hand_slot in (slot, new_slot):
+                    state[rows, hand_slot] = first_state
+                    card_one[rows, hand_slot] = value
+                    pair[rows, hand_slot] = 0
+                    wager[rows, hand_slot] = split_wager
+                    from_split[rows, hand_slot] = 1
+                    nsplits[rows, hand_slot] = num_splits[rows]
+                    stand[rows, hand_slot] = False
+                    blackjack[rows, hand_slot] = False
+                stack[rows, stack_size[rows]] = new_slot
+                stack_size[rows] += 1
+                add_card_two(rows, slot)
+
+    def _settle(self, hands, valid, dealer, dealer_blackjack, insurance, bank,
+                start_bank, seated):
+        """
+        Pay out every hand and add the round to the summary
+        """
+        params = self.table_rules
+        dealer_total = TOTALS[dealer][:, None, None]
+        dealer_bust = dealer_total > 21
+        total = TOTALS[hands["state"]]
+        result = np.select(
+            [hands["bust"], hands["surrender"],
+             dealer_bust | (total > dealer_total), total < dealer_total],
+            [RESULT_CODES["loss"], RESULT_CODES["surrender"],
+             RESULT_CODES["win"], RESULT_CODES["loss"]],
+            RESULT_CODES["push"]
+        )
+        wager = hands["wager"]
+        blackjack_payout = np.where(
+            hands["from_split"].astype(bool), params.split_blackjack_payout,
+            params.blackjack_payout
+        )
+        win_payout = np.where(hands["blackjack"], blackjack_payout,
+                              params.payout)
+        payment = np.select(
+            [result == RESULT_CODES["win"], result == RESULT_CODES["push"],
+             result == RESULT_CODES["surrender"]],
+            [wager + wager * win_payout, wager, wager * params.surrender_pct],
+            0
+        )
+        payment = np.where(valid, payment, 0)
+        bank += payment.sum(axis=2)
+        # insurance pays back the original wager
+        bank += np.where(
+            insurance & dealer_blackjack[:, None], hands["wager"][:, :, 0], 0
+        )
+
+        change = bank - start_bank
+        round_wager = np.where(valid, wager, 0).sum(axis=2)
+        for seat, player in enumerate(self.summary.players):
+            playing = seated[:, seat]
+            seat_valid = valid[:, seat]
+            player.rounds += int(playing.sum())
+            player.hands += int(seat_valid.sum())
+            player.blackjacks += int(
+                hands["blackjack"][:, seat][seat_valid].sum()
+            )
+            player.total_wagered += int(wager[:, seat][seat_valid].sum())
+            counts = np.bincount(
+                result[:, seat][seat_valid], minlength=len(RESULTS)
+            )
+            for code, name in enumerate(RESULTS):
+                player.results[name] += int(counts[code])
+            seat_change = change[playing, seat]
+            player.net += float(seat_change.sum())
+            player.net_sq += float((seat_change * seat_change).sum())
+            seat_wager = round_wager[playing, seat]
+            player.wagered_sq += int((seat_wager * seat_wager).sum())
+            player.net_wagered += float((seat_change * seat_wager).sum())
+            self._changes[seat].append(seat_change)
+        if sum(len(changes) for changes in self._changes) >= 256:
+            self._update_histograms()
+
+    def _update_histograms(self):
+        for player, changes in zip(self.summary.players, self._changes):
+            if not changes:
+                continue
+            values, counts = np.unique(
+                np.concatenate(changes), return_counts=True
+            )
+            histogram = player.histogram
+            for value, count in zip(values.tolist(), counts.tolist()):
+                histogram[value] = histogram.get(value, 0) + count
+            changes.clear()
+
+    def _check_shoes(self, tables):
+        """
+        Start a new shoe at every table that needs to be shuffled
+        """
+        shuffle_freq = self.table_rules.shuffle_freq
+        if shuffle_freq < 1:
+            remaining = (self.shoe_size - self.pos[tables]) / self.shoe_size
+            shuffle = remaining <= shuffle_freq
+        else:
+            shuffle = self.hands_played[tables] >= shuffle_freq
+        for t in tables[shuffle].tolist():
+            self._new_shoe(t)
+
+
+def simulate_tables(players, rules=None, tables=1000, rounds=1000, seed=None,
+                    engine="auto"):
+    """
+    Play `rounds` rounds at each of `tables` independent tables and return a
+    Summary of the results for each player
+    Parameters
+    ----------
+    players: list of Player objects for the seats at every table
+    rules: dictionary containing any rule updates
+    tables: number of tables
+    rounds: number of rounds played at each table
+    seed: seed for the tables' shoes
+    engine: "vector" to use VectorGame, "reference" to play each table with
+        Game, or "auto" to use VectorGame whenever it supports the players
+        and rules. Both engines give the same results for a given seed
+    """
+    if engine not in ("auto", "vector", "reference"):
+        raise ValueError("'engine' must be 'auto', 'vector', or 'reference'")
+    stream = seed if isinstance(seed, ShoeStream) else ShoeStream(seed)
+    if engine != "reference":
+        params = Game(players, rules=rules, record="none").table_rules
+        reason = unsupported(players, params)
+        if reason is None:
+            game = VectorGame(players, rules, tables=tables, seed=stream)
+            return game.simulate(rounds)
+        if engine == "vector":
+            raise ValueError(reason)
+    summary = Summary(len(players))
+    for t in range(tables):
+        table_players = []
+        for player in players:
+            table_player = copy.copy(player)
+            table_player.history = []
+            if player.stats is not None:
+                table_player.stats = PlayerStats()
+            table_players.append(table_player)
+        game = Game(table_players, rules=rules, seed=stream.stream(t),
+                    record="none")
+        for record in game.iter_rounds(rounds, mode="fast"):
+            summary.add_round(record)
+    return summary
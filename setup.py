@@ -14,7 +14,7 @@ setuptools.setup(
     long_description_content_type="text/markdown",
     url="https://github.com/andersonfrailey/blackjack",
     packages=["py21"],
-    install_requires=["tqdm", "paramtools", "pandas"],
+    install_requires=["tqdm", "paramtools", "pandas", "numpy"],
     tests_require=["pytest"],
     classifiers=[
         "Programming Language :: Python :: 3.7",